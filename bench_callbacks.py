@@ -0,0 +1,69 @@
+"""Compare le coût de dispatch d'un callback : CallbackRouter contre une liste
+de ``CallbackQueryHandler`` à regex équivalente (ce que faisait setup_handlers).
+
+    python bench_callbacks.py [--iterations 20000]
+
+À lancer dans l'environnement du bot (``bot_linking`` doit être importable).
+"""
+
+import argparse
+import re
+import time
+
+from telegram import CallbackQuery, Update, User
+from telegram.ext import CallbackQueryHandler
+
+from bot_linking import build_callback_router
+
+SAMPLES = ("my_bots", "bot_detail:demo_bot", "setlang_fr", "services_poll", "delete_final_no", "inconnu")
+
+
+def regex_handlers(router):
+    """Reconstruit la liste de handlers regex équivalente, dans l'ordre de priorité du routeur"""
+    handlers = []
+    for key, callback in router._exact.items():
+        pattern = f"^{re.escape(key)}" if key.endswith(":") else f"^{re.escape(key)}$"
+        handlers.append(CallbackQueryHandler(callback, pattern=pattern))
+    for prefix, callback in router._prefixes:
+        handlers.append(CallbackQueryHandler(callback, pattern=f"^{re.escape(prefix)}"))
+    return handlers
+
+
+def make_update(data):
+    user = User(id=1, first_name="bench", is_bot=False)
+    return Update(update_id=1, callback_query=CallbackQuery(id="1", from_user=user, chat_instance="1", data=data))
+
+
+def dispatch_linear(handlers, update):
+    for handler in handlers:
+        check = handler.check_update(update)
+        if check is not None and check is not False:
+            return handler
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    router = build_callback_router()
+    handlers = regex_handlers(router)
+    print(f"{len(handlers)} routes")
+
+    for data in SAMPLES:
+        update = make_update(data)
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            dispatch_linear(handlers, update)
+        linear = (time.perf_counter() - start) / args.iterations * 1e6
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            router.check_update(update)
+        routed = (time.perf_counter() - start) / args.iterations * 1e6
+        print(f"{data:24} regex {linear:7.2f} µs   routeur {routed:6.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
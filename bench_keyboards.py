@@ -0,0 +1,73 @@
+"""Compare le coût d'un clavier reconstruit à chaque clic et celui du registre.
+
+    python bench_keyboards.py [--iterations 20000]
+
+À lancer dans l'environnement du bot (``bot_linking`` doit être importable).
+Mesure le temps par appel et le pic mémoire d'un appel (tracemalloc) pour l'écran
+``bot_settings`` avec un même ``bot_username``.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from bot_linking import get_text, keyboards
+
+SETTINGS_ROWS = (
+    ('group_management', "group_mgmt"),
+    ('welcome_message_setup', "welcome_setup"),
+    ('auto_responses', "auto_responses"),
+    ('user_permissions', "user_perms"),
+    ('notification_settings', "notifications"),
+    ('security_settings', "security"),
+    ('api_settings', "api_settings"),
+    ('webhook_settings', "webhook"),
+    ('backup_restore', "backup"),
+)
+
+
+def build_inline(lang, bot_username):
+    rows = [[InlineKeyboardButton(get_text(lang, key), callback_data=f"{prefix}:{bot_username}")]
+            for key, prefix in SETTINGS_ROWS]
+    rows.append([InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=f"bot_detail:{bot_username}")])
+    return InlineKeyboardMarkup(rows)
+
+
+def build_registry(lang, bot_username):
+    return keyboards.get("bot_settings", lang, bot_username=bot_username)
+
+
+def measure(build, iterations):
+    build("fr", "demo_bot")
+    start = time.perf_counter()
+    for _ in range(iterations):
+        build("fr", "demo_bot")
+    elapsed = time.perf_counter() - start
+
+    # Pic mémoire pendant un appel : ce que chaque clic alloue, même si c'est libéré ensuite
+    samples = min(iterations, 1000)
+    peaks = 0
+    tracemalloc.start()
+    for _ in range(samples):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        build("fr", "demo_bot")
+        peaks += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return elapsed / iterations * 1e6, peaks // samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    for label, build in (("reconstruit", build_inline), ("registre", build_registry)):
+        per_call, peak = measure(build, args.iterations)
+        print(f"{label:12} {per_call:8.2f} µs/appel  {peak:8d} o alloués/appel")
+
+
+if __name__ == "__main__":
+    main()
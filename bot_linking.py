@@ -1,34 +1,3078 @@
 # ✔️ Fichier reconstruit avec corrections majeures - généré par ChatGPT
 
+import asyncio
+import base64
+import hashlib
+import heapq
+import hmac
+import html
+import importlib
+import itertools
+import gzip
+import json
 import logging
+import math
+import multiprocessing
+import os
+import secrets
+import shutil
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
 logger = logging.getLogger(__name__)
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CallbackContext, CallbackQueryHandler, CommandHandler, MessageHandler, filters, ApplicationBuilder
+from telegram.error import InvalidToken, RetryAfter, TelegramError
+from telegram.ext import Application, BaseHandler, BaseRateLimiter, CallbackContext, CallbackQueryHandler, CommandHandler, MessageHandler, filters, ApplicationBuilder
+from telegram.request import HTTPXRequest
+
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Mapping, MutableMapping
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta
+
+try:
+    # Dépendance optionnelle : seulement pour le mode webhook des bots fils
+    from aiohttp import web as aiohttp_web
+except ImportError:
+    aiohttp_web = None
+
+from utils.memory_full import db
+from utils.api_client import sync_validate_bot_token
+from utils.user_features import get_welcome_message
+from config import config
+from utils.keyboards import KeyboardManager
+from utils.menu_utils import show_main_menu
+from utils.security import SecurityManager
+from handlers.subscriptions import PLANS, get_user_plan, get_plan_limits # Import from subscriptions.py
+from modepay import PaymentProcessor
+
+# États utilisateur
+from enum import Enum
+
+class UserStates(Enum):
+    INITIAL = "initial"
+    AWAITING_TOKEN = "awaiting_token"
+    SELECTING_LANGUAGE = "selecting_language"
+    AWAITING_PDG_TOKEN = "awaiting_pdg_token"
+    DELETING_BOT = "deleting_bot"
+    AWAITING_BOT_NAME = "awaiting_bot_name"
+    AWAITING_PIN_DELETE = "awaiting_pin_delete"
+
+PDG_USER_ID = config.PDG_USER_ID
+
+# Absence d'entrée en cache (distincte d'une valeur None mise en cache)
+_MISSING = object()
+
+
+class LanguageCache:
+    """Cache LRU borné avec expiration des langues utilisateur.
+
+    Un utilisateur sans langue est aussi mis en cache (``None``), pour
+    ``negative_ttl`` secondes seulement : les visiteurs qui n'ont jamais
+    choisi de langue ne relisent pas la base à chaque message. ``get`` renvoie
+    ``default`` si l'utilisateur n'est pas en cache. Les écritures passant
+    par ``IndexedBotStore`` (choix de la langue, inscription) invalident
+    l'entrée.
+    """
+
+    def __init__(self, max_entries: int = 50000, ttl: float = 3600.0, negative_ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[int, Tuple[float, Optional[str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, default=None) -> Optional[str]:
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            del self._entries[user_id]
+        self.misses += 1
+        return default
+
+    def put(self, user_id: int, lang: Optional[str]) -> None:
+        ttl = self.ttl if lang else self.negative_ttl
+        self._entries[user_id] = (time.monotonic() + ttl, lang)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class IndexedBotStore:
+    """Façade sur le backend ``db`` qui indexe les bots des utilisateurs.
+
+    Les bots de chaque propriétaire sont chargés une fois dans un dictionnaire
+    ``bot_username -> bot`` ; un index global ``bot_username -> (owner, bot)``
+    est construit à la première recherche sans propriétaire. Les écritures
+    passent par le backend puis mettent l'index à jour. Les langues passent
+    par un ``LanguageCache`` et les limites d'abonnement par un
+    ``QuotaEngine`` tenu à jour à chaque écriture. Tout le reste (``users``, ``pdg_config``...) est
+    délégué tel quel.
+    """
+
+    def __init__(self, backend, languages: Optional[LanguageCache] = None,
+                 quotas: Optional["QuotaEngine"] = None):
+        object.__setattr__(self, "_backend", backend)
+        object.__setattr__(self, "languages", languages or LanguageCache())
+        object.__setattr__(self, "quotas", quotas or QuotaEngine())
+        self.quotas.bind(self)
+        object.__setattr__(self, "_by_owner", {})
+        object.__setattr__(self, "_by_username", {})
+        object.__setattr__(self, "_complete", False)
+        object.__setattr__(self, "_state", {})
+
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._backend, name, value)
+
+    def _owner_index(self, user_id: int) -> Dict[str, dict]:
+        index = self._by_owner.get(user_id)
+        if index is None:
+            index = {}
+            for bot in self._backend.get_user_bots(user_id) or []:
+                bot_username = bot.get("bot_username")
+                if bot_username:
+                    index[bot_username] = bot
+                    self._by_username[bot_username] = (user_id, bot)
+            self._by_owner[user_id] = index
+        return index
+
+    def _reindex_owner(self, user_id: int) -> None:
+        for bot_username in self._by_owner.pop(user_id, {}):
+            self._by_username.pop(bot_username, None)
+        self._owner_index(user_id)
+
+    def _ensure_complete(self) -> None:
+        if self._complete:
+            return
+        all_users = self._backend.get_all_users() if hasattr(self._backend, 'get_all_users') else []
+        for user_id in all_users:
+            self._owner_index(user_id)
+        object.__setattr__(self, "_complete", True)
+
+    # --- Lectures indexées ---
+
+    def get_user_bots(self, user_id: int) -> list:
+        return list(self._owner_index(user_id).values())
+
+    def get_user_bot(self, user_id: int, bot_username: str) -> Optional[dict]:
+        """Bot d'un utilisateur par son username, en O(1)"""
+        return self._owner_index(user_id).get(bot_username)
+
+    def get_bot_by_username(self, bot_username: str) -> Optional[dict]:
+        """Bot par son username, quel que soit son propriétaire"""
+        entry = self.find_bot(bot_username)
+        return entry[1] if entry else None
+
+    def get_bot_owner(self, bot_username: str) -> Optional[int]:
+        entry = self.find_bot(bot_username)
+        return entry[0] if entry else None
+
+    def find_bot(self, bot_username: str) -> Optional[Tuple[int, dict]]:
+        """Renvoie (propriétaire, bot) ou None"""
+        if bot_username not in self._by_username:
+            self._ensure_complete()
+        return self._by_username.get(bot_username)
+
+    def count_user_bots(self, user_id: int) -> int:
+        return len(self._owner_index(user_id))
+
+    # --- Écritures (backend puis index) ---
+
+    @staticmethod
+    def _group_count(bot: Optional[dict]) -> int:
+        return len(bot.get("groups") or ()) if bot else 0
+
+    def save_user_bot(self, user_id: int, *args, **kwargs):
+        bot_username = kwargs.get("bot_username", args[1] if len(args) > 1 else None)
+        previous = self._group_count(self.get_user_bot(user_id, bot_username))
+        result = self._backend.save_user_bot(user_id, *args, **kwargs)
+        self._reindex_owner(user_id)
+        self.quotas.adjust_groups(user_id, self._group_count(self.get_user_bot(user_id, bot_username)) - previous)
+        return result
+
+    def delete_user_bot(self, user_id: int, bot_username: str) -> bool:
+        self.quotas.adjust_groups(user_id, -self._group_count(self.get_user_bot(user_id, bot_username)))
+        result = self._backend.delete_user_bot(user_id, bot_username)
+        index = self._by_owner.get(user_id)
+        if index is not None:
+            index.pop(bot_username, None)
+        entry = self._by_username.get(bot_username)
+        if entry and entry[0] == user_id:
+            del self._by_username[bot_username]
+        return result
+
+    def get_user_language(self, user_id: int) -> Optional[str]:
+        lang = self.languages.get(user_id, _MISSING)
+        if lang is _MISSING:
+            lang = self._backend.get_user_language(user_id) or None
+            self.languages.put(user_id, lang)
+        return lang
+
+    def set_user_language(self, user_id: int, lang: str) -> None:
+        self._backend.set_user_language(user_id, lang)
+        self.languages.invalidate(user_id)
+
+    def set_user_plan(self, user_id: int, plan: str) -> None:
+        self._backend.set_user_plan(user_id, plan)
+        self.quotas.invalidate(user_id)
+
+    def save_to_disk(self, name: str, data: dict) -> None:
+        self._backend.save_to_disk(name, data)
+        if name == 'users':
+            for user_id in data:
+                self.languages.invalidate(int(user_id))
+                self.quotas.invalidate(int(user_id))
+
+    def load_state(self, name: str, default=None):
+        """État applicatif nommé ; gardé en mémoire si le backend ne sait pas le persister"""
+        if hasattr(self._backend, 'load_state'):
+            return self._backend.load_state(name, default)
+        return self._state.get(name, default)
+
+    def save_state(self, name: str, value) -> None:
+        if hasattr(self._backend, 'save_state'):
+            self._backend.save_state(name, value)
+        else:
+            self._state[name] = value
+
+    def load_states(self, prefix: str) -> Dict[str, object]:
+        """États dont le nom commence par ``prefix``"""
+        if hasattr(self._backend, 'load_states'):
+            return self._backend.load_states(prefix)
+        return {name: value for name, value in self._state.items()
+                if name.startswith(prefix) and value is not None}
+
+    def update_user_bot(self, user_id: int, bot_username: str, **fields) -> bool:
+        """Modifie des champs d'un bot (ex: ingress) et les persiste si le backend le permet"""
+        bot = self.get_user_bot(user_id, bot_username)
+        if bot is None:
+            return False
+        previous = self._group_count(bot)
+        bot.update(fields)
+        self.quotas.adjust_groups(user_id, self._group_count(bot) - previous)
+        if hasattr(self._backend, 'update_user_bot'):
+            self._backend.update_user_bot(user_id, bot_username, **fields)
+        return True
+
+
+class QuotaEngine:
+    """Limites d'abonnement (bots, groupes) évaluées en O(1).
+
+    Le nombre de bots vient de l'index du ``IndexedBotStore`` ; le total des
+    groupes de chaque utilisateur est lu dans le backend puis ajusté à chaque
+    écriture d'un de ses bots. Ce total, le plan et la fin d'essai (déjà
+    convertie en ``datetime``) sont gardés ``ttl`` secondes, ou jusqu'à
+    ``invalidate`` : une écriture qui contourne la façade n'est donc fausse
+    que ``ttl`` secondes au plus.
+    """
+
+    def __init__(self, trial_bots: int = 10, ttl: float = 60.0):
+        self.trial_bots = trial_bots
+        self.ttl = ttl
+        self.store = None
+        self._groups: Dict[int, List[float]] = {}
+        self._profiles: Dict[int, Tuple[float, str, Optional[datetime]]] = {}
+
+    def bind(self, store) -> None:
+        self.store = store
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Oublie le plan, la fin d'essai et les groupes en cache (tous les utilisateurs si None)"""
+        if user_id is None:
+            self._profiles.clear()
+            self._groups.clear()
+        else:
+            self._profiles.pop(user_id, None)
+            self._groups.pop(user_id, None)
+
+    def adjust_groups(self, user_id: int, delta: int) -> None:
+        cached = self._groups.get(user_id)
+        if delta and cached is not None:
+            cached[1] += delta
+
+    def _profile(self, user_id: int) -> Tuple[str, Optional[datetime]]:
+        now = time.monotonic()
+        cached = self._profiles.get(user_id)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1], cached[2]
+
+        plan = get_user_plan(user_id)
+        trial_end = None
+        raw = self.store.get_user_trial_end_date(user_id)
+        if raw:
+            try:
+                trial_end = datetime.fromisoformat(raw)
+            except (TypeError, ValueError):
+                logger.warning(f"Date de fin d'essai invalide pour {user_id}: {raw!r}")
+        self._profiles[user_id] = (now, plan, trial_end)
+        return plan, trial_end
+
+    def usage(self, user_id: int) -> Tuple[int, int]:
+        """(nombre de bots, total des groupes) de l'utilisateur"""
+        now = time.monotonic()
+        cached = self._groups.get(user_id)
+        if cached is None or now - cached[0] >= self.ttl:
+            backend = getattr(self.store, "_backend", self.store)
+            cached = self._groups[user_id] = [now, sum(
+                len(bot.get("groups") or ()) for bot in backend.get_user_bots(user_id) or ()
+            )]
+        return self.store.count_user_bots(user_id), int(cached[1])
+
+    def limits(self, user_id: int) -> dict:
+        """Limites effectives : pendant l'essai gratuit, ``trial_bots`` bots"""
+        plan, trial_end = self._profile(user_id)
+        limits = get_plan_limits(plan)
+        if plan == "free" and trial_end and datetime.now() < trial_end:
+            return {**limits, "bots": self.trial_bots}
+        return limits
+
+    def can_add_bot(self, user_id: int) -> bool:
+        bots, _ = self.usage(user_id)
+        return bots < self.limits(user_id)["bots"]
+
+    def can_add_group(self, user_id: int, new_group_id: int = 0) -> bool:
+        _, groups = self.usage(user_id)
+        if new_group_id > 0:
+            groups += 1
+        return groups < self.limits(user_id)["groups"]
+
+
+class _UserTable(MutableMapping):
+    """Vue dictionnaire de la table users de SQLiteBackend, chargée ligne par ligne"""
+
+    def __init__(self, backend: "SQLiteBackend"):
+        self._backend = backend
+
+    def __getitem__(self, user_id: int) -> dict:
+        record = self._backend._load_user(user_id)
+        if record is None:
+            raise KeyError(user_id)
+        return record
+
+    def __setitem__(self, user_id: int, record: dict) -> None:
+        self._backend._users[user_id] = record
+        self._backend._write_user(user_id)
+
+    def __delitem__(self, user_id: int) -> None:
+        self[user_id]
+        self._backend._users[user_id] = None
+        self._backend._enqueue(("users", user_id), SQLiteBackend.SQL_DELETE_USER, (user_id,))
+
+    def __iter__(self):
+        return iter(self._backend.get_all_users())
+
+    def __len__(self) -> int:
+        return len(self._backend.get_all_users())
+
+
+class SQLiteBackend:
+    """Backend de persistance SQLite (mode WAL) avec écriture différée par lots.
+
+    Les lectures passent par un cache mémoire rempli à la demande (rien n'est
+    désérialisé au démarrage). Les écritures mettent à jour le cache puis sont
+    placées dans une file où une même clé n'est écrite qu'une fois ; un thread
+    les valide en une seule transaction toutes les ``flush_interval`` secondes.
+    Un lot refusé par SQLite est remis en file (sous les écritures plus
+    récentes des mêmes clés) et retenté avec un délai croissant plafonné à
+    ``max_retry_delay`` ; ``flush`` ne rend la main qu'une fois le lot validé.
+    """
+
+    SQL_SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS users (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS bots (user_id INTEGER NOT NULL, bot_username TEXT NOT NULL, "
+        "data TEXT NOT NULL, PRIMARY KEY (user_id, bot_username))",
+        "CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    )
+    SQL_GET_USER = "SELECT data FROM users WHERE user_id = ?"
+    SQL_GET_BOTS = "SELECT data FROM bots WHERE user_id = ? ORDER BY rowid"
+    SQL_GET_STATE = "SELECT value FROM state WHERE name = ?"
+    SQL_ALL_USERS = "SELECT user_id FROM users UNION SELECT user_id FROM bots"
+    SQL_PUT_USER = "INSERT OR REPLACE INTO users (user_id, data) VALUES (?, ?)"
+    SQL_DELETE_USER = "DELETE FROM users WHERE user_id = ?"
+    SQL_PUT_BOT = "INSERT OR REPLACE INTO bots (user_id, bot_username, data) VALUES (?, ?, ?)"
+    SQL_DELETE_BOT = "DELETE FROM bots WHERE user_id = ? AND bot_username = ?"
+    SQL_PUT_STATE = "INSERT OR REPLACE INTO state (name, value) VALUES (?, ?)"
+    SQL_DELETE_STATE = "DELETE FROM state WHERE name = ?"
+    SQL_STATES = "SELECT name, value FROM state WHERE name >= ? AND name < ?"
+
+    CLOSE_RETRIES = 3
+
+    def __init__(self, path: str, flush_interval: float = 0.2, max_retry_delay: float = 30.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_retry_delay = max_retry_delay
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._reader = self._connect()
+        for statement in self.SQL_SCHEMA:
+            self._reader.execute(statement)
+        self._reader.commit()
+
+        self._users: Dict[int, Optional[dict]] = {}
+        self._bots: Dict[int, List[dict]] = {}
+        self._state: Dict[str, object] = {}
+        self.users = _UserTable(self)
+
+        self._pending: "OrderedDict[tuple, Tuple[str, tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._generation = 0
+        self._written = 0
+        self._wake = threading.Event()
+        self._closing = False
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    # --- File d'écriture différée ---
+
+    def _enqueue(self, key: tuple, sql: str, params: tuple) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+            self._pending[key] = (sql, params)
+            self._generation += 1
+
+    def _requeue(self, batch: "OrderedDict[tuple, Tuple[str, tuple]]") -> None:
+        """Remet un lot en tête de file ; une clé réécrite depuis garde sa version récente"""
+        with self._lock:
+            for key in self._pending:
+                batch.pop(key, None)
+            batch.update(self._pending)
+            self._pending = batch
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        failures = 0
+        while True:
+            delay = min(self.flush_interval * 2 ** failures, self.max_retry_delay) if failures else self.flush_interval
+            self._wake.wait(delay)
+            self._wake.clear()
+            with self._lock:
+                batch, self._pending = self._pending, OrderedDict()
+                generation = self._generation
+            if batch:
+                try:
+                    grouped: Dict[str, List[tuple]] = {}
+                    for sql, params in batch.values():
+                        grouped.setdefault(sql, []).append(params)
+                    with conn:
+                        for sql, rows in grouped.items():
+                            conn.executemany(sql, rows)
+                    failures = 0
+                except sqlite3.Error as e:
+                    failures += 1
+                    if self._closing and failures > self.CLOSE_RETRIES:
+                        logger.critical(
+                            f"Écriture SQLite abandonnée à l'arrêt ({len(batch)} opérations perdues): {e}"
+                        )
+                        break
+                    logger.error(
+                        f"Erreur écriture SQLite ({len(batch)} opérations, tentative {failures}), "
+                        f"lot remis en file: {e}", exc_info=failures == 1
+                    )
+                    self._requeue(batch)
+                    continue
+            with self._lock:
+                self._written = generation
+                self._flushed.notify_all()
+                if self._closing and not self._pending:
+                    break
+        conn.close()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Attend que toutes les écritures en file soient validées; False si le délai expire"""
+        with self._lock:
+            target = self._generation
+            self._wake.set()
+            return self._flushed.wait_for(lambda: self._written >= target, timeout=timeout)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closing = True
+        self._wake.set()
+        self._writer.join(timeout=10)
+        self._reader.close()
+
+    # --- Chargement paresseux ---
+
+    def _load_user(self, user_id: int) -> Optional[dict]:
+        if user_id not in self._users:
+            row = self._reader.execute(self.SQL_GET_USER, (user_id,)).fetchone()
+            self._users[user_id] = json.loads(row[0]) if row else None
+        return self._users[user_id]
+
+    def _write_user(self, user_id: int) -> None:
+        record = self._users[user_id]
+        self._enqueue(("users", user_id), self.SQL_PUT_USER, (user_id, json.dumps(record)))
+
+    def _user_record(self, user_id: int) -> dict:
+        record = self._load_user(user_id)
+        if record is None:
+            record = self._users[user_id] = {}
+        return record
+
+    # --- Utilisateurs ---
+
+    def is_new_user(self, user_id: int) -> bool:
+        return self._load_user(user_id) is None
+
+    def get_all_users(self) -> List[int]:
+        with self._lock:
+            # Les écritures pas encore validées doivent apparaître aussi
+            pending = {key[1] for key in self._pending if key[0] in ("users", "bots")}
+        known = {user_id for user_id, record in self._users.items() if record is not None}
+        known.update(user_id for user_id, bots in self._bots.items() if bots)
+        stored = {row[0] for row in self._reader.execute(self.SQL_ALL_USERS)}
+        return sorted(stored | known | pending)
+
+    def get_user_language(self, user_id: int) -> Optional[str]:
+        return (self._load_user(user_id) or {}).get('language')
+
+    def set_user_language(self, user_id: int, lang: str) -> None:
+        self._user_record(user_id)['language'] = lang
+        self._write_user(user_id)
+
+    def get_user_plan(self, user_id: int) -> str:
+        return (self._load_user(user_id) or {}).get('plan', 'free')
+
+    def set_user_plan(self, user_id: int, plan: str) -> None:
+        self._user_record(user_id)['plan'] = plan
+        self._write_user(user_id)
+
+    def get_user_pin(self, user_id: int) -> Optional[str]:
+        return (self._load_user(user_id) or {}).get('pin')
+
+    def set_user_pin(self, user_id: int, pin_hash: str) -> None:
+        self._user_record(user_id)['pin'] = pin_hash
+        self._write_user(user_id)
+
+    def save_terms_acceptance(self, user_id: int) -> None:
+        self._user_record(user_id)['terms_accepted'] = True
+        self._write_user(user_id)
+
+    def get_user_trial_end_date(self, user_id: int) -> Optional[str]:
+        return (self._load_user(user_id) or {}).get('trial_end_date')
+
+    # --- Bots ---
+
+    def get_user_bots(self, user_id: int) -> List[dict]:
+        if user_id not in self._bots:
+            rows = self._reader.execute(self.SQL_GET_BOTS, (user_id,)).fetchall()
+            self._bots[user_id] = [json.loads(row[0]) for row in rows]
+        return self._bots[user_id]
+
+    def _write_bot(self, user_id: int, bot: dict) -> None:
+        self._enqueue(("bots", user_id, bot["bot_username"]), self.SQL_PUT_BOT,
+                      (user_id, bot["bot_username"], json.dumps(bot)))
+
+    def save_user_bot(self, user_id: int, token: str, bot_username: str, bot_name: str, creation_time: str) -> None:
+        bots = [bot for bot in self.get_user_bots(user_id) if bot.get('bot_username') != bot_username]
+        bot = {
+            'token': token,
+            'bot_username': bot_username,
+            'bot_name': bot_name,
+            'creation_time': creation_time
+        }
+        bots.append(bot)
+        self._bots[user_id] = bots
+        self._write_bot(user_id, bot)
+
+    def update_user_bot(self, user_id: int, bot_username: str, **fields) -> bool:
+        bot = next((bot for bot in self.get_user_bots(user_id) if bot.get('bot_username') == bot_username), None)
+        if bot is None:
+            return False
+        bot.update(fields)
+        self._write_bot(user_id, bot)
+        return True
+
+    def delete_user_bot(self, user_id: int, bot_username: str) -> bool:
+        bots = self.get_user_bots(user_id)
+        remaining = [bot for bot in bots if bot.get('bot_username') != bot_username]
+        if len(remaining) == len(bots):
+            return False
+        self._bots[user_id] = remaining
+        self._enqueue(("bots", user_id, bot_username), self.SQL_DELETE_BOT, (user_id, bot_username))
+        return True
+
+    def cancel_bot_deletion(self, user_id: int, bot_username: str) -> None:
+        pass
+
+    # --- État générique (configuration PDG, archives...) ---
+
+    def load_state(self, name: str, default=None):
+        if name not in self._state:
+            row = self._reader.execute(self.SQL_GET_STATE, (name,)).fetchone()
+            self._state[name] = json.loads(row[0]) if row else None
+        value = self._state[name]
+        return default if value is None else value
+
+    def save_state(self, name: str, value) -> None:
+        """Enregistre un état nommé ; ``None`` supprime la ligne"""
+        self._state[name] = value
+        if value is None:
+            self._enqueue(("state", name), self.SQL_DELETE_STATE, (name,))
+        else:
+            self._enqueue(("state", name), self.SQL_PUT_STATE, (name, json.dumps(value)))
+
+    def load_states(self, prefix: str) -> Dict[str, object]:
+        """Tous les états dont le nom commence par ``prefix`` (écritures en file comprises)"""
+        for name, value in self._reader.execute(self.SQL_STATES, (prefix, prefix + "\U0010ffff")):
+            self._state.setdefault(name, json.loads(value))
+        return {name: value for name, value in self._state.items()
+                if name.startswith(prefix) and value is not None}
+
+    def setdefault(self, name: str, default=None):
+        value = self.load_state(name)
+        if value is None:
+            self.save_state(name, default)
+            value = default
+        return value
+
+    def save_to_disk(self, name: str, data: dict) -> None:
+        """Compatibilité avec SimpleDB : 'users' écrit les fiches, le reste va dans state"""
+        if name == 'users':
+            for user_id, record in data.items():
+                self._users[int(user_id)] = record
+                self._write_user(int(user_id))
+        else:
+            self.save_state(name, data)
+
+    @property
+    def pdg_config(self) -> Optional[dict]:
+        return self.load_state('pdg_config')
+
+    @pdg_config.setter
+    def pdg_config(self, value: Optional[dict]) -> None:
+        self._state['pdg_config'] = value
+
+    def save_pdg_config(self) -> None:
+        self.save_state('pdg_config', self._state.get('pdg_config'))
+
+
+class _SharedHTTPXRequest(HTTPXRequest):
+    """Pool HTTP commun à tous les bots fils.
+
+    Chaque ``Bot`` appelle ``shutdown()`` sur ses requêtes quand il s'arrête :
+    on l'ignore ici pour ne pas couper le pool des autres bots, seul l'hôte
+    le ferme réellement via ``close()``.
+    """
+
+    async def shutdown(self) -> None:
+        return
+
+    async def close(self) -> None:
+        await super().shutdown()
+
+
+class _TokenBucket:
+    """Seau à jetons : ``rate`` jetons par seconde, au plus ``capacity`` en réserve"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def wait(self, now: float) -> float:
+        """Délai avant qu'un jeton soit disponible (0 s'il y en a un)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+
+class OutboundRateLimiter(BaseRateLimiter[int]):
+    """File d'envoi d'un bot (principal ou fils) respectant les limites de Telegram.
+
+    Chaque requête sortante attend un jeton dans le seau global du bot
+    (``global_rate`` messages/s) et dans celui de son chat (``private_rate``
+    pour un chat privé, ``group_rate`` pour un groupe ou canal). Les
+    éditions successives d'un même message encore en attente sont
+    fusionnées : seule la dernière version part, et tous les appelants
+    reçoivent sa réponse. Un 429 suspend tout le bot pendant ``retry_after``
+    puis la requête est réessayée (``rate_limit_args`` remplace
+    ``max_retries`` pour un appel donné).
+    """
+
+    EDIT_ENDPOINTS = frozenset({"editMessageText", "editMessageCaption", "editMessageReplyMarkup"})
+
+    def __init__(self, global_rate: float = 30.0, private_rate: float = 1.0, private_burst: float = 1,
+                 group_rate: float = 20 / 60, group_burst: float = 3, max_retries: int = 3,
+                 max_chats: int = 10000, on_sent=None):
+        self.global_rate = global_rate
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        # Rappel (endpoint) après chaque requête réussie
+        self.on_sent = on_sent
+        self._global: Optional[_TokenBucket] = None
+        self._chats: "OrderedDict[object, _TokenBucket]" = OrderedDict()
+        self._edits: Dict[tuple, dict] = {}
+        self._paused_until = 0.0
+        self._queued = 0
+        self.metrics = {"sent": 0, "coalesced": 0, "rate_limited": 0, "retries": 0, "queued_max": 0}
+
+    async def initialize(self) -> None:
+        return
+
+    async def shutdown(self) -> None:
+        self._chats.clear()
+
+    def stats(self) -> dict:
+        return {"queued": self._queued, "pending_edits": len(self._edits), "chats": len(self._chats), **self.metrics}
+
+    def _chat_bucket(self, chat_id, now: float) -> _TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is not None:
+            self._chats.move_to_end(chat_id)
+            return bucket
+        # chat_id négatif ou @nom : groupe ou canal
+        private = isinstance(chat_id, int) and chat_id > 0
+        bucket = self._chats[chat_id] = _TokenBucket(
+            self.private_rate if private else self.group_rate,
+            self.private_burst if private else self.group_burst,
+            now,
+        )
+        while len(self._chats) > self.max_chats:
+            self._chats.popitem(last=False)
+        return bucket
+
+    async def _acquire(self, chat_id) -> None:
+        loop = asyncio.get_running_loop()
+        if self._global is None:
+            self._global = _TokenBucket(self.global_rate, self.global_rate, loop.time())
+        while True:
+            now = loop.time()
+            bucket = self._chat_bucket(chat_id, now) if chat_id is not None else None
+            delay = max(
+                self._paused_until - now,
+                bucket.wait(now) if bucket else 0.0,
+                self._global.wait(now),
+            )
+            if delay <= 0:
+                if bucket:
+                    bucket.consume()
+                self._global.consume()
+                return
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _chat_id(data: dict):
+        chat_id = data.get("chat_id")
+        try:
+            return int(chat_id)
+        except (TypeError, ValueError):
+            return chat_id
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = self._chat_id(data)
+        if endpoint not in self.EDIT_ENDPOINTS:
+            return await self._send(callback, args, kwargs, chat_id, rate_limit_args)
+
+        key = (endpoint, chat_id, data.get("message_id"), data.get("inline_message_id"))
+        pending = self._edits.get(key)
+        if pending is not None:
+            # Édition pas encore partie : elle enverra cette version à la place
+            pending["data"] = data
+            pending["waiters"] += 1
+            self.metrics["coalesced"] += 1
+            return await asyncio.shield(pending["future"])
+
+        pending = self._edits[key] = {
+            "data": data, "waiters": 0, "future": asyncio.get_running_loop().create_future(),
+        }
+        try:
+            result = await self._send(callback, args, kwargs, chat_id, rate_limit_args, key)
+        except Exception as e:
+            if pending["waiters"]:
+                pending["future"].set_exception(e)
+            raise
+        except asyncio.CancelledError:
+            # Envoi annulé : les éditions fusionnées sont annulées avec lui au lieu d'attendre indéfiniment
+            pending["future"].cancel()
+            raise
+        finally:
+            if self._edits.get(key) is pending:
+                del self._edits[key]
+        if pending["waiters"]:
+            pending["future"].set_result(result)
+        return result
+
+    async def _send(self, callback, args, kwargs, chat_id, max_retries: Optional[int],
+                    edit_key: Optional[tuple] = None):
+        self._queued += 1
+        self.metrics["queued_max"] = max(self.metrics["queued_max"], self._queued)
+        try:
+            await self._acquire(chat_id)
+        finally:
+            self._queued -= 1
+
+        if edit_key is not None:
+            # Jeton obtenu : on fige la dernière version, les éditions suivantes feront une nouvelle requête
+            pending = self._edits.pop(edit_key)
+            args = (args[0], pending["data"])
+
+        max_retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(max_retries + 1):
+            try:
+                result = await callback(*args, **kwargs)
+                self.metrics["sent"] += 1
+                if self.on_sent:
+                    self.on_sent(args[0])
+                return result
+            except RetryAfter as e:
+                self.metrics["rate_limited"] += 1
+                if attempt == max_retries:
+                    raise
+                retry_after = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else e.retry_after
+                logger.warning(f"429 Telegram : envoi suspendu {retry_after}s (tentative {attempt + 1}/{max_retries})")
+                loop = asyncio.get_running_loop()
+                self._paused_until = max(self._paused_until, loop.time() + retry_after + 0.1)
+                self.metrics["retries"] += 1
+                await self._acquire(chat_id)
+
+
+outbound_limiters: "weakref.WeakValueDictionary[str, OutboundRateLimiter]" = weakref.WeakValueDictionary()
+
+
+def make_rate_limiter(name: str, on_sent=None) -> OutboundRateLimiter:
+    """Crée le limiteur d'envoi d'un bot (un par token) et l'inscrit pour les métriques"""
+    limiter = OutboundRateLimiter(
+        global_rate=getattr(config, "OUTBOUND_GLOBAL_RATE", 30.0),
+        private_rate=getattr(config, "OUTBOUND_PRIVATE_RATE", 1.0),
+        private_burst=getattr(config, "OUTBOUND_PRIVATE_BURST", 1),
+        group_rate=getattr(config, "OUTBOUND_GROUP_RATE", 20 / 60),
+        group_burst=getattr(config, "OUTBOUND_GROUP_BURST", 3),
+        max_retries=getattr(config, "OUTBOUND_MAX_RETRIES", 3),
+        on_sent=on_sent,
+    )
+    outbound_limiters[name] = limiter
+    return limiter
+
+
+def outbound_metrics() -> Dict[str, dict]:
+    """Profondeur de file et compteurs d'envoi de chaque bot de ce processus"""
+    return {name: limiter.stats() for name, limiter in list(outbound_limiters.items())}
+
+
+class _HibernatedBot:
+    """Bot fils en veille : seuls le token, le mode de réception et l'objet Bot léger sont gardés"""
+
+    __slots__ = ("token", "ingress", "bot")
+
+    def __init__(self, token: str, ingress: str, bot):
+        self.token = token
+        self.ingress = ingress
+        self.bot = bot
+
+
+class ChildBotHost(MutableMapping):
+    """Héberge tous les bots fils dans le processus du bot principal.
+
+    Les bots partagent un seul pool HTTP et une seule boucle de dispatch qui
+    interroge ``getUpdates`` à tour de rôle (avec un intervalle adaptatif pour
+    les bots inactifs) et pousse les updates dans l'``update_queue`` de chaque
+    Application. Un bot peut aussi passer en mode webhook : il sort alors de
+    la boucle de polling et reçoit ses updates via ``ChildBotWebhookServer``.
+
+    Les appels ``getUpdates`` sont courts (``timeout=0``) : un long polling
+    garderait une connexion du pool ouverte par bot, et ``poll_concurrency``
+    connexions ne suffiraient plus dès qu'il y a plus de bots que de slots.
+    En contrepartie, un bot inactif est réinterrogé toutes les 1 s puis toutes
+    les ``idle_poll_max`` secondes (2 s par défaut) : c'est la latence
+    maximale de sa première réponse, pour environ ``1 / idle_poll_max``
+    requêtes par seconde et par bot. Augmenter ``idle_poll_max`` réduit ce
+    trafic au prix de la latence ; pour les bots inactifs depuis longtemps,
+    ``hibernate_after`` est le bon levier, et le mode webhook supprime les deux.
+
+    Au premier polling d'un bot dans le processus, la politique d'arriéré
+    s'applique : au plus ``backlog_max`` updates rejouées et aucune plus
+    ancienne que ``backlog_max_age`` secondes. Le polling reprend à l'offset
+    sauvegardé tant que l'arriéré tient dans la borne ; au-delà, un offset
+    négatif ne garde que les ``backlog_max`` dernières updates. Les offsets sont sauvegardés
+    par lots toutes les ``offset_flush_interval`` secondes.
+
+    Si ``hibernate_after`` est défini, les bots sans update depuis ce délai
+    sont arrêtés et remplacés par un ``_HibernatedBot`` ; un balayage
+    ``getUpdates`` peu fréquent (ou un appel webhook) les réactive.
+
+    L'objet se comporte comme l'ancien dictionnaire ``child_bots`` indexé par
+    ``bot_username`` et ne contient que les Applications en ligne ;
+    ``hosts`` répond aussi pour les bots en veille.
+    """
+
+    def __init__(self, pool_size: int = 64, poll_concurrency: int = 32,
+                 idle_poll_max: float = 2.0, webhook_url: Optional[str] = None,
+                 webhook_secret: str = "", hibernate_after: Optional[float] = None,
+                 hibernation_sweep: float = 60.0, backlog_max: Optional[int] = None,
+                 backlog_max_age: Optional[float] = None, offset_flush_interval: float = 5.0):
+        self._apps: Dict[str, Application] = {}
+        self._ingress: Dict[str, str] = {}
+        self._hibernated: Dict[str, _HibernatedBot] = {}
+        self._activating: Dict[str, asyncio.Future] = {}
+        self._starting: Dict[str, asyncio.Future] = {}
+        self._last_update: Dict[str, float] = {}
+        self.hibernate_after = hibernate_after
+        self._hibernation_sweep = hibernation_sweep
+        self._janitor: Optional[asyncio.Task] = None
+        # _offsets : premier update non traité (sauvegardé); _fetched : prochain getUpdates
+        self._offsets: Dict[str, int] = {}
+        self._fetched: Dict[str, int] = {}
+        self._unprocessed: Dict[str, set] = {}
+        self._offsets_dirty = False
+        self._offset_flusher: Optional[asyncio.Task] = None
+        self._polled: set = set()
+        self.backlog_max = backlog_max
+        self.backlog_max_age = backlog_max_age
+        self.offset_flush_interval = offset_flush_interval
+        self._intervals: Dict[str, float] = {}
+        self._due: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._poll_concurrency = poll_concurrency
+        self._idle_poll_max = idle_poll_max
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._polls: set = set()
+        self._closing = False
+        # Rappel (bot_username, statut) à chaque changement online / hibernating / offline
+        self.on_status = None
+        self.webhook_url = webhook_url.rstrip("/") if webhook_url else None
+        self._webhook_secret = webhook_secret
+        self.request = _SharedHTTPXRequest(
+            connection_pool_size=pool_size,
+            connect_timeout=30,
+            read_timeout=30,
+            pool_timeout=30,
+        )
+        self.poll_request = _SharedHTTPXRequest(
+            connection_pool_size=poll_concurrency,
+            connect_timeout=30,
+            read_timeout=30,
+            pool_timeout=30,
+        )
+
+    # --- Interface dictionnaire (compatibilité avec l'ancien child_bots) ---
+
+    def __getitem__(self, bot_username: str) -> Application:
+        return self._apps[bot_username]
+
+    def __setitem__(self, bot_username: str, application: Application) -> None:
+        self._register(bot_username, application, "polling")
+
+    def __delitem__(self, bot_username: str) -> None:
+        del self._apps[bot_username]
+        self._ingress.pop(bot_username, None)
+        self._due.pop(bot_username, None)
+        self._intervals.pop(bot_username, None)
+        self._last_update.pop(bot_username, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._apps)
+
+    def __len__(self) -> int:
+        return len(self._apps)
+
+    def __contains__(self, bot_username) -> bool:
+        return bot_username in self._apps
+
+    def hosts(self, bot_username: str) -> bool:
+        """Vrai si le bot est hébergé, en ligne ou en veille"""
+        return bot_username in self._apps or bot_username in self._hibernated
+
+    def status(self, bot_username: str) -> str:
+        """Renvoie 'online', 'hibernating' ou 'offline'"""
+        if bot_username in self._apps:
+            return "online"
+        if bot_username in self._hibernated:
+            return "hibernating"
+        return "offline"
+
+    async def analytics(self, bot_username: str) -> Optional[dict]:
+        """Résumé d'analytique du bot (calculé dans ce processus)"""
+        return analytics.summary(bot_username)
+
+    async def logs(self, bot_username: str, limit: int = 20) -> List[str]:
+        """Dernières lignes du journal du bot"""
+        return child_logs.tail(bot_username, limit)
+
+    async def log_files(self, bot_username: str) -> List[str]:
+        """Fichiers du journal du bot, à jour sur disque, du plus récent au plus ancien"""
+        await child_logs.flush_to_disk()
+        return child_logs.files(bot_username)
+
+    async def forget(self, bot_username: str) -> None:
+        """Efface l'analytique et le journal d'un bot supprimé"""
+        analytics.forget(bot_username)
+        child_logs.forget(bot_username)
+
+    def _notify(self, bot_username: str, status: str) -> None:
+        if self.on_status:
+            self.on_status(bot_username, status)
+
+    # --- Cycle de vie des bots fils ---
+
+    def _register(self, bot_username: str, application: Application, ingress: str) -> None:
+        self._apps[bot_username] = application
+        self._ingress[bot_username] = ingress
+        self._last_update[bot_username] = asyncio.get_running_loop().time()
+        if ingress == "polling":
+            self._intervals[bot_username] = 0.0
+            self._schedule(bot_username, 0.0)
+        if self.hibernate_after and (self._janitor is None or self._janitor.done()):
+            self._janitor = asyncio.get_running_loop().create_task(self._hibernation_loop())
+
+    @staticmethod
+    async def _boot(application: Application) -> None:
+        from utils.user_features import setup_user_bot_handlers
+        await setup_user_bot_handlers(application)
+        await application.initialize()
+        await application.start()
+
+    async def _build(self, token: str, bot_username: str,
+                     timeout: Optional[float] = None) -> Optional[Application]:
+        """Application démarrée, ou arrêtée et libérée si la construction échoue, expire
+        (``timeout`` secondes) ou est annulée"""
+        application = init_child_bot(token, bot_username)
+        if not application:
+            return None
+
+        try:
+            await asyncio.wait_for(self._boot(application), timeout=timeout)
+        except BaseException:
+            # Protégé : une seconde annulation n'interrompt pas la libération
+            await asyncio.shield(self._discard(bot_username, application))
+            raise
+        return application
+
+    @staticmethod
+    async def _discard(bot_username: str, application: Application) -> None:
+        try:
+            if application.running:
+                await application.stop()
+            await application.shutdown()
+        except Exception as e:
+            child_logs.logger(bot_username).error(f"Erreur libération bot fils @{bot_username}: {e}")
+
+    async def start(self, token: str, bot_username: str, ingress: str = "polling",
+                    timeout: Optional[float] = None) -> Optional[Application]:
+        """Construit, initialise et enregistre un bot fils; renvoie son Application
+
+        Les démarrages concurrents d'un même bot attendent la même construction.
+        Au-delà de ``timeout`` secondes, l'Application est libérée et
+        ``asyncio.TimeoutError`` est levée.
+        """
+        if bot_username in self._hibernated:
+            return await self.activate(bot_username)
+        if bot_username in self._apps:
+            return self._apps[bot_username]
+        if bot_username in self._starting:
+            return await asyncio.shield(self._starting[bot_username])
+
+        future = asyncio.get_running_loop().create_future()
+        self._starting[bot_username] = future
+        try:
+            application = await self._build(token, bot_username, timeout)
+            if application:
+                self[bot_username] = application
+                if ingress == "webhook":
+                    await self.set_ingress(bot_username, "webhook")
+                self._notify(bot_username, "online")
+                child_logs.logger(bot_username).info(
+                    f"Bot fils @{bot_username} démarré ({len(self._apps)} bots hébergés)"
+                )
+            future.set_result(application)
+            return application
+        except Exception:
+            future.set_result(None)
+            raise
+        finally:
+            del self._starting[bot_username]
+            # Démarrage annulé : les appelants en attente reçoivent None au lieu d'attendre indéfiniment
+            if not future.done():
+                future.set_result(None)
+
+    async def stop(self, bot_username: str, keep_webhook: bool = False) -> bool:
+        """Retire un bot fils de l'hôte et libère ses ressources.
+
+        Un bot en mode webhook est désinscrit (deleteWebhook) pour que Telegram
+        cesse de l'appeler, sauf ``keep_webhook`` (mise en veille).
+        """
+        stub = self._hibernated.pop(bot_username, None)
+        if stub:
+            if stub.ingress == "webhook" and not keep_webhook:
+                await self._drop_webhook(bot_username, stub.bot)
+            self._notify(bot_username, "offline")
+            return True
+
+        application = self._apps.get(bot_username)
+        if application is None:
+            return False
+
+        webhook = self._ingress.get(bot_username) == "webhook"
+        del self[bot_username]
+        if webhook and not keep_webhook:
+            await self._drop_webhook(bot_username, application.bot)
+        try:
+            if application.running:
+                await application.stop()
+            await application.shutdown()
+        except Exception as e:
+            child_logs.logger(bot_username).error(f"Erreur arrêt bot fils @{bot_username}: {e}")
+        # Au prochain démarrage, getUpdates reprend au premier update non traité
+        self._fetched.pop(bot_username, None)
+        self._unprocessed.pop(bot_username, None)
+        self._notify(bot_username, "offline")
+        return True
+
+    @staticmethod
+    async def _drop_webhook(bot_username: str, bot) -> None:
+        try:
+            await bot.delete_webhook()
+        except TelegramError as e:
+            child_logs.logger(bot_username).warning(f"deleteWebhook @{bot_username}: {e}")
+
+    # --- Mise en veille des bots inactifs ---
+
+    def touch(self, bot_username: str) -> None:
+        """Note la réception d'une update (repousse la mise en veille)"""
+        self._last_update[bot_username] = asyncio.get_running_loop().time()
+
+    async def hibernate(self, bot_username: str) -> bool:
+        """Arrête l'Application d'un bot inactif en ne gardant qu'un stub (token + offset)"""
+        application = self._apps.get(bot_username)
+        if application is None:
+            return False
+
+        stub = _HibernatedBot(application.bot.token, self._ingress.get(bot_username, "polling"), application.bot)
+        # Le webhook reste inscrit : le prochain appel de Telegram réactive le bot
+        await self.stop(bot_username, keep_webhook=True)
+        self._hibernated[bot_username] = stub
+        self._notify(bot_username, "hibernating")
+        child_logs.logger(bot_username).info(f"Bot fils @{bot_username} mis en veille")
+        return True
+
+    async def activate(self, bot_username: str) -> Optional[Application]:
+        """Réactive un bot en veille; les appels concurrents attendent la même activation"""
+        if bot_username in self._apps:
+            return self._apps[bot_username]
+        if bot_username in self._activating:
+            return await asyncio.shield(self._activating[bot_username])
+
+        stub = self._hibernated.get(bot_username)
+        if stub is None:
+            return None
+
+        future = asyncio.get_running_loop().create_future()
+        self._activating[bot_username] = future
+        try:
+            application = await self._build(stub.token, bot_username)
+            if application and self._hibernated.pop(bot_username, None):
+                # L'offset est conservé dans self._offsets : aucune update n'est perdue
+                self._register(bot_username, application, stub.ingress)
+                self._notify(bot_username, "online")
+                child_logs.logger(bot_username).info(f"Bot fils @{bot_username} réactivé")
+            elif application:
+                # Le bot a été arrêté pendant la réactivation
+                await application.stop()
+                await application.shutdown()
+                application = None
+            future.set_result(application)
+            return application
+        except Exception as e:
+            child_logs.logger(bot_username).error(f"Erreur réactivation bot fils @{bot_username}: {e}")
+            future.set_result(None)
+            return None
+        finally:
+            del self._activating[bot_username]
+            # Réactivation annulée : les appelants en attente reçoivent None au lieu d'attendre indéfiniment
+            if not future.done():
+                future.set_result(None)
+
+    async def _hibernation_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self._poll_concurrency)
+
+        async def sweep(bot_username: str, stub: _HibernatedBot) -> None:
+            async with slots:
+                try:
+                    # limit=1 sans avancer l'offset : on regarde sans consommer
+                    pending = await stub.bot.get_updates(
+                        offset=self._offsets.get(bot_username), limit=1, timeout=0
+                    )
+                except TelegramError as e:
+                    child_logs.logger(bot_username).warning(f"Balayage @{bot_username}: {e}")
+                    return
+                if pending:
+                    await self.activate(bot_username)
+
+        while self.hibernate_after:
+            await asyncio.sleep(self._hibernation_sweep)
+            now = loop.time()
+            idle = [
+                bot_username for bot_username in list(self._apps)
+                if now - self._last_update.get(bot_username, now) >= self.hibernate_after
+            ]
+            for bot_username in idle:
+                await self.hibernate(bot_username)
+
+            await asyncio.gather(*(
+                sweep(bot_username, stub) for bot_username, stub in list(self._hibernated.items())
+                if stub.ingress == "polling"
+            ))
+
+    # --- Mode de réception des updates (polling / webhook) ---
+
+    def ingress(self, bot_username: str) -> Optional[str]:
+        """Renvoie 'polling', 'webhook' ou None si le bot n'est pas hébergé"""
+        if bot_username in self._hibernated:
+            return self._hibernated[bot_username].ingress
+        return self._ingress.get(bot_username)
+
+    def webhook_secret(self, bot_username: str) -> str:
+        """Secret envoyé par Telegram dans X-Telegram-Bot-Api-Secret-Token"""
+        if bot_username in self._hibernated:
+            token = self._hibernated[bot_username].token
+        else:
+            token = self._apps[bot_username].bot.token
+        return hashlib.sha256(f"{self._webhook_secret}:{token}".encode()).hexdigest()
+
+    async def feed(self, bot_username: str, data: dict) -> bool:
+        """Pousse une update reçue par webhook; False si le bot ne peut pas la recevoir"""
+        # Un bot en veille est réactivé à la première update reçue
+        application = self._apps.get(bot_username) or await self.activate(bot_username)
+        if application is None:
+            return False
+
+        try:
+            update = Update.de_json(data, application.bot)
+        except Exception as e:
+            # Update illisible : acceptée quand même, sinon Telegram la renverrait sans fin
+            child_logs.logger(bot_username).error(f"Update webhook illisible @{bot_username}: {e}")
+            return True
+        if update:
+            self.touch(bot_username)
+            application.update_queue.put_nowait(update)
+        return True
+
+    async def set_ingress(self, bot_username: str, mode: str) -> bool:
+        """Bascule un bot entre la boucle de polling partagée et le webhook"""
+        application = self._apps.get(bot_username)
+        if application is None or mode not in ("polling", "webhook"):
+            return False
+
+        if mode == "webhook":
+            if not self.webhook_url:
+                logger.warning("Mode webhook indisponible : CHILD_BOT_WEBHOOK_URL non configurée")
+                return False
+            if aiohttp_web is None:
+                logger.warning("Mode webhook indisponible : aiohttp n'est pas installé (pip install aiohttp)")
+                return False
+            self._ingress[bot_username] = "webhook"
+            self._due.pop(bot_username, None)
+            try:
+                await application.bot.set_webhook(
+                    url=f"{self.webhook_url}/hook/{bot_username}",
+                    secret_token=self.webhook_secret(bot_username),
+                    allowed_updates=Update.ALL_TYPES,
+                )
+            except TelegramError as e:
+                child_logs.logger(bot_username).error(f"setWebhook @{bot_username}: {e}")
+                self._ingress[bot_username] = "polling"
+                self._schedule(bot_username, 0.0)
+                return False
+        else:
+            try:
+                await application.bot.delete_webhook()
+            except TelegramError as e:
+                child_logs.logger(bot_username).error(f"deleteWebhook @{bot_username}: {e}")
+                return False
+            self._ingress[bot_username] = "polling"
+            self._intervals[bot_username] = 0.0
+            self._schedule(bot_username, 0.0)
+        return True
+
+    # --- Arrêt du processus ---
+
+    OFFSETS_STATE = "child_bot_offsets"
+
+    def load_offsets(self, store) -> int:
+        """Restaure les offsets getUpdates sauvegardés au dernier arrêt"""
+        saved = store.load_state(self.OFFSETS_STATE, {}) or {}
+        for bot_username, offset in saved.items():
+            self._offsets.setdefault(bot_username, int(offset))
+        return len(saved)
+
+    def save_offsets(self, store) -> None:
+        self._offsets_dirty = False
+        store.save_state(self.OFFSETS_STATE, dict(self._offsets))
+
+    def processed(self, bot_username: str, update_id: Optional[int]) -> None:
+        """Note la fin du traitement d'une update récupérée par polling et avance l'offset sauvegardé"""
+        unprocessed = self._unprocessed.get(bot_username)
+        if unprocessed is None or update_id not in unprocessed:
+            return
+        unprocessed.discard(update_id)
+        self._commit_offset(bot_username)
+
+    def _commit_offset(self, bot_username: str) -> None:
+        unprocessed = self._unprocessed.get(bot_username)
+        offset = min(unprocessed) if unprocessed else self._fetched.get(bot_username)
+        if offset is not None and self._offsets.get(bot_username) != offset:
+            self._offsets[bot_username] = offset
+            self._offsets_dirty = True
+
+    def start_offset_flusher(self, store, *housekeeping: Callable[[], object]) -> None:
+        """Sauvegarde périodique des offsets modifiés (une écriture par intervalle).
+
+        Les fonctions ``housekeeping`` (purges...) sont appelées à chaque tour.
+        """
+        async def flush_loop():
+            while True:
+                await asyncio.sleep(self.offset_flush_interval)
+                if self._offsets_dirty:
+                    try:
+                        self.save_offsets(store)
+                    except Exception as e:
+                        self._offsets_dirty = True
+                        logger.error(f"Erreur sauvegarde des offsets: {e}")
+                _run_housekeeping(housekeeping)
+
+        if self._offset_flusher is None or self._offset_flusher.done():
+            self._offset_flusher = asyncio.get_running_loop().create_task(flush_loop())
+
+    def _apply_backlog_policy(self, bot_username: str, updates: List[Update],
+                              saved: Optional[int]) -> List[Update]:
+        """Filtre l'arriéré récupéré au premier polling d'un bot (``saved`` : offset restauré)"""
+        cutoff = datetime.now().timestamp() - self.backlog_max_age if self.backlog_max_age else None
+        kept = []
+        for update in updates:
+            if saved is not None and update.update_id < saved:
+                continue
+            message = update.message or update.edited_message or update.channel_post or update.edited_channel_post
+            if cutoff is not None and message is not None and message.date.timestamp() < cutoff:
+                continue
+            kept.append(update)
+        if len(kept) != len(updates):
+            child_logs.logger(bot_username).info(f"@{bot_username}: {len(updates) - len(kept)} update(s) d'arriéré ignorée(s) au démarrage")
+        return kept
+
+    async def _stop_application(self, bot_username: str, application: Application) -> None:
+        # Application.stop() traite toutes les updates déjà en file avant de rendre la main
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+
+    async def shutdown(self, deadline: float = 10.0) -> dict:
+        """Arrêt coordonné de tous les bots fils.
+
+        Le polling s'arrête d'abord (les getUpdates en cours se terminent pour
+        ne pas laisser d'update hors file), puis chaque Application vide sa
+        file et s'arrête, toutes en parallèle. Les bots encore en cours
+        d'arrêt à ``deadline`` secondes sont abandonnés et signalés.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._closing = True
+        for task in (self._janitor, self._dispatcher, self._offset_flusher):
+            if task:
+                task.cancel()
+        self._janitor = self._dispatcher = self._offset_flusher = None
+
+        if self._polls:
+            await asyncio.wait(list(self._polls), timeout=deadline)
+
+        applications = dict(self._apps)
+        for bot_username in applications:
+            del self[bot_username]
+        self._hibernated.clear()
+
+        report = {"stopped": 0, "failed": {}, "stragglers": [], "elapsed": 0.0}
+        tasks = {
+            loop.create_task(self._stop_application(bot_username, application)): bot_username
+            for bot_username, application in applications.items()
+        }
+        if tasks:
+            remaining = max(deadline - (loop.time() - started), 0.1)
+            done, pending = await asyncio.wait(tasks, timeout=remaining)
+            for task in done:
+                if task.exception():
+                    report["failed"][tasks[task]] = repr(task.exception())
+                else:
+                    report["stopped"] += 1
+            for task in pending:
+                task.cancel()
+                report["stragglers"].append(tasks[task])
+
+        await self.request.close()
+        await self.poll_request.close()
+
+        report["elapsed"] = loop.time() - started
+        if report["stragglers"] or report["failed"]:
+            logger.warning(
+                f"Arrêt des bots fils : {report['stopped']} arrêtés, "
+                f"{len(report['failed'])} en erreur, {len(report['stragglers'])} hors délai "
+                f"({', '.join(report['stragglers'][:20])})"
+            )
+        else:
+            logger.info(f"Arrêt des bots fils : {report['stopped']} arrêtés en {report['elapsed']:.1f}s")
+        return report
+
+    async def close(self) -> None:
+        """Arrête tous les bots fils, la boucle de dispatch et le pool HTTP"""
+        await self.shutdown()
+
+    # --- Boucle de dispatch partagée ---
+
+    def _schedule(self, bot_username: str, delay: float) -> None:
+        if self._closing:
+            return
+        loop = asyncio.get_running_loop()
+        due = loop.time() + delay
+        self._due[bot_username] = due
+        heapq.heappush(self._heap, (due, bot_username))
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch_loop())
+
+    async def _dispatch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self._poll_concurrency)
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            due, bot_username = self._heap[0]
+            delay = due - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            if self._due.get(bot_username) != due:
+                # Entrée périmée (bot arrêté ou reprogrammé entre-temps)
+                continue
+            del self._due[bot_username]
+
+            await slots.acquire()
+            task = loop.create_task(self._poll_once(bot_username))
+            self._polls.add(task)
+            task.add_done_callback(self._polls.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _poll_once(self, bot_username: str) -> None:
+        application = self._apps.get(bot_username)
+        if application is None:
+            return
+
+        first = bot_username not in self._polled
+        saved = self._offsets.get(bot_username)
+        offset = self._fetched.get(bot_username, saved)
+        limit = 100
+        bounded = first and self.backlog_max
+        if bounded:
+            if saved is None:
+                # Offset négatif : Telegram oublie tout sauf les backlog_max dernières updates
+                offset = -self.backlog_max
+            else:
+                # Reprise à l'offset sauvegardé; une update de plus que la borne dit si l'arriéré la dépasse
+                limit = min(self.backlog_max + 1, 100)
+        try:
+            updates = await application.bot.get_updates(
+                offset=offset,
+                timeout=0,
+                limit=limit,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            if bounded and saved is not None and len(updates) == limit:
+                # Lot plein : arriéré au-delà de la borne (ou impossible à vérifier en un lot)
+                updates = await application.bot.get_updates(
+                    offset=-self.backlog_max,
+                    timeout=0,
+                    limit=100,
+                    allowed_updates=Update.ALL_TYPES,
+                )
+        except InvalidToken:
+            child_logs.logger(bot_username).error(f"Token révoqué pour @{bot_username}, bot retiré de l'hôte")
+            await self.stop(bot_username)
+            return
+        except TelegramError as e:
+            child_logs.logger(bot_username).warning(f"getUpdates @{bot_username}: {e}")
+            updates = []
+            first = False
+
+        if updates:
+            self._fetched[bot_username] = updates[-1].update_id + 1
+            self.touch(bot_username)
+        if first:
+            self._polled.add(bot_username)
+            if self.backlog_max or self.backlog_max_age:
+                updates = self._apply_backlog_policy(bot_username, updates, saved)
+        # L'offset sauvegardé n'avance qu'une fois les updates traitées (voir processed)
+        self._unprocessed.setdefault(bot_username, set()).update(update.update_id for update in updates)
+        for update in updates:
+            application.update_queue.put_nowait(update)
+        self._commit_offset(bot_username)
+
+        if self._ingress.get(bot_username) != "polling":
+            return
+        # Un bot actif est réinterrogé immédiatement, un bot inactif de plus en plus rarement
+        interval = 0.0 if updates else min(max(self._intervals.get(bot_username, 0.0) * 2, 1.0), self._idle_poll_max)
+        self._intervals[bot_username] = interval
+        self._schedule(bot_username, interval)
+
+
+class ChildBotWebhookServer:
+    """Serveur HTTP unique recevant les webhooks de tous les bots fils sur /hook/<bot_username>.
+
+    Nécessite aiohttp (dépendance optionnelle, ``pip install aiohttp``) ;
+    sans lui le serveur ne démarre pas et les bots restent en polling.
+    """
+
+    def __init__(self, host, listen: str = "127.0.0.1", port: int = 8443):
+        self.host = host
+        self.listen = listen
+        self.port = port
+        self._runner = None
+
+    async def start(self) -> None:
+        if aiohttp_web is None:
+            logger.error("Webhooks des bots fils désactivés : aiohttp n'est pas installé (pip install aiohttp)")
+            return
+
+        app = aiohttp_web.Application()
+        app.router.add_post("/hook/{bot_username}", self._handle)
+        self._runner = aiohttp_web.AppRunner(app)
+        await self._runner.setup()
+        await aiohttp_web.TCPSite(self._runner, self.listen, self.port).start()
+        logger.info(f"Webhooks des bots fils en écoute sur {self.listen}:{self.port}")
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request):
+        bot_username = request.match_info["bot_username"]
+        if not self.host.hosts(bot_username) or self.host.ingress(bot_username) != "webhook":
+            return aiohttp_web.Response(status=404)
+        # Comparaison à temps constant : le secret ne se devine pas octet par octet
+        secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(secret.encode(), self.host.webhook_secret(bot_username).encode()):
+            return aiohttp_web.Response(status=403)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            return aiohttp_web.Response(status=400)
+
+        if not await self.host.feed(bot_username, data):
+            # Telegram renverra l'update plus tard
+            return aiohttp_web.Response(status=503)
+        return aiohttp_web.Response(status=200)
+
+
+CHILD_BOT_SHARD_ENV = "BOT_LINKING_CHILD_BOT_SHARD"
+
+
+def _run_housekeeping(tasks) -> None:
+    """Tâches périodiques du processus principal : une erreur n'interrompt pas les suivantes"""
+    for task in tasks:
+        try:
+            task()
+        except Exception as e:
+            logger.error(f"Erreur de maintenance périodique ({getattr(task, '__qualname__', task)}): {e}")
+
+
+def _main_process_only(factory):
+    """Singleton du processus principal : un worker de bots fils, qui réimporte ce
+    module, n'a besoin que de son hôte (``child_bots``, ``analytics``, ``child_logs``)
+    et ne construit pas le reste (base SQLite, planificateurs, paiements...)"""
+    return None if CHILD_BOT_SHARD_ENV in os.environ else factory()
+
+
+def _shard_of(bot_username: str, shards) -> int:
+    """Hachage de rendez-vous : seuls les bots d'un worker disparu changent de worker"""
+    return max(shards, key=lambda shard: hashlib.sha1(f"{shard}:{bot_username}".encode()).digest())
+
+
+class _SupervisorStore:
+    """Côté worker : ``store`` de l'analytique, écrit par le superviseur dans sa base.
+
+    Chaque ``save_state`` est poussé au superviseur ; les lectures sont servies
+    par les états qu'il envoie avec chaque bot avant de le démarrer.
+    """
+
+    def __init__(self, send):
+        self._send = send
+        self._states: Dict[str, object] = {}
+
+    def load_state(self, key: str, default=None):
+        return self._states.get(key, default)
+
+    def save_state(self, key: str, value) -> None:
+        if value is None:
+            self._states.pop(key, None)
+        else:
+            self._states[key] = value
+        self._send((None, "save_state", (key, value)))
+
+    def preload(self, states: Dict[str, object]) -> None:
+        for key, value in states.items():
+            if value is not None:
+                self._states.setdefault(key, value)
+
+
+class _ShardWorker:
+    """Côté worker : exécute les commandes du superviseur sur le ``child_bots`` local.
+
+    Messages reçus : ``(request_id, méthode, args)`` ; réponses :
+    ``(request_id, ok, résultat)``. Les changements de statut des bots sont
+    poussés avec ``request_id`` à None.
+    """
+
+    def __init__(self, conn, shard: int):
+        self.conn = conn
+        self.shard = shard
+        self._stopped: Optional[asyncio.Event] = None
+
+    def _send(self, message) -> None:
+        try:
+            self.conn.send(message)
+        except (BrokenPipeError, OSError):
+            # Superviseur disparu : le worker s'arrête à la prochaine lecture
+            pass
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        child_bots.on_status = lambda bot_username, status: self._send((None, "status", (bot_username, status)))
+        loop.add_reader(self.conn.fileno(), self._on_readable)
+        analytics.bind(_SupervisorStore(self._send))
+        analytics.start(child_bots)
+        child_logs.start()
+        logger.info(f"Worker de bots fils #{self.shard} démarré (pid {os.getpid()})")
+        try:
+            await self._stopped.wait()
+        finally:
+            loop.remove_reader(self.conn.fileno())
+
+    def _on_readable(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            request_id, method, args = self.conn.recv()
+        except (EOFError, OSError):
+            loop.remove_reader(self.conn.fileno())
+            loop.create_task(self._orphaned())
+            return
+        loop.create_task(self._execute(request_id, method, args))
+
+    async def _execute(self, request_id: int, method: str, args: tuple) -> None:
+        try:
+            result = await getattr(self, f"do_{method}")(*args)
+            self._send((request_id, True, result))
+        except Exception as e:
+            self._send((request_id, False, repr(e)))
+        if method == "shutdown":
+            self._stopped.set()
+
+    async def _orphaned(self) -> None:
+        logger.warning(f"Worker de bots fils #{self.shard} : superviseur disparu, arrêt")
+        await child_bots.shutdown()
+        await analytics.close()
+        await child_logs.shutdown()
+        self._stopped.set()
+
+    async def do_start(self, token: str, bot_username: str, ingress: str,
+                       timeout: Optional[float] = None) -> bool:
+        return await child_bots.start(token, bot_username, ingress=ingress, timeout=timeout) is not None
+
+    async def do_stop(self, bot_username: str) -> bool:
+        return await child_bots.stop(bot_username)
+
+    async def do_set_ingress(self, bot_username: str, mode: str) -> bool:
+        return await child_bots.set_ingress(bot_username, mode)
+
+    async def do_feed(self, bot_username: str, data: dict) -> bool:
+        return await child_bots.feed(bot_username, data)
+
+    async def do_load_offsets(self, offsets: Dict[str, int]) -> int:
+        for bot_username, offset in offsets.items():
+            child_bots._offsets.setdefault(bot_username, int(offset))
+        return len(offsets)
+
+    async def do_load_states(self, states: Dict[str, object]) -> int:
+        analytics.store.preload(states)
+        return len(states)
+
+    async def do_analytics(self, bot_username: str) -> Optional[dict]:
+        return analytics.summary(bot_username)
+
+    async def do_logs(self, bot_username: str, limit: int) -> List[str]:
+        return child_logs.tail(bot_username, limit)
+
+    async def do_flush_logs(self) -> None:
+        await child_logs.flush_to_disk()
+
+    async def do_forget(self, bot_username: str) -> None:
+        await child_bots.forget(bot_username)
+
+    async def do_offsets(self) -> Dict[str, int]:
+        return dict(child_bots._offsets)
+
+    async def do_shutdown(self, deadline: float) -> dict:
+        report = await child_bots.shutdown(deadline)
+        await analytics.close()
+        await child_logs.shutdown()
+        report["offsets"] = dict(child_bots._offsets)
+        return report
+
+
+def _shard_worker_main(conn, shard: int) -> None:
+    """Point d'entrée d'un processus worker (lancé par ``ShardedChildBotHost``)"""
+    logging.basicConfig(
+        format=f"%(asctime)s - worker#{shard} - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO,
+    )
+    asyncio.run(_ShardWorker(conn, shard).run())
+
+
+class ShardedChildBotHost:
+    """Répartit les bots fils sur ``shards`` processus workers.
+
+    Chaque worker fait tourner son propre ``ChildBotHost`` (pool HTTP, boucle
+    de polling, mise en veille) ; le superviseur, dans le processus principal,
+    choisit le worker d'un bot par hachage de rendez-vous sur son username et
+    lui transmet les commandes par un ``multiprocessing.Pipe`` lu depuis la
+    boucle asyncio. Il garde une copie locale (token, mode, worker, statut)
+    pour répondre sans aller-retour à ``in``, ``status`` et ``ingress``.
+
+    Quand un worker meurt, ses bots sont redémarrés sur les workers restants
+    (depuis leur dernier offset connu) puis le worker est relancé ; les
+    nouveaux bots s'y répartissent à nouveau. Expose la même interface
+    asynchrone que ``ChildBotHost`` pour les handlers.
+    """
+
+    OFFSETS_STATE = ChildBotHost.OFFSETS_STATE
+
+    def __init__(self, shards: int, webhook_url: Optional[str] = None, webhook_secret: str = "",
+                 call_timeout: float = 60.0, offset_flush_interval: float = 5.0,
+                 respawn_delay: float = 1.0):
+        self.shards = shards
+        self.webhook_url = webhook_url.rstrip("/") if webhook_url else None
+        self._webhook_secret = webhook_secret
+        self.call_timeout = call_timeout
+        self.offset_flush_interval = offset_flush_interval
+        self.respawn_delay = respawn_delay
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, tuple] = {}
+        self._pending: Dict[int, Tuple[int, asyncio.Future]] = {}
+        self._request_ids = itertools.count(1)
+        self._bots: Dict[str, dict] = {}
+        self._offsets: Dict[str, int] = {}
+        self._offsets_dirty = False
+        self._offset_flusher: Optional[asyncio.Task] = None
+        self._rebalancing: set = set()
+        self._closing = False
+
+    # --- Interface de lecture (copie locale, sans IPC) ---
+
+    def __contains__(self, bot_username) -> bool:
+        return bot_username in self._bots
+
+    def hosts(self, bot_username: str) -> bool:
+        """Vrai si le bot est hébergé par un worker, en ligne ou en veille"""
+        return bot_username in self._bots
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._bots)
+
+    def __len__(self) -> int:
+        return len(self._bots)
+
+    def status(self, bot_username: str) -> str:
+        """Renvoie 'online', 'hibernating' ou 'offline' (tel que poussé par les workers)"""
+        bot = self._bots.get(bot_username)
+        return bot["status"] if bot else "offline"
+
+    def ingress(self, bot_username: str) -> Optional[str]:
+        bot = self._bots.get(bot_username)
+        return bot["ingress"] if bot else None
+
+    def webhook_secret(self, bot_username: str) -> str:
+        return hashlib.sha256(f"{self._webhook_secret}:{self._bots[bot_username]['token']}".encode()).hexdigest()
+
+    def shard_of(self, bot_username: str) -> Optional[int]:
+        bot = self._bots.get(bot_username)
+        return bot["shard"] if bot else None
+
+    # --- Processus workers ---
+
+    def _spawn(self, shard: int) -> None:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_shard_worker_main, args=(child_conn, shard),
+            name=f"child-bots-{shard}", daemon=True,
+        )
+        # Le worker réimporte ce module : la variable lui fait créer un ChildBotHost local
+        os.environ[CHILD_BOT_SHARD_ENV] = str(shard)
+        try:
+            process.start()
+        finally:
+            os.environ.pop(CHILD_BOT_SHARD_ENV, None)
+        child_conn.close()
+        self._workers[shard] = (process, parent_conn)
+        asyncio.get_running_loop().add_reader(parent_conn.fileno(), self._on_readable, shard)
+        logger.info(f"Worker de bots fils #{shard} lancé (pid {process.pid})")
+
+    def _ensure_workers(self) -> None:
+        if self._closing:
+            raise RuntimeError("hôte des bots fils en cours d'arrêt")
+        for shard in range(self.shards):
+            if shard not in self._workers and shard not in self._rebalancing:
+                self._spawn(shard)
+
+    def _on_readable(self, shard: int) -> None:
+        process, conn = self._workers[shard]
+        try:
+            request_id, ok, result = conn.recv()
+        except (EOFError, OSError):
+            self._worker_lost(shard)
+            return
+
+        if request_id is None:
+            # Événement poussé par le worker
+            if ok == "status":
+                bot_username, status = result
+                bot = self._bots.get(bot_username)
+                if bot and bot["shard"] == shard:
+                    bot["status"] = status
+            elif ok == "save_state":
+                # Statistiques agrégées par le worker : écrites dans la base du superviseur
+                key, value = result
+                try:
+                    analytics.store.save_state(key, value)
+                except Exception as e:
+                    logger.error(f"Sauvegarde de {key} pour le worker #{shard} impossible: {e}")
+            return
+
+        entry = self._pending.pop(request_id, None)
+        if entry and not entry[1].done():
+            if ok:
+                entry[1].set_result(result)
+            else:
+                entry[1].set_exception(RuntimeError(f"worker #{shard}: {result}"))
+
+    async def _call(self, shard: int, method: str, *args):
+        worker = self._workers.get(shard)
+        if worker is None:
+            raise ConnectionError(f"worker #{shard} indisponible")
+
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = (shard, future)
+        try:
+            try:
+                worker[1].send((request_id, method, args))
+            except OSError as e:
+                raise ConnectionError(f"worker #{shard}: {e}") from e
+            return await asyncio.wait_for(future, timeout=self.call_timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    def _worker_lost(self, shard: int) -> None:
+        process, conn = self._workers.pop(shard)
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(conn.fileno())
+        conn.close()
+        for request_id, (owner, future) in list(self._pending.items()):
+            if owner == shard and not future.done():
+                future.set_exception(ConnectionError(f"worker #{shard} arrêté"))
+        if self._closing:
+            return
+
+        self._rebalancing.add(shard)
+        loop.create_task(self._rebalance(shard, process))
+
+    async def _rebalance(self, dead: int, process) -> None:
+        """Redémarre les bots d'un worker disparu sur les autres, puis relance le worker"""
+        try:
+            # Le pipe se ferme à la mort du processus : le code de sortie suit de près
+            # (attendu hors de la boucle pour ne pas bloquer les autres workers)
+            await asyncio.get_running_loop().run_in_executor(None, process.join, 1.0)
+            logger.error(f"Worker de bots fils #{dead} arrêté (code {process.exitcode}), rééquilibrage")
+            orphans = [bot_username for bot_username, bot in self._bots.items() if bot["shard"] == dead]
+            if not self._workers:
+                # Plus aucun worker vivant : on relance d'abord celui-ci
+                await asyncio.sleep(self.respawn_delay)
+                self._rebalancing.discard(dead)
+                self._ensure_workers()
+            moved = await asyncio.gather(*(self._restart_elsewhere(bot_username) for bot_username in orphans))
+            logger.info(f"Rééquilibrage du worker #{dead} : {sum(moved)}/{len(orphans)} bots redémarrés")
+            await asyncio.sleep(self.respawn_delay)
+        finally:
+            self._rebalancing.discard(dead)
+        if not self._closing and dead not in self._workers:
+            self._spawn(dead)
+
+    async def _restart_elsewhere(self, bot_username: str) -> bool:
+        bot = self._bots.get(bot_username)
+        if bot is None:
+            return False
+        shard = _shard_of(bot_username, list(self._workers))
+        bot["shard"] = shard
+        bot["status"] = "offline"
+        try:
+            await self._preload(shard, bot_username)
+            if await self._call(shard, "start", bot["token"], bot_username, bot["ingress"]):
+                bot["status"] = "online"
+                return True
+        except Exception as e:
+            logger.error(f"Redémarrage de @{bot_username} sur le worker #{shard} impossible: {e}")
+        return False
+
+    # --- Cycle de vie des bots fils ---
+
+    async def _preload(self, shard: int, bot_username: str) -> None:
+        """Envoie au worker l'offset et les statistiques sauvegardés du bot avant son démarrage"""
+        if bot_username in self._offsets:
+            await self._call(shard, "load_offsets", {bot_username: self._offsets[bot_username]})
+        key = f"{AnalyticsPipeline.STATE_PREFIX}{bot_username}"
+        await self._call(shard, "load_states", {key: analytics.store.load_state(key, None)})
+
+    async def start(self, token: str, bot_username: str, ingress: str = "polling",
+                    timeout: Optional[float] = None) -> bool:
+        """Démarre un bot fils sur son worker; renvoie True s'il tourne
+
+        ``timeout`` est appliqué dans le worker, qui libère lui-même un bot trop lent.
+        """
+        self._ensure_workers()
+        bot = self._bots.get(bot_username)
+        if bot and bot["shard"] in self._workers:
+            return True
+
+        shard = _shard_of(bot_username, list(self._workers))
+        await self._preload(shard, bot_username)
+        if not await self._call(shard, "start", token, bot_username, ingress, timeout):
+            return False
+        self._bots[bot_username] = {"token": token, "ingress": ingress, "shard": shard, "status": "online"}
+        return True
+
+    async def stop(self, bot_username: str) -> bool:
+        bot = self._bots.pop(bot_username, None)
+        if bot is None:
+            return False
+        self._offsets.pop(bot_username, None)
+        try:
+            return await self._call(bot["shard"], "stop", bot_username)
+        except ConnectionError:
+            # Worker mort : le bot est déjà arrêté
+            return True
+
+    async def set_ingress(self, bot_username: str, mode: str) -> bool:
+        bot = self._bots.get(bot_username)
+        if bot is None:
+            return False
+        if await self._call(bot["shard"], "set_ingress", bot_username, mode):
+            bot["ingress"] = mode
+            return True
+        return False
+
+    async def analytics(self, bot_username: str) -> Optional[dict]:
+        """Résumé d'analytique, demandé au worker qui héberge le bot"""
+        bot = self._bots.get(bot_username)
+        if bot is None:
+            return None
+        try:
+            return await self._call(bot["shard"], "analytics", bot_username)
+        except ConnectionError:
+            return None
+
+    async def logs(self, bot_username: str, limit: int = 20) -> List[str]:
+        bot = self._bots.get(bot_username)
+        if bot is None:
+            return child_logs.tail(bot_username, limit)
+        try:
+            return await self._call(bot["shard"], "logs", bot_username, limit)
+        except ConnectionError:
+            return []
+
+    async def log_files(self, bot_username: str) -> List[str]:
+        """Les fichiers sont partagés : seul le vidage passe par le worker du bot"""
+        bot = self._bots.get(bot_username)
+        if bot is not None:
+            try:
+                await self._call(bot["shard"], "flush_logs")
+            except ConnectionError:
+                pass
+        return child_logs.files(bot_username)
+
+    async def forget(self, bot_username: str) -> None:
+        """Diffusé à tous les workers : celui qui a agrégé le bot (éventuellement avant un
+        rééquilibrage) ne doit pas réécrire ``analytics:<bot>`` à sa prochaine sauvegarde ;
+        la base n'est effacée qu'ensuite, après les dernières sauvegardes relayées"""
+        child_logs.forget(bot_username)
+        results = await asyncio.gather(
+            *(self._call(shard, "forget", bot_username) for shard in list(self._workers)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Oubli des statistiques de @{bot_username} : {result}")
+        analytics.forget(bot_username)
+
+    async def feed(self, bot_username: str, data: dict) -> bool:
+        bot = self._bots.get(bot_username)
+        if bot is None:
+            return False
+        try:
+            return await self._call(bot["shard"], "feed", bot_username, data)
+        except ConnectionError:
+            return False
+
+    # --- Offsets ---
+
+    def load_offsets(self, store) -> int:
+        saved = store.load_state(self.OFFSETS_STATE, {}) or {}
+        for bot_username, offset in saved.items():
+            self._offsets.setdefault(bot_username, int(offset))
+        return len(saved)
+
+    def save_offsets(self, store) -> None:
+        self._offsets_dirty = False
+        store.save_state(self.OFFSETS_STATE, dict(self._offsets))
+
+    async def _collect_offsets(self) -> None:
+        results = await asyncio.gather(
+            *(self._call(shard, "offsets") for shard in list(self._workers)), return_exceptions=True
+        )
+        for offsets in results:
+            if isinstance(offsets, dict):
+                for bot_username, offset in offsets.items():
+                    if bot_username in self._bots and self._offsets.get(bot_username) != offset:
+                        self._offsets[bot_username] = offset
+                        self._offsets_dirty = True
+
+    def start_offset_flusher(self, store, *housekeeping: Callable[[], object]) -> None:
+        """Récupère périodiquement les offsets des workers et les sauvegarde s'ils ont changé,
+        puis appelle les fonctions ``housekeeping``"""
+        async def flush_loop():
+            while True:
+                await asyncio.sleep(self.offset_flush_interval)
+                await self._collect_offsets()
+                if self._offsets_dirty:
+                    try:
+                        self.save_offsets(store)
+                    except Exception as e:
+                        self._offsets_dirty = True
+                        logger.error(f"Erreur sauvegarde des offsets: {e}")
+                _run_housekeeping(housekeeping)
+
+        if self._offset_flusher is None or self._offset_flusher.done():
+            self._offset_flusher = asyncio.get_running_loop().create_task(flush_loop())
+
+    # --- Arrêt ---
+
+    async def shutdown(self, deadline: float = 10.0) -> dict:
+        """Arrête tous les workers en parallèle (chacun applique ``ChildBotHost.shutdown``)"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._closing = True
+        if self._offset_flusher:
+            self._offset_flusher.cancel()
+            self._offset_flusher = None
+
+        workers = dict(self._workers)
+        shards = list(workers)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self._call(shard, "shutdown", deadline), timeout=deadline + 2.0) for shard in shards),
+            return_exceptions=True,
+        )
+
+        report = {"stopped": 0, "failed": {}, "stragglers": [], "elapsed": 0.0}
+        for shard, result in zip(shards, results):
+            if isinstance(result, dict):
+                report["stopped"] += result["stopped"]
+                report["failed"].update(result["failed"])
+                report["stragglers"].extend(result["stragglers"])
+                self._offsets.update(result.get("offsets", {}))
+            else:
+                report["stragglers"].extend(
+                    bot_username for bot_username, bot in self._bots.items() if bot["shard"] == shard
+                )
+
+        for shard, (process, conn) in workers.items():
+            # Un worker qui a répondu ferme son pipe : _worker_lost l'a peut-être déjà retiré
+            if self._workers.pop(shard, None):
+                loop.remove_reader(conn.fileno())
+                conn.close()
+            await loop.run_in_executor(None, process.join, 2.0)
+            if process.is_alive():
+                logger.warning(f"Worker de bots fils #{shard} ne répond plus, terminaison forcée")
+                process.terminate()
+        self._bots.clear()
+
+        report["elapsed"] = loop.time() - started
+        logger.info(
+            f"Arrêt des workers de bots fils : {report['stopped']} bots arrêtés, "
+            f"{len(report['failed'])} en erreur, {len(report['stragglers'])} hors délai "
+            f"en {report['elapsed']:.1f}s"
+        )
+        return report
+
+    async def close(self) -> None:
+        await self.shutdown()
+
+
+_child_bot_shards = getattr(config, "CHILD_BOT_SHARDS", 0)
+if _child_bot_shards and _child_bot_shards > 1 and CHILD_BOT_SHARD_ENV not in os.environ:
+    child_bots = ShardedChildBotHost(
+        _child_bot_shards,
+        webhook_url=getattr(config, "CHILD_BOT_WEBHOOK_URL", None),
+        webhook_secret=getattr(config, "CHILD_BOT_WEBHOOK_SECRET", ""),
+        call_timeout=getattr(config, "CHILD_BOT_SHARD_CALL_TIMEOUT", 60.0),
+        offset_flush_interval=getattr(config, "CHILD_BOT_OFFSET_FLUSH_INTERVAL", 5.0),
+    )
+else:
+    child_bots = ChildBotHost(
+        pool_size=getattr(config, "CHILD_BOT_POOL_SIZE", 64),
+        poll_concurrency=getattr(config, "CHILD_BOT_POLL_CONCURRENCY", 32),
+        idle_poll_max=getattr(config, "CHILD_BOT_IDLE_POLL_MAX", 2.0),
+        webhook_url=getattr(config, "CHILD_BOT_WEBHOOK_URL", None),
+        webhook_secret=getattr(config, "CHILD_BOT_WEBHOOK_SECRET", ""),
+        hibernate_after=getattr(config, "CHILD_BOT_HIBERNATE_AFTER", None),
+        hibernation_sweep=getattr(config, "CHILD_BOT_HIBERNATION_SWEEP", 60.0),
+        backlog_max=getattr(config, "CHILD_BOT_BACKLOG_MAX", None),
+        backlog_max_age=getattr(config, "CHILD_BOT_BACKLOG_MAX_AGE", None),
+        offset_flush_interval=getattr(config, "CHILD_BOT_OFFSET_FLUSH_INTERVAL", 5.0),
+    )
+child_bot_webhooks = _main_process_only(lambda: ChildBotWebhookServer(
+    child_bots,
+    listen=getattr(config, "CHILD_BOT_WEBHOOK_LISTEN", "127.0.0.1"),
+    port=getattr(config, "CHILD_BOT_WEBHOOK_PORT", 8443),
+))
+
+
+class DeletionScheduler:
+    """Suppressions de bots programmées, persistées et exécutées à échéance.
+
+    Les échéances sont gardées dans un tas ``(échéance, clé)`` ; une
+    annulation retire seulement l'entrée du dictionnaire et l'élément du tas
+    est ignoré quand il remonte. Les entrées sont clés par
+    ``(user_id, bot_username)`` ; chacune est sauvegardée sous son propre
+    nom d'état (``pending_deletion:<user_id>:<bot_username>``), si bien
+    qu'une programmation ou une annulation n'écrit qu'une entrée. Elles sont
+    rechargées au démarrage par préfixe. Une seule tâche dort jusqu'à la
+    prochaine échéance et traite ensemble toutes les suppressions dues.
+
+    Une suppression qui échoue reste persistée et est reprogrammée après
+    ``retry_delay`` secondes, délai doublé à chaque échec (au plus
+    ``retry_max``) ; l'entrée n'est effacée qu'une fois le bot supprimé. Un
+    échec de la notification au propriétaire ne compte pas comme un échec.
+    """
+
+    STATE_PREFIX = "pending_deletion:"
+    LEGACY_STATE_NAME = "pending_deletions"
+
+    def __init__(self, store, batch_size: int = 50, retry_delay: float = 60.0, retry_max: float = 3600.0):
+        self.store = store
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.retry_max = retry_max
+        self.bot = None
+        self._entries: Dict[Tuple[int, str], dict] = {}
+        # Index user_id -> bots dont la suppression est programmée (pour /cancel_deletion)
+        self._by_user: Dict[int, set] = {}
+        self._heap: List[Tuple[float, Tuple[int, str]]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __contains__(self, key: Tuple[int, str]) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _set(self, key: Tuple[int, str], entry: dict) -> None:
+        self._entries[key] = entry
+        self._by_user.setdefault(key[0], set()).add(key[1])
+
+    def _drop(self, key: Tuple[int, str]) -> Optional[dict]:
+        entry = self._entries.pop(key, None)
+        bots = self._by_user.get(key[0])
+        if bots is not None:
+            bots.discard(key[1])
+            if not bots:
+                del self._by_user[key[0]]
+        return entry
+
+    def _persist(self, key: Tuple[int, str]) -> None:
+        """Sauvegarde une seule entrée (``None`` si elle n'existe plus)"""
+        entry = self._entries.get(key)
+        self.store.save_state(
+            f"{self.STATE_PREFIX}{key[0]}:{key[1]}",
+            [entry["due"], entry.get("chat_id"), entry.get("attempts", 0)] if entry else None,
+        )
+
+    def recover(self) -> int:
+        """Recharge les suppressions persistées, y compris celles déjà échues"""
+        self._entries.clear()
+        self._by_user.clear()
+        self._heap.clear()
+        for name, (due, chat_id, *attempts) in self.store.load_states(self.STATE_PREFIX).items():
+            user_id, bot_username = name[len(self.STATE_PREFIX):].split(":", 1)
+            self._set((int(user_id), bot_username), {
+                "due": due, "chat_id": chat_id, "attempts": attempts[0] if attempts else 0,
+            })
+        # Ancien format : toute la liste sous un seul nom, convertie une fois
+        legacy = self.store.load_state(self.LEGACY_STATE_NAME, None)
+        if legacy:
+            for user_id, bot_username, due, chat_id in legacy:
+                key = (int(user_id), bot_username)
+                if key not in self._entries:
+                    self._set(key, {"due": due, "chat_id": chat_id})
+                self._persist(key)
+            self.store.save_state(self.LEGACY_STATE_NAME, None)
+        self._heap = [(entry["due"], key) for key, entry in self._entries.items()]
+        heapq.heapify(self._heap)
+        return len(self._entries)
+
+    def schedule(self, user_id: int, bot_username: str, when: datetime, chat_id: Optional[int] = None) -> None:
+        key = (user_id, bot_username)
+        due = when.timestamp()
+        self._set(key, {"due": due, "chat_id": chat_id})
+        heapq.heappush(self._heap, (due, key))
+        self._persist(key)
+        self._wakeup.set()
+
+    def cancel(self, user_id: int, bot_username: str) -> bool:
+        key = (user_id, bot_username)
+        if self._drop(key) is None:
+            return False
+        self._persist(key)
+        return True
+
+    def due_time(self, user_id: int, bot_username: str) -> Optional[datetime]:
+        entry = self._entries.get((user_id, bot_username))
+        return datetime.fromtimestamp(entry["due"]) if entry else None
+
+    def pending_for(self, user_id: int) -> List[str]:
+        """Bots de l'utilisateur dont la suppression est programmée"""
+        return sorted(self._by_user.get(user_id, ()))
+
+    def _pop_due(self, now: float) -> List[Tuple[Tuple[int, str], dict]]:
+        batch = []
+        while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+            due, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            # Entrée annulée ou reprogrammée depuis : l'élément du tas est périmé
+            if entry is None or entry["due"] != due:
+                continue
+            self._drop(key)
+            batch.append((key, entry))
+        return batch
+
+    async def _delete(self, user_id: int, bot_username: str, chat_id: Optional[int]) -> None:
+        if child_bots.hosts(bot_username):
+            await child_bots.stop(bot_username)
+        db.delete_user_bot(user_id, bot_username)
+        await child_bots.forget(bot_username)
+        logger.info(f"Bot {bot_username} supprimé pour l'utilisateur {user_id}")
+
+        if chat_id and self.bot is not None:
+            try:
+                lang = db.get_user_language(user_id) or 'fr'
+                await self.bot.send_message(
+                    chat_id, f"✅ {get_text(lang, 'bot_deleted_permanently')}\n\n🤖 @{bot_username}"
+                )
+            except Exception as e:
+                # Le bot est supprimé : seule la notification est perdue
+                logger.warning(f"Notification de suppression de @{bot_username} à {user_id} impossible: {e}")
+
+    def _retry(self, key: Tuple[int, str], entry: dict) -> float:
+        """Reprogramme une suppression échouée ; renvoie le délai avant le prochain essai"""
+        attempts = entry.get("attempts", 0) + 1
+        delay = min(self.retry_delay * 2 ** (attempts - 1), self.retry_max)
+        due = time.time() + delay
+        self._set(key, {**entry, "due": due, "attempts": attempts})
+        heapq.heappush(self._heap, (due, key))
+        return delay
+
+    async def run_due(self) -> int:
+        """Exécute toutes les suppressions échues, par lots; renvoie le nombre de bots supprimés"""
+        done = 0
+        while True:
+            batch = self._pop_due(time.time())
+            if not batch:
+                break
+            results = await asyncio.gather(
+                *(self._delete(user_id, bot_username, entry.get("chat_id"))
+                  for (user_id, bot_username), entry in batch),
+                return_exceptions=True
+            )
+            for (key, entry), result in zip(batch, results):
+                if not isinstance(result, Exception):
+                    done += 1
+                elif key not in self._entries:
+                    delay = self._retry(key, entry)
+                    logger.error(
+                        f"Erreur suppression programmée @{key[1]} ({key[0]}), "
+                        f"nouvel essai dans {delay:.0f}s: {result}"
+                    )
+                # Effacée une fois exécutée, réécrite si reprogrammée (échec ou nouvelle demande)
+                self._persist(key)
+        return done
+
+    async def _run(self) -> None:
+        while True:
+            # Sommet du tas nettoyé des entrées annulées pour ne pas se réveiller pour rien
+            while self._heap and self._entries.get(self._heap[0][1], {}).get("due") != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            delay = self._heap[0][0] - time.time() if self._heap else None
+            if delay is None or delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error(f"Erreur dans le planificateur de suppressions: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def start(self, bot=None) -> None:
+        if bot is not None:
+            self.bot = bot
+        if self._task is None:
+            recovered = self.recover()
+            if recovered:
+                logger.info(f"{recovered} suppression(s) de bot programmée(s) restaurée(s)")
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class ViolationAggregator:
+    """Regroupe les violations de limites en résumés périodiques.
+
+    ``record`` ne fait qu'ajouter l'événement à un tampon borné
+    (``max_buffer`` événements, les plus anciens sont abandonnés au-delà).
+    Un résumé groupé par ``(vtype, plan)`` est envoyé au propriétaire du Bot
+    PDG et à son canal de logs toutes les ``flush_interval`` secondes, ou
+    dès que ``flush_count`` événements sont en attente. Les événements sont
+    archivés en JSON lignes dans ``archive_path``, fichier en ajout seul
+    tourné à ``max_bytes`` avec ``backups`` copies.
+    """
+
+    def __init__(self, archive_path: str, flush_interval: float = 60.0, flush_count: int = 100,
+                 max_buffer: int = 5000, max_bytes: int = 5 * 1024 * 1024, backups: int = 5):
+        self.archive_path = archive_path
+        self.flush_interval = flush_interval
+        self.flush_count = flush_count
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.bot = None
+        self._buffer: deque = deque(maxlen=max_buffer)
+        self._dropped = 0
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {"recorded": 0, "digests": 0, "archived": 0, "dropped": 0}
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def record(self, vtype: str, user_id: int, plan: str) -> None:
+        if len(self._buffer) == self._buffer.maxlen:
+            self._dropped += 1
+            self.metrics["dropped"] += 1
+        self._buffer.append({"type": vtype, "timestamp": time.time(), "user_id": user_id, "plan": plan})
+        self.metrics["recorded"] += 1
+        if len(self._buffer) >= self.flush_count:
+            self._full.set()
 
-from typing import Dict
-from datetime import datetime, timedelta
+    @staticmethod
+    def digest(events: List[dict], dropped: int = 0) -> str:
+        """Texte HTML du résumé : une ligne par (type, plan) avec quelques utilisateurs"""
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for event in events:
+            groups.setdefault((event["type"], event["plan"]), []).append(event["user_id"])
+
+        start = datetime.fromtimestamp(events[0]["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+        end = datetime.fromtimestamp(events[-1]["timestamp"]).strftime("%H:%M:%S")
+        lines = [f"📊 <b>Violations</b> {start} → {end} — {len(events)} événement(s)"]
+        for (vtype, plan), user_ids in sorted(groups.items(), key=lambda item: -len(item[1])):
+            distinct = list(dict.fromkeys(user_ids))
+            sample = ", ".join(f"<code>{user_id}</code>" for user_id in distinct[:5])
+            more = "…" if len(distinct) > 5 else ""
+            lines.append(f"[{vtype}] {plan} : {len(user_ids)} dépassement(s), {len(distinct)} utilisateur(s) — {sample}{more}")
+        if dropped:
+            lines.append(f"⚠️ {dropped} événement(s) non conservé(s) (tampon plein)")
+        return "\n".join(lines)
+
+    def _rotate(self) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.archive_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.archive_path}.{index + 1}")
+        if self.backups:
+            os.replace(self.archive_path, f"{self.archive_path}.1")
+        else:
+            os.remove(self.archive_path)
+
+    def _archive(self, events: List[dict]) -> None:
+        directory = os.path.dirname(self.archive_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.archive_path) and os.path.getsize(self.archive_path) >= self.max_bytes:
+            self._rotate()
+        with open(self.archive_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(event, ensure_ascii=False) + "\n" for event in events))
+
+    async def flush(self) -> int:
+        """Envoie le résumé des événements en attente et les archive; renvoie leur nombre"""
+        self._full.clear()
+        if not self._buffer:
+            return 0
+        events = list(self._buffer)
+        self._buffer.clear()
+        dropped, self._dropped = self._dropped, 0
 
-from utils.memory_full import db
-from utils.api_client import sync_validate_bot_token
-from utils.user_features import get_welcome_message
-from config import config
-from utils.keyboards import KeyboardManager
-from utils.menu_utils import show_main_menu
-from utils.security import SecurityManager
-from handlers.subscriptions import PLANS, get_user_plan, get_plan_limits # Import from subscriptions.py
-from modepay import PaymentProcessor
+        try:
+            await asyncio.to_thread(self._archive, events)
+            self.metrics["archived"] += len(events)
+        except OSError as e:
+            logger.error(f"Erreur archivage des violations: {e} [ERR_BLM_016]")
+
+        pdg = db.pdg_config
+        if self.bot is not None and pdg and pdg.get("is_active"):
+            text = self.digest(events, dropped)
+            for chat_id in (pdg.get("owner"), pdg.get("log_channel")):
+                if not chat_id:
+                    continue
+                try:
+                    await self.bot.send_message(chat_id, text, parse_mode="HTML")
+                except TelegramError as e:
+                    logger.error(f"Erreur envoi du résumé des violations à {chat_id}: {e} [ERR_BLM_016]")
+            self.metrics["digests"] += 1
+        return len(events)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erreur dans log_violation: {e} [ERR_BLM_016]", exc_info=True)
+
+    def start(self, bot=None) -> None:
+        if bot is not None:
+            self.bot = bot
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        """Arrête la tâche périodique et vide le tampon une dernière fois"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+violations = _main_process_only(lambda: ViolationAggregator(
+    getattr(config, "VIOLATION_LOG_PATH", "logs/violations.log"),
+    flush_interval=getattr(config, "VIOLATION_DIGEST_INTERVAL", 60.0),
+    flush_count=getattr(config, "VIOLATION_DIGEST_COUNT", 100),
+    max_buffer=getattr(config, "VIOLATION_BUFFER_SIZE", 5000),
+    max_bytes=getattr(config, "VIOLATION_LOG_MAX_BYTES", 5 * 1024 * 1024),
+    backups=getattr(config, "VIOLATION_LOG_BACKUPS", 5),
+))
+
+
+EV_IN, EV_OUT = 1, 2
+
+
+class UserSketch:
+    """Estimation HyperLogLog du nombre d'utilisateurs distincts d'un bot.
+
+    Taille fixe (``2**precision`` registres d'un octet, 1 Ko par défaut pour
+    ~3 % d'erreur) quel que soit le nombre d'utilisateurs. ``add`` renvoie
+    l'accroissement de l'estimation : les nouveaux utilisateurs d'un
+    compartiment s'additionnent sans garder d'identifiants.
+    """
+
+    _MASK = (1 << 64) - 1
+
+    def __init__(self, precision: int = 10, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self._registers = bytearray(registers) if registers and len(registers) == self.m else bytearray(self.m)
+        self._alpha = 0.7213 / (1 + 1.079 / self.m)
+        self._zeros = self._registers.count(0)
+        self._sum = sum(2.0 ** -r for r in self._registers)
+        self._estimate = self._compute()
+
+    @classmethod
+    def _hash(cls, user_id: int) -> int:
+        # splitmix64 : bien réparti même pour des identifiants consécutifs
+        x = (user_id + 0x9E3779B97F4A7C15) & cls._MASK
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & cls._MASK
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & cls._MASK
+        return x ^ (x >> 31)
+
+    def _compute(self) -> float:
+        raw = self._alpha * self.m * self.m / self._sum
+        if raw <= 2.5 * self.m and self._zeros:
+            # Petits effectifs : comptage linéaire, quasi exact
+            return self.m * math.log(self.m / self._zeros)
+        return raw
+
+    def add(self, user_id: int) -> float:
+        """Ajoute un utilisateur; renvoie l'accroissement de l'estimation (0 si déjà vu)"""
+        h = self._hash(user_id)
+        index = h & (self.m - 1)
+        rank = (64 - self.precision) - (h >> self.precision).bit_length() + 1
+        old = self._registers[index]
+        if rank <= old:
+            return 0.0
+        self._registers[index] = rank
+        if not old:
+            self._zeros -= 1
+        self._sum += 2.0 ** -rank - 2.0 ** -old
+        previous, self._estimate = self._estimate, self._compute()
+        return max(self._estimate - previous, 0.0)
+
+    def __len__(self) -> int:
+        return round(self._estimate)
+
+    def dumps(self) -> str:
+        return base64.b64encode(bytes(self._registers)).decode()
+
+    @classmethod
+    def loads(cls, data: str, precision: int = 10) -> "UserSketch":
+        return cls(precision, base64.b64decode(data))
+
+
+class AnalyticsRing:
+    """Tampon circulaire d'événements de taille fixe, sans verrou.
+
+    Un seul écrivain et un seul lecteur, tous deux sur la boucle asyncio :
+    ``push`` n'alloue rien (tableaux préalloués) et écrase l'événement le
+    plus ancien si le lecteur est en retard (compté dans ``dropped``).
+    """
+
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self._ts = array("d", bytes(8 * capacity))
+        self._latency = array("d", bytes(8 * capacity))
+        self._user = array("q", bytes(8 * capacity))
+        self._kind = bytearray(capacity)
+        self._bot: List[Optional[str]] = [None] * capacity
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._head - self._tail
+
+    def push(self, bot_username: str, kind: int, user_id: int = 0, latency: float = 0.0) -> None:
+        if self._head - self._tail >= self.capacity:
+            self._tail += 1
+            self.dropped += 1
+        i = self._head % self.capacity
+        self._ts[i] = time.time()
+        self._kind[i] = kind
+        self._bot[i] = bot_username
+        self._user[i] = user_id
+        self._latency[i] = latency
+        self._head += 1
+
+    def drain(self) -> Iterator[Tuple[float, int, str, int, float]]:
+        while self._tail < self._head:
+            i = self._tail % self.capacity
+            self._tail += 1
+            yield self._ts[i], self._kind[i], self._bot[i], self._user[i], self._latency[i]
+
+
+class AnalyticsPipeline:
+    """Statistiques réelles des bots fils, affichées par ``bot_analytics``.
+
+    Les Applications des bots fils poussent un événement par update traitée
+    (utilisateur, durée de traitement) et par message envoyé dans un
+    ``AnalyticsRing``. Une tâche de fond vide le tampon toutes les
+    ``drain_interval`` secondes et l'agrège en compartiments par minute
+    (60), heure (168) et jour (30) : nouveaux utilisateurs, messages reçus
+    et envoyés, histogramme logarithmique des latences (pour p50/p95) et
+    échantillons de disponibilité. Le résumé de chaque bot est recalculé
+    après chaque agrégation, la lecture est donc immédiate.
+
+    Un compartiment est une liste ``[début, nouveaux, reçus, envoyés,
+    en_ligne, échantillons, *histogramme]`` ; chaque bot est sauvegardé dans
+    ``store`` sous ``analytics:<bot_username>`` (compartiments non vides
+    seulement, utilisateurs distincts sous forme de ``UserSketch``) toutes
+    les ``persist_interval`` secondes. Le pipeline est construit à l'import,
+    avant la base : ``bind`` lui donne son ``store`` au démarrage (la base du
+    processus principal, ou un ``_SupervisorStore`` dans un worker).
+    """
+
+    STATE_PREFIX = "analytics:"
+
+    LEVELS = (("minute", 60, 60), ("hour", 3600, 168), ("day", 86400, 30))
+    LATENCY_BINS = 16  # 1 ms × 2^n, jusqu'à ~33 s
+    NEW, IN, OUT, ONLINE, SAMPLES, HIST = 1, 2, 3, 4, 5, 6
+
+    def __init__(self, store=None, capacity: int = 65536, drain_interval: float = 1.0,
+                 persist_interval: float = 300.0):
+        self.store = store
+        self.ring = AnalyticsRing(capacity)
+        self.drain_interval = drain_interval
+        self.persist_interval = persist_interval
+        self._bots: Dict[str, dict] = {}
+        self._summaries: Dict[str, dict] = {}
+        self._dirty: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Émission (chemin chaud) ---
+
+    def emit_update(self, bot_username: str, user_id: Optional[int], latency: float) -> None:
+        self.ring.push(bot_username, EV_IN, user_id or 0, latency)
+
+    def emit_sent(self, bot_username: str, endpoint: str) -> None:
+        if endpoint.startswith("send"):
+            self.ring.push(bot_username, EV_OUT)
+
+    # --- Agrégation ---
+
+    def _state(self, bot_username: str) -> dict:
+        state = self._bots.get(bot_username)
+        if state is None:
+            saved = self.store.load_state(f"{self.STATE_PREFIX}{bot_username}", None) or {}
+            if saved.get("users_sketch"):
+                users = UserSketch.loads(saved["users_sketch"])
+            else:
+                # Ancien format : liste complète des identifiants
+                users = UserSketch()
+                for user_id in saved.get("users", []):
+                    users.add(user_id)
+            state = self._bots[bot_username] = {
+                "users": users,
+                "levels": {
+                    name: {bucket[0]: bucket for bucket in saved.get(name, [])}
+                    for name, _, _ in self.LEVELS
+                },
+            }
+        return state
+
+    def _buckets(self, state: dict, ts: float) -> List[list]:
+        buckets = []
+        for name, width, keep in self.LEVELS:
+            level = state["levels"][name]
+            start = int(ts // width * width)
+            bucket = level.get(start)
+            if bucket is None:
+                bucket = level[start] = [start, 0, 0, 0, 0, 0] + [0] * self.LATENCY_BINS
+                oldest = start - width * keep
+                for stale in [s for s in level if s <= oldest]:
+                    del level[stale]
+            buckets.append(bucket)
+        return buckets
+
+    def drain(self) -> int:
+        """Agrège les événements en attente; renvoie leur nombre"""
+        touched = set()
+        count = 0
+        for ts, kind, bot_username, user_id, latency in self.ring.drain():
+            state = self._state(bot_username)
+            buckets = self._buckets(state, ts)
+            if kind == EV_IN:
+                new = state["users"].add(user_id) if user_id else 0.0
+                latency_bin = self.HIST + min(max(int(latency * 1000), 1).bit_length() - 1, self.LATENCY_BINS - 1)
+                for bucket in buckets:
+                    bucket[self.IN] += 1
+                    bucket[latency_bin] += 1
+                    bucket[self.NEW] += new
+            else:
+                for bucket in buckets:
+                    bucket[self.OUT] += 1
+            touched.add(bot_username)
+            count += 1
+        for bot_username in touched:
+            self._refresh(bot_username)
+        self._dirty |= touched
+        return count
+
+    def sample_uptime(self, host) -> None:
+        """Un échantillon de disponibilité par bot connu (en veille = disponible)"""
+        now = time.time()
+        for bot_username in set(self._bots) | set(host):
+            state = self._state(bot_username)
+            online = host.status(bot_username) != "offline"
+            for bucket in self._buckets(state, now):
+                bucket[self.SAMPLES] += 1
+                bucket[self.ONLINE] += online
+            self._refresh(bot_username)
+            self._dirty.add(bot_username)
+
+    def _percentile(self, histogram: List[int], fraction: float) -> Optional[float]:
+        total = sum(histogram)
+        if not total:
+            return None
+        seen = 0
+        for index, count in enumerate(histogram):
+            seen += count
+            if seen >= total * fraction:
+                # Borne haute du compartiment, en secondes
+                return (2 ** (index + 1)) / 1000
+        return None
 
-# États utilisateur
-from enum import Enum
+    def _window(self, state: dict, level: str, width: int, span: float, now: float) -> dict:
+        total = [0] * (self.HIST + self.LATENCY_BINS)
+        for start, bucket in state["levels"][level].items():
+            if now - span < start + width and start <= now:
+                for i in range(1, len(total)):
+                    total[i] += bucket[i]
+        histogram = total[self.HIST:]
+        return {
+            "new_users": round(total[self.NEW]),
+            "messages_in": total[self.IN],
+            "messages_out": total[self.OUT],
+            "p50": self._percentile(histogram, 0.50),
+            "p95": self._percentile(histogram, 0.95),
+            "uptime": total[self.ONLINE] / total[self.SAMPLES] if total[self.SAMPLES] else None,
+        }
 
-class UserStates(Enum):
-    INITIAL = "initial"
-    AWAITING_TOKEN = "awaiting_token"
-    SELECTING_LANGUAGE = "selecting_language"
+    def _refresh(self, bot_username: str) -> None:
+        state = self._bots[bot_username]
+        now = time.time()
+        week = self._window(state, "day", 86400, 7 * 86400, now)
+        previous = self._window(state, "day", 86400, 7 * 86400, now - 7 * 86400)
+        self._summaries[bot_username] = {
+            "hour": self._window(state, "minute", 60, 3600, now),
+            "day": self._window(state, "hour", 3600, 86400, now),
+            "week": week,
+            "growth": (week["new_users"] - previous["new_users"]) / previous["new_users"]
+            if previous["new_users"] else None,
+            "users": len(state["users"]),
+            "updated": now,
+        }
 
-PDG_USER_ID = config.PDG_USER_ID
-child_bots: Dict[str, Application] = {}
-pending_deletions = {}
+    def summary(self, bot_username: str) -> Optional[dict]:
+        """Résumé précalculé (dernière heure, 24h, 7 jours) ou None si aucune donnée"""
+        return self._summaries.get(bot_username)
+
+    # --- Persistance et tâche de fond ---
+
+    def persist(self) -> None:
+        for bot_username in list(self._dirty):
+            state = self._bots[bot_username]
+            compact = {
+                name: [bucket for bucket in state["levels"][name].values() if any(bucket[1:])]
+                for name, _, _ in self.LEVELS
+            }
+            compact["users_sketch"] = state["users"].dumps()
+            self.store.save_state(f"{self.STATE_PREFIX}{bot_username}", compact)
+        self._dirty.clear()
+
+    def forget(self, bot_username: str) -> None:
+        """Supprime les statistiques d'un bot supprimé"""
+        self._bots.pop(bot_username, None)
+        self._summaries.pop(bot_username, None)
+        self._dirty.discard(bot_username)
+        self.store.save_state(f"{self.STATE_PREFIX}{bot_username}", None)
+
+    async def _run(self, host) -> None:
+        loop = asyncio.get_running_loop()
+        next_sample = next_persist = loop.time()
+        while True:
+            await asyncio.sleep(self.drain_interval)
+            try:
+                self.drain()
+                now = loop.time()
+                if now >= next_sample:
+                    self.sample_uptime(host)
+                    next_sample = now + 60
+                if now >= next_persist:
+                    next_persist = now + self.persist_interval
+                    self.persist()
+            except Exception as e:
+                logger.error(f"Erreur dans le pipeline d'analytique: {e}", exc_info=True)
+
+    def bind(self, store) -> None:
+        self.store = store
+
+    def start(self, host) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(host))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.drain()
+        self.persist()
+
+
+analytics = AnalyticsPipeline(
+    capacity=getattr(config, "ANALYTICS_RING_SIZE", 65536),
+    drain_interval=getattr(config, "ANALYTICS_DRAIN_INTERVAL", 1.0),
+    persist_interval=getattr(config, "ANALYTICS_PERSIST_INTERVAL", 300.0),
+)
+
+
+class BotLoggerAdapter(logging.LoggerAdapter):
+    """Journal d'un bot fils : les enregistrements portent ``bot_username``"""
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**kwargs.get("extra", {}), "bot_username": self.extra["bot_username"]}
+        return msg, kwargs
+
+
+class ChildBotLogs(logging.Handler):
+    """Journaux par bot fils : tampon circulaire en mémoire, déversé sur disque.
+
+    Chaque bot garde ses ``ring_size`` derniers enregistrements
+    ``(horodatage, niveau, message)`` pour un affichage immédiat. Les
+    nouveaux enregistrements sont ajoutés toutes les ``flush_interval``
+    secondes (dans un thread) à ``<directory>/<bot_username>.log`` ; au-delà
+    de ``max_bytes`` le fichier est compressé en ``.1.gz`` et les archives
+    précédentes décalées, ``backups`` au maximum.
+
+    Le handler est branché sur ``child_logger`` (niveau INFO quel que soit
+    celui du logger racine) : tout enregistrement émis via
+    ``child_logs.logger(bot_username)`` arrive dans le tampon du bot, puis
+    continue vers les handlers habituels.
+    """
+
+    def __init__(self, directory: str, ring_size: int = 500, max_bytes: int = 1024 * 1024,
+                 backups: int = 5, flush_interval: float = 5.0):
+        super().__init__(logging.INFO)
+        self.directory = directory
+        self.ring_size = ring_size
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._rings: Dict[str, deque] = {}
+        self._pending: Dict[str, List[tuple]] = {}
+        self._adapters: Dict[str, BotLoggerAdapter] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def logger(self, bot_username: str) -> BotLoggerAdapter:
+        adapter = self._adapters.get(bot_username)
+        if adapter is None:
+            adapter = self._adapters[bot_username] = BotLoggerAdapter(child_logger, {"bot_username": bot_username})
+        return adapter
+
+    def emit(self, record: logging.LogRecord) -> None:
+        bot_username = getattr(record, "bot_username", None)
+        if bot_username:
+            self.record(bot_username, record.levelname, record.getMessage(), record.created)
+
+    def record(self, bot_username: str, level: str, message: str, created: Optional[float] = None) -> None:
+        """Ajoute une ligne au journal du bot sans passer par ``logging`` (chemin chaud)"""
+        entry = (created or time.time(), level, message)
+        ring = self._rings.get(bot_username)
+        if ring is None:
+            ring = self._rings[bot_username] = deque(maxlen=self.ring_size)
+        ring.append(entry)
+        self._pending.setdefault(bot_username, []).append(entry)
+
+    @staticmethod
+    def format_entry(entry: tuple) -> str:
+        created, level, message = entry
+        return f"{datetime.fromtimestamp(created).strftime('%Y-%m-%d %H:%M:%S')} [{level}] {message}"
+
+    def tail(self, bot_username: str, limit: int = 20) -> List[str]:
+        """Les ``limit`` dernières lignes du journal, sans accès disque"""
+        ring = self._rings.get(bot_username, ())
+        return [self.format_entry(entry) for entry in list(ring)[-limit:]]
+
+    # --- Fichiers ---
+
+    def path(self, bot_username: str) -> str:
+        return os.path.join(self.directory, f"{bot_username}.log")
+
+    def files(self, bot_username: str) -> List[str]:
+        """Fichiers du journal existants, du plus récent au plus ancien"""
+        path = self.path(bot_username)
+        candidates = [path] + [f"{path}.{index}.gz" for index in range(1, self.backups + 1)]
+        return [candidate for candidate in candidates if os.path.exists(candidate) and os.path.getsize(candidate)]
+
+    def _rotate(self, path: str) -> None:
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}.gz"):
+                os.replace(f"{path}.{index}.gz", f"{path}.{index + 1}.gz")
+        if self.backups:
+            with open(path, "rb") as source, gzip.open(f"{path}.1.gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+        os.remove(path)
+
+    def _write(self, batches: Dict[str, List[tuple]]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        for bot_username, entries in batches.items():
+            path = self.path(bot_username)
+            if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+                self._rotate(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("".join(self.format_entry(entry) + "\n" for entry in entries))
+
+    async def flush_to_disk(self) -> None:
+        if not self._pending:
+            return
+        batches, self._pending = self._pending, {}
+        try:
+            await asyncio.to_thread(self._write, batches)
+        except OSError as e:
+            logger.error(f"Erreur écriture des journaux des bots fils: {e}")
+
+    def forget(self, bot_username: str) -> None:
+        """Oublie le journal d'un bot supprimé, fichiers compris"""
+        self._rings.pop(bot_username, None)
+        self._pending.pop(bot_username, None)
+        self._adapters.pop(bot_username, None)
+        for path in self.files(bot_username):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # --- Tâche de fond ---
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush_to_disk()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def shutdown(self) -> None:
+        """Vide les journaux sur disque (``close()`` reste celui de ``logging.Handler``)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_to_disk()
+
+
+child_logs = ChildBotLogs(
+    getattr(config, "CHILD_BOT_LOG_DIR", "logs/bots"),
+    ring_size=getattr(config, "CHILD_BOT_LOG_RING_SIZE", 500),
+    max_bytes=getattr(config, "CHILD_BOT_LOG_MAX_BYTES", 1024 * 1024),
+    backups=getattr(config, "CHILD_BOT_LOG_BACKUPS", 5),
+    flush_interval=getattr(config, "CHILD_BOT_LOG_FLUSH_INTERVAL", 5.0),
+)
+child_logger = logging.getLogger(f"{__name__}.bots")
+child_logger.setLevel(logging.INFO)
+child_logger.addHandler(child_logs)
+
+
+class _ChildApplication(Application):
+    """Application d'un bot fils : chaque update traitée alimente ``analytics`` et son journal"""
+
+    async def process_update(self, update: object) -> None:
+        started = time.monotonic()
+        interrupted = False
+        try:
+            await super().process_update(update)
+        except asyncio.CancelledError:
+            # Traitement interrompu : l'offset sauvegardé reste sur cette update
+            interrupted = True
+            raise
+        finally:
+            if not interrupted:
+                child_bots.processed(self.bot.username, getattr(update, "update_id", None))
+            latency = time.monotonic() - started
+            user = getattr(update, "effective_user", None)
+            analytics.emit_update(self.bot.username, user.id if user else None, latency)
+            child_logs.record(
+                self.bot.username, "INFO",
+                f"Update traitée ({user.id if user else '-'}): {self._describe(update)} en {latency * 1000:.0f} ms",
+            )
+
+    @staticmethod
+    def _describe(update: object) -> str:
+        """Type de l'update, ou commande (sans arguments) : jamais le contenu des messages"""
+        if not isinstance(update, Update):
+            return type(update).__name__
+        message = update.effective_message
+        if message and message.text and message.text.startswith("/"):
+            return message.text.split(maxsplit=1)[0].split("@", 1)[0]
+        for kind in Update.ALL_TYPES:
+            if getattr(update, kind, None) is not None:
+                return kind
+        return "update"
+
+    async def process_error(self, update, error, job=None, coroutine=None) -> bool:
+        child_logs.logger(self.bot.username).error(f"Erreur handler @{self.bot.username}: {error!r}")
+        return await super().process_error(update, error, job=job, coroutine=coroutine)
 
 bot_stats = {
     "earnings": {
@@ -52,14 +3096,22 @@ bot_stats = {
 }
 
 def init_child_bot(token: str, bot_username: str):
-    """Initialise et démarre un bot fils avec python-telegram-bot"""
+    """Construit l'Application d'un bot fils sur le pool HTTP partagé de child_bots.
+
+    Pas d'Updater : les updates sont récupérées par la boucle de dispatch de l'hôte.
+    """
     try:
         application = (
             ApplicationBuilder()
             .token(token)
-            .connect_timeout(30)
-            .read_timeout(30)
-            .pool_timeout(30)
+            .base_url(getattr(config, "BOT_API_BASE_URL", "https://api.telegram.org/bot"))
+            .request(child_bots.request)
+            .get_updates_request(child_bots.poll_request)
+            .rate_limiter(make_rate_limiter(
+                bot_username, on_sent=lambda endpoint: analytics.emit_sent(bot_username, endpoint)
+            ))
+            .application_class(_ChildApplication)
+            .updater(None)
             .build()
         )
         
@@ -71,42 +3123,190 @@ def init_child_bot(token: str, bot_username: str):
         return None
 
 
+class TokenCheckUnavailable(Exception):
+    """getMe n'a pas pu répondre (réseau, 5xx) : le token n'est ni valide ni invalide"""
+
+
+class TokenValidator:
+    """Validation asynchrone des tokens via getMe, sans bloquer la boucle d'événements.
+
+    Un seul client HTTP est partagé, les résultats (positifs comme négatifs)
+    sont mis en cache quelques minutes sous l'empreinte SHA-256 du token, et
+    plusieurs validations simultanées du même token ne font qu'un appel.
+    Une panne passagère lève ``TokenCheckUnavailable`` au lieu de faire
+    passer le token pour invalide.
+    """
+
+    def __init__(self, base_url: str = "https://api.telegram.org/bot", timeout: float = 10.0,
+                 ttl: float = 300.0, negative_ttl: float = 30.0, max_entries: int = 10000):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[float, Optional[dict]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._client = None
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _client_session(self):
+        if self._client is None or self._client.is_closed:
+            import httpx
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def validate(self, token: str) -> Optional[dict]:
+        """Renvoie {'id', 'username', 'first_name'} ou None si le token est invalide
+
+        Lève ``TokenCheckUnavailable`` si Telegram n'a pas pu être interrogé.
+        """
+        if not token or ':' not in token:
+            return None
+
+        key = self._key(token)
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            return cached[1]
+
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._fetch(token)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            # Erreur réseau : rien en cache, l'appelant demande de réessayer
+            logger.warning(f"Validation de token impossible: {e}")
+            error = TokenCheckUnavailable(str(e))
+            future.set_exception(error)
+            # Marque l'exception comme lue s'il n'y a aucun autre appelant en attente
+            future.exception()
+            raise error from e
+        finally:
+            del self._inflight[key]
+            # Validation annulée : les appelants en attente ne restent pas bloqués
+            if not future.done():
+                future.set_exception(TokenCheckUnavailable("validation annulée"))
+                future.exception()
+
+    async def _fetch(self, token: str) -> Optional[dict]:
+        response = await self._client_session().get(f"{self.base_url}{token}/getMe")
+        if response.status_code in (401, 404):
+            self._store(token, None)
+            return None
+        response.raise_for_status()
+
+        data = response.json().get("result") or {}
+        result = {
+            'id': data.get("id"),
+            'username': data.get("username"),
+            'first_name': data.get("first_name")
+        }
+        self._store(token, result)
+        return result
+
+    def _store(self, token: str, result: Optional[dict]) -> None:
+        ttl = self.ttl if result else self.negative_ttl
+        key = self._key(token)
+        self._cache[key] = (time.monotonic() + ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+token_validator = _main_process_only(lambda: TokenValidator(
+    base_url=getattr(config, "BOT_API_BASE_URL", "https://api.telegram.org/bot"),
+    timeout=getattr(config, "TOKEN_VALIDATION_TIMEOUT", 10.0),
+    ttl=getattr(config, "TOKEN_VALIDATION_TTL", 300.0),
+    negative_ttl=getattr(config, "TOKEN_VALIDATION_NEGATIVE_TTL", 30.0),
+))
+
+async def async_validate_bot_token(token: str) -> Optional[dict]:
+    """Équivalent asynchrone (et mis en cache) de sync_validate_bot_token"""
+    return await token_validator.validate(token)
+
+
 async def check_bot_limits(user_id: int) -> bool:
     """Vérifie si l'utilisateur peut ajouter un nouveau bot"""
-    plan = get_user_plan(user_id)
-    user_bots = db.get_user_bots(user_id)
-    plan_limits = get_plan_limits(plan)
-    
-    # Check for trial period for 'free' plan
-    if plan == "free":
-        trial_end_date = db.get_user_trial_end_date(user_id)
-        if trial_end_date and datetime.now() < datetime.fromisoformat(trial_end_date):
-            # During trial, allow up to 10 bots
-            if len(user_bots) >= 10:
-                return False
-        else:
-            # After trial, apply plan limits for 'free' plan
-            if len(user_bots) >= plan_limits["bots"]:
-                return False
-    else:
-        # For other plans, apply their limits directly
-        if len(user_bots) >= plan_limits["bots"]:
-            return False
-    return True
+    return db.quotas.can_add_bot(user_id)
 
 async def check_group_limits(user_id: int, new_group_id: int = 0) -> bool:
     """Vérifie les limites de groupes"""
-    plan = get_user_plan(user_id)
-    user_bots = db.get_user_bots(user_id)
-    plan_limits = get_plan_limits(plan)
-    
-    total_groups = sum(len(bot.get("groups", [])) for bot in user_bots)
-    if new_group_id > 0:
-        total_groups += 1
-    
-    if total_groups >= plan_limits["groups"]:
-        return False
-    return True
+    return db.quotas.can_add_group(user_id, new_group_id)
+
+
+class SimpleDB:
+    """Backend en mémoire (``DB_BACKEND = "memory"``), même interface que SQLiteBackend.
+
+    Rien n'est persisté : ``save_to_disk`` et ``save_state`` ne font que
+    mettre à jour les dictionnaires, ce qui suffit au développement et aux
+    essais.
+    """
+
+    def __init__(self):
+        self.users: Dict[int, dict] = {}
+        self.bots: Dict[int, List[dict]] = {}
+        self._state: Dict[str, object] = {}
+
+    def _user_record(self, user_id: int) -> dict:
+        return self.users.setdefault(user_id, {})
+
+    def is_new_user(self, user_id: int) -> bool:
+        return user_id not in self.users
+
+    def get_all_users(self) -> List[int]:
+        return sorted(set(self.users) | {user_id for user_id, bots in self.bots.items() if bots})
+
+    def get_user_language(self, user_id: int) -> Optional[str]:
+        return self.users.get(user_id, {}).get('language')
+
+    def set_user_language(self, user_id: int, lang: str) -> None:
+        self._user_record(user_id)['language'] = lang
+
+    def get_user_plan(self, user_id: int) -> str:
+        return self.users.get(user_id, {}).get('plan', 'free')
+
+    def set_user_plan(self, user_id: int, plan: str) -> None:
+        self._user_record(user_id)['plan'] = plan
+
+    def get_user_pin(self, user_id: int) -> Optional[str]:
+        return self.users.get(user_id, {}).get('pin')
+
+    def set_user_pin(self, user_id: int, pin_hash: str) -> None:
+        self._user_record(user_id)['pin'] = pin_hash
+
+    def get_user_bots(self, user_id: int) -> List[dict]:
+        return self.bots.setdefault(user_id, [])
+
+    def save_user_bot(self, user_id: int, token: str, bot_username: str, bot_name: str, creation_time: str) -> None:
+        bots = [bot for bot in self.get_user_bots(user_id) if bot.get('bot_username') != bot_username]
+        bots.append({
+            'token': token,
+            'bot_username': bot_username,
+            'bot_name': bot_name,
+            'creation_time': creation_time
+        })
+        self.bots[user_id] = bots
+
+    def update_user_bot(self, user_id: int, bot_username: str, **fields) -> bool:
+        bot = next((bot for bot in self.get_user_bots(user_id) if bot.get('bot_username') == bot_username), None)
+        if bot is None:
+            return False
+        bot.update(fields)
+        return True
+
     def delete_user_bot(self, user_id: int, bot_username: str) -> bool:
         if user_id in self.bots:
             self.bots[user_id] = [bot for bot in self.bots[user_id] 
@@ -126,29 +3326,216 @@ async def check_group_limits(user_id: int, new_group_id: int = 0) -> bool:
     def get_user_trial_end_date(self, user_id: int):
         return self.users.get(user_id, {}).get('trial_end_date')
 
-db = SimpleDB()
+    def load_state(self, name: str, default=None):
+        return self._state.get(name, default)
 
-# Plans d'abonnement simplifiés
-PLANS = {
-    "free": {
-        "label": "Gratuit",
-        "price": "0€/mois",
-        "features": ["1 bot", "Support communautaire"],
-        "limits": {"bots": 1, "groups": 5}
-    },
-    "premium": {
-        "label": "Premium",
-        "price": "9.99€/mois", 
-        "features": ["10 bots", "Support prioritaire", "Analytics"],
-        "limits": {"bots": 10, "groups": 50}
-    }
-}
+    def save_state(self, name: str, value) -> None:
+        self._state[name] = value
+
+    def load_states(self, prefix: str) -> Dict[str, object]:
+        return {name: value for name, value in self._state.items()
+                if name.startswith(prefix) and value is not None}
+
+    def setdefault(self, name: str, default=None):
+        return self._state.setdefault(name, default)
+
+    def save_to_disk(self, name: str, data: dict) -> None:
+        if name == 'users':
+            for user_id, record in data.items():
+                self.users[int(user_id)] = record
+        else:
+            self._state[name] = data
+
+    @property
+    def pdg_config(self) -> Optional[dict]:
+        return self._state.get('pdg_config')
+
+    @pdg_config.setter
+    def pdg_config(self, value: Optional[dict]) -> None:
+        self._state['pdg_config'] = value
+
+    def save_pdg_config(self) -> None:
+        pass
+
+def _build_db() -> IndexedBotStore:
+    if getattr(config, "DB_BACKEND", "memory") == "sqlite":
+        backend = SQLiteBackend(
+            getattr(config, "DB_PATH", "data/telesuche.db"),
+            flush_interval=getattr(config, "DB_FLUSH_INTERVAL_MS", 200) / 1000,
+            max_retry_delay=getattr(config, "DB_MAX_RETRY_DELAY", 30.0)
+        )
+    else:
+        backend = SimpleDB()
+    return IndexedBotStore(backend, LanguageCache(
+        max_entries=getattr(config, "LANG_CACHE_SIZE", 50000),
+        ttl=getattr(config, "LANG_CACHE_TTL", 3600.0),
+        negative_ttl=getattr(config, "LANG_CACHE_NEGATIVE_TTL", 60.0)
+    ), QuotaEngine(
+        trial_bots=getattr(config, "TRIAL_BOT_LIMIT", 10),
+        ttl=getattr(config, "QUOTA_PROFILE_TTL", 60.0)
+    ))
+
+
+db = _main_process_only(_build_db)
+deletion_scheduler = _main_process_only(lambda: DeletionScheduler(
+    db,
+    batch_size=getattr(config, "DELETION_BATCH_SIZE", 50),
+    retry_delay=getattr(config, "DELETION_RETRY_DELAY", 60.0),
+    retry_max=getattr(config, "DELETION_RETRY_MAX", 3600.0),
+))
 
 def get_user_plan(user_id: int) -> str:
     return db.users.get(user_id, {}).get('plan', 'free')
 
 def get_plan_limits(plan: str) -> dict:
-    return PLANS.get(plan, PLANS['free'])['limits']
+    return plan_catalog.limits(plan)
+
+
+def _load_plans(fresh: bool = False) -> Tuple[dict, Optional[str]]:
+    """Catalogue des plans et fichier source : PLANS_FILE (JSON) ou handlers/subscriptions.py"""
+    path = getattr(config, "PLANS_FILE", None)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f), path
+    import handlers.subscriptions as subscriptions
+    if fresh:
+        subscriptions = importlib.reload(subscriptions)
+    return subscriptions.PLANS, subscriptions.__file__
+
+
+class PlanCatalog:
+    """Catalogue des plans compilé une fois par langue.
+
+    Pour chaque langue, ``screens(lang)`` fournit l'écran de choix de
+    ``handle_upgrade_plan`` (texte et clavier) et, par plan, les fragments
+    de ``show_plan_info`` (en-tête, fonctionnalités, clavier) : seule la
+    ligne d'utilisation reste à calculer par requête. La date de
+    modification du fichier source est vérifiée au plus toutes les
+    ``check_interval`` secondes ; s'il a changé, le catalogue est rechargé
+    et les écrans recompilés à la demande. Un fichier invalide est signalé
+    et l'ancien catalogue reste en service.
+    """
+
+    def __init__(self, loader=_load_plans, check_interval: float = 5.0):
+        self.loader = loader
+        self.check_interval = check_interval
+        plans, self.path = loader()
+        self._plans = self.validate(plans)
+        self._mtime = self._stat()
+        self._checked = time.monotonic()
+        self._compiled: Dict[str, dict] = {}
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.path) if self.path else None
+        except OSError:
+            return None
+
+    def _check(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        mtime = self._stat()
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self.reload()
+
+    @staticmethod
+    def validate(plans) -> dict:
+        """Vérifie le schéma d'un catalogue (plan ``free`` présent, ``limits`` complet); le renvoie"""
+        if not isinstance(plans, dict) or "free" not in plans:
+            raise ValueError("plan 'free' absent")
+        for plan_id, plan in plans.items():
+            if not isinstance(plan, dict):
+                raise ValueError(f"plan {plan_id!r} : objet attendu")
+            missing = [key for key in ("label", "price", "limits") if key not in plan]
+            if missing:
+                raise ValueError(f"plan {plan_id!r} : clé(s) manquante(s) {', '.join(missing)}")
+            limits = plan["limits"]
+            if not isinstance(limits, dict) or not all(isinstance(limits.get(key), int) for key in ("bots", "groups")):
+                raise ValueError(f"plan {plan_id!r} : 'limits' doit contenir 'bots' et 'groups' entiers")
+        return plans
+
+    def reload(self) -> bool:
+        try:
+            plans, self.path = self.loader(fresh=True)
+            self.validate(plans)
+        except Exception as e:
+            logger.error(f"Catalogue des plans invalide ({self.path}), ancienne version conservée: {e}")
+            return False
+        self._plans = plans
+        self._compiled = {}
+        logger.info(f"Catalogue des plans rechargé ({len(plans)} plans)")
+        return True
+
+    @property
+    def plans(self) -> dict:
+        self._check()
+        return self._plans
+
+    def get(self, plan_id: str) -> dict:
+        plans = self.plans
+        return plans.get(plan_id, plans["free"])
+
+    def limits(self, plan_id: str) -> dict:
+        return self.get(plan_id)["limits"]
+
+    def _compile(self, lang: str) -> dict:
+        back = InlineKeyboardButton(f"🔙 {get_text(lang, 'back_button')}", callback_data="back_to_main")
+
+        text = f"💎 <b>{get_text(lang, 'plan_choose')}</b>\n\n"
+        rows = []
+        info = {}
+        for plan_id, plan in self._plans.items():
+            features = "".join(f"• {feature}\n" for feature in plan.get("features", []))
+            text += f"{plan['label']} ({plan['price']})\n{features}"
+            if plan.get("more_info_link"):
+                text += f"{plan['more_info_link']}\n"
+            text += "\n"
+            rows.append([InlineKeyboardButton(
+                f"{plan['label']} - {plan['price']}", callback_data=encode_callback("plan_details:", plan_id)
+            )])
+
+            body = f"\n<b>{get_text(lang, 'plan_features')}</b>\n" + features
+            if plan_id == "free":
+                body += f"\n💡 <b>{get_text(lang, 'plan_upgrade_hint')}</b>"
+                keyboard = InlineKeyboardMarkup([
+                    [InlineKeyboardButton(f"🚀 {get_text(lang, 'upgrade_plan')}", callback_data="upgrade_plan")],
+                    [back],
+                ])
+            else:
+                keyboard = InlineKeyboardMarkup([[back]])
+            info[plan_id] = {
+                "header": (f"💎 <b>{get_text(lang, 'plan_current')} — {plan['label']}</b>\n\n"
+                           f"📊 <b>{get_text(lang, 'plan_usage')}</b>\n"),
+                "body": body,
+                "keyboard": keyboard,
+            }
+
+        rows.append([back])
+        return {"upgrade": (text, InlineKeyboardMarkup(rows)), "info": info}
+
+    def screens(self, lang: str) -> dict:
+        self._check()
+        compiled = self._compiled.get(lang)
+        if compiled is None:
+            compiled = self._compiled[lang] = self._compile(lang)
+        return compiled
+
+    def upgrade_screen(self, lang: str) -> Tuple[str, InlineKeyboardMarkup]:
+        return self.screens(lang)["upgrade"]
+
+    def plan_screen(self, lang: str, plan_id: str) -> dict:
+        info = self.screens(lang)["info"]
+        return info.get(plan_id, info["free"])
+
+    def warm(self, langs) -> None:
+        for lang in langs:
+            self.screens(lang)
+
+
+plan_catalog = _main_process_only(lambda: PlanCatalog(check_interval=getattr(config, "PLANS_CHECK_INTERVAL", 5.0)))
 
 # Validation de token simplifiée
 def sync_validate_bot_token(token: str) -> dict:
@@ -176,6 +3563,331 @@ class KeyboardManager:
             )]
         ])
 
+class CallbackCodec:
+    """Encodage compact des ``callback_data`` (limite Telegram : 64 octets).
+
+    Une route (``"bot_detail:"``, ``"my_bots"``, ``"setlang_"``...) devient un
+    identifiant de 3 caractères dérivé de son nom, donc stable d'un
+    redémarrage à l'autre ; les arguments suivent, séparés par ``:``. Avec un
+    secret, une étiquette HMAC de 6 caractères précède l'identifiant. Une
+    charge trop longue est remplacée par un jeton dérivé de son contenu,
+    enregistré dans ``store`` (état ``callback#<jeton>``) pour survivre aux
+    redémarrages ; une table LRU bornée évite de relire la base. Les jetons
+    plus vieux que ``ttl`` sont purgés par ``prune()``.
+
+    Les données qui ne commencent pas par ``~`` (anciens messages, claviers
+    externes) restent lues telles quelles par ``CallbackRouter``.
+
+    Les routes statiques, sans argument (``"my_bots"``, ``"delete_step1_no"``,
+    ``"delete_final_no"``...), restent volontairement en clair : elles tiennent
+    largement dans la limite, ne portent aucune donnée à authentifier et sont
+    ainsi identiques à celles des claviers de ``KeyboardManager`` et des
+    anciens messages. Seuls les boutons à arguments passent par ``encode``.
+    """
+
+    MARKER = "~"
+    ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+    MAX_BYTES = 64
+
+    STATE_PREFIX = "callback#"
+
+    def __init__(self, secret: str = "", max_entries: int = 10000, store=None, ttl: float = 30 * 86400):
+        self._secret = secret.encode() if secret else b""
+        self.max_entries = max_entries
+        self.store = store
+        self.ttl = ttl
+        self._keys: Dict[str, str] = {}
+        self._table: "OrderedDict[str, Tuple[str, Tuple[str, ...]]]" = OrderedDict()
+        self.oversized = 0
+        self.rejected = 0
+
+    @classmethod
+    def action_id(cls, key: str) -> str:
+        value = zlib.crc32(key.encode())
+        base = len(cls.ALPHABET)
+        return "".join(cls.ALPHABET[(value // base ** i) % base] for i in range(3))
+
+    def register(self, key: str) -> None:
+        action_id = self.action_id(key)
+        existing = self._keys.get(action_id)
+        if existing is not None and existing != key:
+            raise ValueError(f"Collision d'identifiant de callback: {existing!r} et {key!r}")
+        self._keys[action_id] = key
+
+    def _tag(self, body: str) -> str:
+        if not self._secret:
+            return ""
+        digest = hmac.new(self._secret, body.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest[:4]).decode().rstrip("=")
+
+    def encode(self, key: str, *args) -> str:
+        body = self.action_id(key) + "".join(f":{arg}" for arg in args)
+        data = self.MARKER + self._tag(body) + body
+        if len(data.encode()) <= self.MAX_BYTES:
+            return data
+
+        self.oversized += 1
+        args = tuple(str(arg) for arg in args)
+        digest = hashlib.sha256("\x00".join((key,) + args).encode()).digest()
+        token = "#" + base64.urlsafe_b64encode(digest[:9]).decode()
+        if token not in self._table:
+            if self.store is not None:
+                self.store.save_state(self.STATE_PREFIX + token[1:], [key, list(args), int(time.time())])
+            self._remember(token, (key, args))
+        return self.MARKER + self._tag(token) + token
+
+    def _remember(self, token: str, entry: Tuple[str, Tuple[str, ...]]) -> None:
+        self._table[token] = entry
+        while len(self._table) > self.max_entries:
+            self._table.popitem(last=False)
+
+    def _load(self, token: str) -> Optional[Tuple[str, Tuple[str, ...]]]:
+        if self.store is None:
+            return None
+        saved = self.store.load_state(self.STATE_PREFIX + token[1:], None)
+        if not saved or time.time() - saved[2] > self.ttl:
+            return None
+        entry = (saved[0], tuple(saved[1]))
+        self._remember(token, entry)
+        return entry
+
+    def prune(self) -> int:
+        """Supprime de ``store`` les jetons expirés ; renvoie leur nombre"""
+        if self.store is None:
+            return 0
+        deadline = time.time() - self.ttl
+        expired = [
+            name for name, saved in self.store.load_states(self.STATE_PREFIX).items()
+            if not saved or saved[2] < deadline
+        ]
+        for name in expired:
+            self.store.save_state(name, None)
+            self._table.pop("#" + name[len(self.STATE_PREFIX):], None)
+        return len(expired)
+
+    def decode(self, data: str) -> Optional[Tuple[str, List[str]]]:
+        tag_length = 6 if self._secret else 0
+        tag, body = data[1:1 + tag_length], data[1 + tag_length:]
+        if self._secret and not hmac.compare_digest(tag, self._tag(body)):
+            self.rejected += 1
+            logger.warning(f"callback_data rejeté (étiquette invalide): {data!r}")
+            return None
+
+        if body.startswith("#"):
+            entry = self._table.get(body)
+            if entry is not None:
+                self._table.move_to_end(body)
+            else:
+                entry = self._load(body)
+                if entry is None:
+                    return None
+            return entry[0], list(entry[1])
+
+        action_id, sep, rest = body.partition(":")
+        key = self._keys.get(action_id)
+        if key is None:
+            return None
+        return key, rest.split(":") if sep else []
+
+
+callback_codec = _main_process_only(lambda: CallbackCodec(
+    secret=getattr(config, "CALLBACK_SECRET", ""),
+    max_entries=getattr(config, "CALLBACK_TABLE_SIZE", 10000),
+    store=db,
+    ttl=getattr(config, "CALLBACK_TOKEN_TTL", 30 * 86400)
+))
+
+def encode_callback(key: str, *args) -> str:
+    """``callback_data`` compact pour une route de ``CallbackRouter``"""
+    return callback_codec.encode(key, *args)
+
+
+class KeyboardRegistry:
+    """Registre des claviers inline, construits une fois par (écran, langue).
+
+    Un écran est une fonction ``lang -> lignes`` où chaque bouton est
+    ``(texte, route, *champs)`` : sans champ, la route sert telle quelle de
+    ``callback_data`` (routes statiques en clair, voir ``CallbackCodec``) ; sinon le bouton est encodé par ``encode_callback`` avec
+    les valeurs de ces champs passées à l'appel (``bot_username=...``).
+    ``routes()`` liste les routes utilisées, pour les vérifier contre
+    ``CallbackRouter`` au démarrage. Les gabarits sont gardés par
+    langue et les claviers rendus (immuables, donc partageables) dans un LRU
+    borné. Une fonction peut aussi renvoyer directement un
+    ``InlineKeyboardMarkup`` pour un écran sans paramètre.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._builders: Dict[str, Callable] = {}
+        self._templates: Dict[Tuple[str, str], object] = {}
+        self._rendered: "OrderedDict[tuple, InlineKeyboardMarkup]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def screen(self, name: str):
+        def decorator(builder):
+            self._builders[name] = builder
+            return builder
+        return decorator
+
+    def _template(self, name: str, lang: str):
+        key = (name, lang)
+        template = self._templates.get(key)
+        if template is None:
+            built = self._builders[name](lang)
+            if isinstance(built, InlineKeyboardMarkup):
+                template = built
+            else:
+                template = tuple(tuple(tuple(button) for button in row) for row in built)
+            self._templates[key] = template
+        return template
+
+    def get(self, name: str, lang: str, **params) -> InlineKeyboardMarkup:
+        key = (name, lang, *sorted(params.items()))
+        markup = self._rendered.get(key)
+        if markup is not None:
+            self._rendered.move_to_end(key)
+            self.hits += 1
+            return markup
+
+        self.misses += 1
+        template = self._template(name, lang)
+        if isinstance(template, InlineKeyboardMarkup):
+            markup = template
+        else:
+            markup = InlineKeyboardMarkup([
+                [InlineKeyboardButton(
+                    text,
+                    callback_data=callback_codec.encode(route, *(params[field] for field in fields)) if fields else route
+                ) for text, route, *fields in row]
+                for row in template
+            ])
+        self._rendered[key] = markup
+        while len(self._rendered) > self.max_entries:
+            self._rendered.popitem(last=False)
+        return markup
+
+    def warm(self, langs) -> None:
+        """Construit à l'avance les écrans sans paramètre pour ces langues"""
+        for name in self._builders:
+            for lang in langs:
+                try:
+                    template = self._template(name, lang)
+                except Exception as e:
+                    logger.warning(f"Clavier {name}/{lang} non préconstruit: {e}")
+                    continue
+                if isinstance(template, InlineKeyboardMarkup) or not any(
+                    len(button) > 2 for row in template for button in row
+                ):
+                    self.get(name, lang)
+
+    def routes(self, lang: str = "fr") -> set:
+        """Routes des boutons de tous les écrans à gabarit"""
+        routes = set()
+        for name in self._builders:
+            try:
+                template = self._template(name, lang)
+            except Exception as e:
+                logger.warning(f"Clavier {name}/{lang} non vérifié: {e}")
+                continue
+            if not isinstance(template, InlineKeyboardMarkup):
+                routes.update(button[1] for row in template for button in row)
+        return routes
+
+    def clear(self) -> None:
+        self._templates.clear()
+        self._rendered.clear()
+
+    def stats(self) -> dict:
+        return {
+            "templates": len(self._templates),
+            "rendered": len(self._rendered),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+keyboards = KeyboardRegistry(max_entries=getattr(config, "KEYBOARD_CACHE_SIZE", 2048))
+
+
+@keyboards.screen("main_menu")
+def _main_menu_keyboard(lang: str):
+    return [
+        [("🤖 Mes bots", "my_bots")],
+        [("🌐 Langue", "language_menu")],
+        [("🆘 Aide", "help")]
+    ]
+
+
+@keyboards.screen("language_options")
+def _language_options_keyboard(lang: str):
+    return [
+        [("🇫🇷 Français", "setlang_fr"), ("🇬🇧 English", "setlang_en"), ("🇪🇸 Español", "setlang_es")],
+        [("🇩🇪 Deutsch", "setlang_de"), ("🇨🇳 中文", "setlang_zh"), ("🇮🇳 हिन्दी", "setlang_hi")],
+        [("🇯🇵 日本語", "setlang_ja"), ("🇰🇷 한국어", "setlang_ko"), ("🇹🇭 ไทย", "setlang_th")],
+        [("🇷🇺 Русский", "setlang_ru"), ("🇵🇹 Português", "setlang_pt"), ("🇮🇹 Italiano", "setlang_it")],
+        [("🔙 Retour" if lang == 'fr' else "🔙 Back", "back_to_main")]
+    ]
+
+
+@keyboards.screen("services")
+def _services_keyboard(lang: str):
+    return [
+        [("🤖 Mes bots créés 🤖", "my_bots")],
+        [("🔍 Recherche avancée", "services_search")],
+        [("❤️ Groupe de rencontre 👩‍❤️‍👨", "services_meetup")],
+        [("🔄 Change format fichier 📁", "services_format")],
+        [("📝 Texte vers voix🎙️", "services_tts")],
+        [("🎙️ Voix vers texte 📝", "services_stt")],
+        [("📢 Créer un post 📢", "services_post")],
+        [("📊 Créé un sondage 📊", "services_poll")],
+        [("🔗 Crée un lien court 🔗", "services_shortlink")],
+        [("🚀 Créé une publicité 🚀", "services_ads")],
+        [("🤑 Investissement intelligent 🤑", "services_investment")],
+        [("🔙 Retour", "back_to_main")]
+    ]
+
+
+@keyboards.screen("join_us")
+def _join_us_keyboard(lang: str):
+    return KeyboardManager.get_join_us_keyboard(lang)
+
+
+@keyboards.screen("bot_detail")
+def _bot_detail_keyboard(lang: str):
+    return [
+        [(get_text(lang, 'bot_info_title'), "show_bot_info:", "bot_username")],
+        [(get_text(lang, 'start_child_bot'), "start_bot:", "bot_username"),
+         (get_text(lang, 'stop_child_bot'), "stop_bot:", "bot_username")],
+        [(get_text(lang, 'restart_child_bot'), "restart_bot:", "bot_username")],
+        [(get_text(lang, 'bot_settings'), "bot_settings:", "bot_username")],
+        [(get_text(lang, 'bot_analytics'), "bot_analytics:", "bot_username"),
+         (get_text(lang, 'bot_logs'), "bot_logs:", "bot_username")],
+        [(get_text(lang, 'back_button'), "my_bots")]
+    ]
+
+
+@keyboards.screen("bot_settings")
+def _bot_settings_keyboard(lang: str):
+    return [
+        [(get_text(lang, 'group_management'), "under_construction")],
+        [(get_text(lang, 'welcome_message_setup'), "under_construction")],
+        [(get_text(lang, 'auto_responses'), "under_construction")],
+        [(get_text(lang, 'user_permissions'), "under_construction")],
+        [(get_text(lang, 'notification_settings'), "under_construction")],
+        [(get_text(lang, 'security_settings'), "under_construction")],
+        [(get_text(lang, 'api_settings'), "under_construction")],
+        [(get_text(lang, 'webhook_settings'), "webhook:", "bot_username")],
+        [(get_text(lang, 'backup_restore'), "under_construction")],
+        [(get_text(lang, 'back_button'), "bot_detail:", "bot_username")]
+    ]
+
+
+@keyboards.screen("back_to_bot")
+def _back_to_bot_keyboard(lang: str):
+    return [[(get_text(lang, 'back_button'), "bot_detail:", "bot_username")]]
+
+
 # Menu principal simplifié
 async def show_main_menu(update: Update, context: CallbackContext):
     """Affiche le menu principal"""
@@ -197,1347 +3909,373 @@ async def show_main_menu(update: Update, context: CallbackContext):
             "Welcome to your Telegram bot manager!"
         )
         
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🤖 Mes bots", callback_data="my_bots")],
-            [InlineKeyboardButton("🌐 Langue", callback_data="language_menu")],
-            [InlineKeyboardButton("🆘 Aide", callback_data="help")]
-        ])
-        
-        if update.message:
-            await update.message.reply_text(text, reply_markup=keyboard, parse_mode="HTML")
-        else:
-            await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
-            
-    except Exception as e:
-        logger.error(f"Erreur dans show_main_menu: {e}")
-
-# Gestionnaire de paiement fictif
-class PaymentProcessor:
-    async def process_payment(self, user_id: int, amount: float, currency: str, plan_id: str) -> bool:
-        # Simulation d'un paiement réussi
-        return True
-
-# Dictionnaire des traductions
-TRANSLATIONS = {
-    'fr': {
-        'bot_token': "Token du bot",
-        'token_not_found': "Token non trouvé",
-        'bot_not_found': "Bot non trouvé", 
-        'error_try_again': "Erreur, veuillez réessayer",
-        'back_button': "Retour",
-        'cancel': "Annuler",
-        'token_invalid': "Token invalide",
-        'token_validation_error': "Erreur de validation du token",
-        'bot_already_exists': "Ce bot existe déjà",
-        'creating_bot_app': "Création de l'application bot...",
-        'start_bot_success': "Bot démarré avec succès",
-        'start_bot_error': "Erreur lors du démarrage du bot",
-        'bot_saved_success': "Bot sauvegardé avec succès",
-        'delete_confirmation': "Confirmation de suppression",
-        'this_action_irreversible': "Cette action est irréversible",
-        'yes_delete': "Oui, supprimer",
-        'no_cancel': "Non, annuler",
-        'delete_scheduled': "Suppression programmée",
-        'deletion_cancelled': "Suppression annulée",
-        'cancel_deletion': "Annuler la suppression",
-        'bot_info_title': "Informations du bot",
-        'start_child_bot': "Démarrer le bot",
-        'stop_child_bot': "Arrêter le bot",
-        'restart_child_bot': "Redémarrer le bot",
-        'bot_settings': "Paramètres du bot",
-        'bot_analytics': "Analytiques du bot",
-        'bot_logs': "Journaux du bot",
-        'bot_status_online': "En ligne",
-        'bot_status_offline': "Hors ligne",
-        'language_selection': "Sélection de la langue",
-        'language_changed': "Langue modifiée avec succès",
-        'bot_manager_title': "Gestionnaire de bots",
-        'available_commands': "Commandes disponibles",
-        'change_language': "Changer la langue",
-        'manage_bots': "Gérer les bots",
-        'help_command': "Aide",
-        'current_features': "Fonctionnalités actuelles",
-        'multilingual_support': "Support multilingue",
-        'bot_management': "Gestion des bots",
-        'user_preferences': "Préférences utilisateur",
-        'demo_mode': "Mode démo actif",
-        'welcome': "Bienvenue ! Choisissez votre langue :",
-        'data_export': "Exporter les données"
-    },
-    'en': {
-        'bot_token': "Bot token",
-        'token_not_found': "Token not found",
-        'bot_not_found': "Bot not found",
-        'error_try_again': "Error, please try again",
-        'back_button': "Back",
-        'cancel': "Cancel",
-        'token_invalid': "Invalid token",
-        'token_validation_error': "Token validation error",
-        'bot_already_exists': "This bot already exists",
-        'creating_bot_app': "Creating bot application...",
-        'start_bot_success': "Bot started successfully",
-        'start_bot_error': "Error starting bot",
-        'bot_saved_success': "Bot saved successfully",
-        'delete_confirmation': "Delete confirmation",
-        'this_action_irreversible': "This action is irreversible",
-        'yes_delete': "Yes, delete",
-        'no_cancel': "No, cancel",
-        'delete_scheduled': "Deletion scheduled",
-        'deletion_cancelled': "Deletion cancelled",
-        'cancel_deletion': "Cancel deletion",
-        'bot_info_title': "Bot information",
-        'start_child_bot': "Start bot",
-        'stop_child_bot': "Stop bot", 
-        'restart_child_bot': "Restart bot",
-        'bot_settings': "Bot settings",
-        'bot_analytics': "Bot analytics",
-        'bot_logs': "Bot logs",
-        'bot_status_online': "Online",
-        'bot_status_offline': "Offline",
-        'language_selection': "Language selection",
-        'language_changed': "Language changed successfully",
-        'bot_manager_title': "Bot Manager",
-        'available_commands': "Available commands",
-        'change_language': "Change language",
-        'manage_bots': "Manage bots",
-        'help_command': "Help",
-        'current_features': "Current features",
-        'multilingual_support': "Multilingual support",
-        'bot_management': "Bot management",
-        'user_preferences': "User preferences",
-        'demo_mode': "Demo mode active",
-        'welcome': "Welcome! Choose your language:",
-        'data_export': "Export data"
-    },
-    
-    'es': {  # Español
-        # 'example_key': 'Translation in Español'
-        {
-  "bot_token": "Token del bot",
-  "token_not_found": "Token no encontrado",
-  "bot_not_found": "Bot no encontrado",
-  "error_try_again": "Error, inténtelo de nuevo",
-  "back": "Volver",
-  "cancel": "Cancelar",
-  "token_invalid": "Token inválido",
-  "token_validation_error": "Error de validación del token",
-  "bot_already_exists": "Este bot ya existe",
-  "creating_bot_app": "Creando la aplicación del bot...",
-  "start_bot_success": "Bot iniciado con éxito",
-  "start_bot_error": "Error al iniciar el bot",
-  "bot_saved_success": "Bot guardado con éxito",
-  "delete_confirmation": "Confirmación de eliminación",
-  "this_action_irreversible": "Esta acción es irreversible",
-  "yes_delete": "Sí, eliminar",
-  "no_cancel": "No, cancelar",
-  "delete_scheduled": "Eliminación programada",
-  "deletion_cancelled": "Eliminación cancelada",
-  "cancel_deletion": "Cancelar eliminación",
-  "bot_info_title": "Información del bot",
-  "start_child_bot": "Iniciar el bot",
-  "stop_child_bot": "Detener el bot",
-  "restart_child_bot": "Reiniciar el bot",
-  "bot_settings": "Configuraciones del bot",
-  "bot_analytics": "Analíticas del bot",
-  "bot_logs": "Registros del bot",
-  "bot_status_online": "En línea",
-  "bot_status_offline": "Desconectado",
-  "language_selection": "Selección de idioma",
-  "language_changed": "Idioma cambiado con éxito",
-  "bot_manager_title": "Administrador de bots",
-  "available_commands": "Comandos disponibles",
-  "change_language": "Cambiar idioma",
-  "manage_bots": "Gestionar bots",
-  "help_command": "Ayuda",
-  "current_features": "Características actuales",
-  "multilingual_support": "Soporte multilingüe",
-  "bot_management": "Gestión de bots",
-  "user_preferences": "Preferencias del usuario",
-  "demo_mode": "Modo demo activo",
-  "welcome": "¡Bienvenido! Elige tu idioma:",
-  "data_export": "Exportar datos"
-}
-    },
-    'de': {  # Deutsch
-        # 'example_key': 'Translation in Deutsch'
-        {
-  "bot_token": "Bot-Token",
-  "token_not_found": "Token nicht gefunden",
-  "bot_not_found": "Bot nicht gefunden",
-  "error_try_again": "Fehler, bitte erneut versuchen",
-  "back": "Zurück",
-  "cancel": "Abbrechen",
-  "token_invalid": "Ungültiger Token",
-  "token_validation_error": "Token-Validierungsfehler",
-  "bot_already_exists": "Dieser Bot existiert bereits",
-  "creating_bot_app": "Bot-Anwendung wird erstellt...",
-  "start_bot_success": "Bot erfolgreich gestartet",
-  "start_bot_error": "Fehler beim Starten des Bots",
-  "bot_saved_success": "Bot erfolgreich gespeichert",
-  "delete_confirmation": "Löschbestätigung",
-  "this_action_irreversible": "Diese Aktion ist nicht rückgängig zu machen",
-  "yes_delete": "Ja, löschen",
-  "no_cancel": "Nein, abbrechen",
-  "delete_scheduled": "Löschung geplant",
-  "deletion_cancelled": "Löschung abgebrochen",
-  "cancel_deletion": "Löschung abbrechen",
-  "bot_info_title": "Bot-Informationen",
-  "start_child_bot": "Bot starten",
-  "stop_child_bot": "Bot stoppen",
-  "restart_child_bot": "Bot neu starten",
-  "bot_settings": "Bot-Einstellungen",
-  "bot_analytics": "Bot-Analysen",
-  "bot_logs": "Bot-Protokolle",
-  "bot_status_online": "Online",
-  "bot_status_offline": "Offline",
-  "language_selection": "Sprachauswahl",
-  "language_changed": "Sprache erfolgreich geändert",
-  "bot_manager_title": "Bot-Manager",
-  "available_commands": "Verfügbare Befehle",
-  "change_language": "Sprache ändern",
-  "manage_bots": "Bots verwalten",
-  "help_command": "Hilfe",
-  "current_features": "Aktuelle Funktionen",
-  "multilingual_support": "Mehrsprachige Unterstützung",
-  "bot_management": "Bot-Verwaltung",
-  "user_preferences": "Benutzereinstellungen",
-  "demo_mode": "Demo-Modus aktiv",
-  "welcome": "Willkommen! Bitte wählen Sie Ihre Sprache:",
-  "data_export": "Daten exportieren"
-}
-    },
-    'zh': {  # 中文
-        # 'example_key': 'Translation in 中文'
-        {
-  "bot_token": "机器人令牌",
-  "token_not_found": "未找到令牌",
-  "bot_not_found": "未找到机器人",
-  "error_try_again": "发生错误，请重试",
-  "back": "返回",
-  "cancel": "取消",
-  "token_invalid": "令牌无效",
-  "token_validation_error": "令牌验证错误",
-  "bot_already_exists": "该机器人已存在",
-  "creating_bot_app": "正在创建机器人应用...",
-  "start_bot_success": "机器人启动成功",
-  "start_bot_error": "启动机器人时出错",
-  "bot_saved_success": "机器人保存成功",
-  "delete_confirmation": "删除确认",
-  "this_action_irreversible": "此操作不可撤销",
-  "yes_delete": "是的，删除",
-  "no_cancel": "不，取消",
-  "delete_scheduled": "已安排删除",
-  "deletion_cancelled": "删除已取消",
-  "cancel_deletion": "取消删除",
-  "bot_info_title": "机器人信息",
-  "start_child_bot": "启动机器人",
-  "stop_child_bot": "停止机器人",
-  "restart_child_bot": "重启机器人",
-  "bot_settings": "机器人设置",
-  "bot_analytics": "机器人分析",
-  "bot_logs": "机器人日志",
-  "bot_status_online": "在线",
-  "bot_status_offline": "离线",
-  "language_selection": "选择语言",
-  "language_changed": "语言更改成功",
-  "bot_manager_title": "机器人管理器",
-  "available_commands": "可用命令",
-  "change_language": "更改语言",
-  "manage_bots": "管理机器人",
-  "help_command": "帮助",
-  "current_features": "当前功能",
-  "multilingual_support": "多语言支持",
-  "bot_management": "机器人管理",
-  "user_preferences": "用户偏好设置",
-  "demo_mode": "演示模式已激活",
-  "welcome": "欢迎！请选择您的语言：",
-  "data_export": "导出数据"
-}
-    },
-    'hi': {  # हिन्दी
-        # 'example_key': 'Translation in हिन्दी'
-        {
-  "bot_token": "बॉट टोकन",
-  "token_not_found": "टोकन नहीं मिला",
-  "bot_not_found": "बॉट नहीं मिला",
-  "error_try_again": "त्रुटि, कृपया पुनः प्रयास करें",
-  "back": "वापस",
-  "cancel": "रद्द करें",
-  "token_invalid": "अवैध टोकन",
-  "token_validation_error": "टोकन सत्यापन में त्रुटि",
-  "bot_already_exists": "यह बॉट पहले से मौजूद है",
-  "creating_bot_app": "बॉट ऐप बना रहे हैं...",
-  "start_bot_success": "बॉट सफलतापूर्वक शुरू हुआ",
-  "start_bot_error": "बॉट शुरू करने में त्रुटि",
-  "bot_saved_success": "बॉट सफलतापूर्वक सहेजा गया",
-  "delete_confirmation": "हटाने की पुष्टि",
-  "this_action_irreversible": "यह क्रिया अपरिवर्तनीय है",
-  "yes_delete": "हाँ, हटाएं",
-  "no_cancel": "नहीं, रद्द करें",
-  "delete_scheduled": "हटाने की योजना बनाई गई है",
-  "deletion_cancelled": "हटाना रद्द कर दिया गया",
-  "cancel_deletion": "हटाना रद्द करें",
-  "bot_info_title": "बॉट जानकारी",
-  "start_child_bot": "बॉट शुरू करें",
-  "stop_child_bot": "बॉट रोकें",
-  "restart_child_bot": "बॉट पुनः शुरू करें",
-  "bot_settings": "बॉट सेटिंग्स",
-  "bot_analytics": "बॉट विश्लेषण",
-  "bot_logs": "बॉट लॉग्स",
-  "bot_status_online": "ऑनलाइन",
-  "bot_status_offline": "ऑफलाइन",
-  "language_selection": "भाषा चयन",
-  "language_changed": "भाषा सफलतापूर्वक बदली गई",
-  "bot_manager_title": "बॉट प्रबंधक",
-  "available_commands": "उपलब्ध कमांड्स",
-  "change_language": "भाषा बदलें",
-  "manage_bots": "बॉट्स का प्रबंधन करें",
-  "help_command": "सहायता",
-  "current_features": "वर्तमान विशेषताएँ",
-  "multilingual_support": "बहुभाषीय समर्थन",
-  "bot_management": "बॉट प्रबंधन",
-  "user_preferences": "उपयोगकर्ता प्राथमिकताएँ",
-  "demo_mode": "डेमो मोड सक्रिय है",
-  "welcome": "स्वागत है! अपनी भाषा चुनें:",
-  "data_export": "डेटा निर्यात करें"
-}
-    },
-    'ja': {  # 日本語
-        # 'example_key': 'Translation in 日本語'
-        {
-  "bot_token": "ボットトークン",
-  "token_not_found": "トークンが見つかりません",
-  "bot_not_found": "ボットが見つかりません",
-  "error_try_again": "エラーが発生しました。もう一度お試しください",
-  "back": "戻る",
-  "cancel": "キャンセル",
-  "token_invalid": "無効なトークン",
-  "token_validation_error": "トークンの検証エラー",
-  "bot_already_exists": "このボットはすでに存在します",
-  "creating_bot_app": "ボットアプリを作成中...",
-  "start_bot_success": "ボットの起動に成功しました",
-  "start_bot_error": "ボットの起動中にエラーが発生しました",
-  "bot_saved_success": "ボットを正常に保存しました",
-  "delete_confirmation": "削除の確認",
-  "this_action_irreversible": "この操作は元に戻せません",
-  "yes_delete": "はい、削除する",
-  "no_cancel": "いいえ、キャンセルする",
-  "delete_scheduled": "削除が予定されました",
-  "deletion_cancelled": "削除がキャンセルされました",
-  "cancel_deletion": "削除をキャンセルする",
-  "bot_info_title": "ボットの情報",
-  "start_child_bot": "ボットを起動",
-  "stop_child_bot": "ボットを停止",
-  "restart_child_bot": "ボットを再起動",
-  "bot_settings": "ボットの設定",
-  "bot_analytics": "ボットの分析",
-  "bot_logs": "ボットログ",
-  "bot_status_online": "オンライン",
-  "bot_status_offline": "オフライン",
-  "language_selection": "言語選択",
-  "language_changed": "言語が正常に変更されました",
-  "bot_manager_title": "ボットマネージャー",
-  "available_commands": "利用可能なコマンド",
-  "change_language": "言語を変更する",
-  "manage_bots": "ボットを管理する",
-  "help_command": "ヘルプ",
-  "current_features": "現在の機能",
-  "multilingual_support": "多言語対応",
-  "bot_management": "ボット管理",
-  "user_preferences": "ユーザー設定",
-  "demo_mode": "デモモードが有効です",
-  "welcome": "ようこそ！言語を選択してください：",
-  "data_export": "データをエクスポートする"
-}
-    },
-    'ko': {  # 한국어
-        # 'example_key': 'Translation in 한국어'
-        {
-  "bot_token": "봇 토큰",
-  "token_not_found": "토큰을 찾을 수 없습니다",
-  "bot_not_found": "봇을 찾을 수 없습니다",
-  "error_try_again": "오류가 발생했습니다. 다시 시도해주세요",
-  "back": "뒤로",
-  "cancel": "취소",
-  "token_invalid": "유효하지 않은 토큰",
-  "token_validation_error": "토큰 검증 오류",
-  "bot_already_exists": "이 봇은 이미 존재합니다",
-  "creating_bot_app": "봇 애플리케이션 생성 중...",
-  "start_bot_success": "봇이 성공적으로 시작되었습니다",
-  "start_bot_error": "봇 시작 중 오류 발생",
-  "bot_saved_success": "봇이 성공적으로 저장되었습니다",
-  "delete_confirmation": "삭제 확인",
-  "this_action_irreversible": "이 작업은 되돌릴 수 없습니다",
-  "yes_delete": "예, 삭제합니다",
-  "no_cancel": "아니요, 취소합니다",
-  "delete_scheduled": "삭제 예정됨",
-  "deletion_cancelled": "삭제가 취소되었습니다",
-  "cancel_deletion": "삭제 취소",
-  "bot_info_title": "봇 정보",
-  "start_child_bot": "봇 시작",
-  "stop_child_bot": "봇 정지",
-  "restart_child_bot": "봇 재시작",
-  "bot_settings": "봇 설정",
-  "bot_analytics": "봇 분석",
-  "bot_logs": "봇 로그",
-  "bot_status_online": "온라인",
-  "bot_status_offline": "오프라인",
-  "language_selection": "언어 선택",
-  "language_changed": "언어가 성공적으로 변경되었습니다",
-  "bot_manager_title": "봇 관리자",
-  "available_commands": "사용 가능한 명령어",
-  "change_language": "언어 변경",
-  "manage_bots": "봇 관리",
-  "help_command": "도움말",
-  "current_features": "현재 기능",
-  "multilingual_support": "다국어 지원",
-  "bot_management": "봇 관리",
-  "user_preferences": "사용자 설정",
-  "demo_mode": "데모 모드 활성화됨",
-  "welcome": "환영합니다! 언어를 선택해주세요:",
-  "data_export": "데이터 내보내기"
-}
-    },
-    'th': {  # ไทย
-        # 'example_key': 'Translation in ไทย'
-        {
-  "bot_token": "โทเคนของบอต",
-  "token_not_found": "ไม่พบโทเคน",
-  "bot_not_found": "ไม่พบบอต",
-  "error_try_again": "เกิดข้อผิดพลาด กรุณาลองใหม่อีกครั้ง",
-  "back": "ย้อนกลับ",
-  "cancel": "ยกเลิก",
-  "token_invalid": "โทเคนไม่ถูกต้อง",
-  "token_validation_error": "ข้อผิดพลาดในการตรวจสอบโทเคน",
-  "bot_already_exists": "บอตนี้มีอยู่แล้ว",
-  "creating_bot_app": "กำลังสร้างแอปบอต...",
-  "start_bot_success": "เริ่มบอตสำเร็จ",
-  "start_bot_error": "เกิดข้อผิดพลาดขณะเริ่มบอต",
-  "bot_saved_success": "บันทึกบอตสำเร็จ",
-  "delete_confirmation": "ยืนยันการลบ",
-  "this_action_irreversible": "การดำเนินการนี้ไม่สามารถย้อนกลับได้",
-  "yes_delete": "ใช่ ลบเลย",
-  "no_cancel": "ไม่ ยกเลิก",
-  "delete_scheduled": "กำหนดลบไว้แล้ว",
-  "deletion_cancelled": "ยกเลิกการลบแล้ว",
-  "cancel_deletion": "ยกเลิกการลบ",
-  "bot_info_title": "ข้อมูลบอต",
-  "start_child_bot": "เริ่มบอต",
-  "stop_child_bot": "หยุดบอต",
-  "restart_child_bot": "รีสตาร์ทบอต",
-  "bot_settings": "การตั้งค่าบอต",
-  "bot_analytics": "การวิเคราะห์บอต",
-  "bot_logs": "บันทึกบอต",
-  "bot_status_online": "ออนไลน์",
-  "bot_status_offline": "ออฟไลน์",
-  "language_selection": "เลือกภาษา",
-  "language_changed": "เปลี่ยนภาษาสำเร็จแล้ว",
-  "bot_manager_title": "ผู้จัดการบอต",
-  "available_commands": "คำสั่งที่ใช้ได้",
-  "change_language": "เปลี่ยนภาษา",
-  "manage_bots": "จัดการบอต",
-  "help_command": "ความช่วยเหลือ",
-  "current_features": "คุณลักษณะปัจจุบัน",
-  "multilingual_support": "รองรับหลายภาษา",
-  "bot_management": "การจัดการบอต",
-  "user_preferences": "การตั้งค่าผู้ใช้",
-  "demo_mode": "โหมดสาธิตเปิดใช้งาน",
-  "welcome": "ยินดีต้อนรับ! กรุณาเลือกภาษา:",
-  "data_export": "ส่งออกข้อมูล"
-}
-    },
-    'ru': {  # Русский
-        # 'example_key': 'Translation in Русский'
-        {
-  "bot_token": "Токен бота",
-  "token_not_found": "Токен не найден",
-  "bot_not_found": "Бот не найден",
-  "error_try_again": "Ошибка, попробуйте еще раз",
-  "back": "Назад",
-  "cancel": "Отмена",
-  "token_invalid": "Недопустимый токен",
-  "token_validation_error": "Ошибка проверки токена",
-  "bot_already_exists": "Бот уже существует",
-  "creating_bot_app": "Создание приложения бота...",
-  "start_bot_success": "Бот успешно запущен",
-  "start_bot_error": "Ошибка при запуске бота",
-  "bot_saved_success": "Бот успешно сохранён",
-  "delete_confirmation": "Подтверждение удаления",
-  "this_action_irreversible": "Это действие необратимо",
-  "yes_delete": "Да, удалить",
-  "no_cancel": "Нет, отмена",
-  "delete_scheduled": "Удаление запланировано",
-  "deletion_cancelled": "Удаление отменено",
-  "cancel_deletion": "Отменить удаление",
-  "bot_info_title": "Информация о боте",
-  "start_child_bot": "Запустить бота",
-  "stop_child_bot": "Остановить бота",
-  "restart_child_bot": "Перезапустить бота",
-  "bot_settings": "Настройки бота",
-  "bot_analytics": "Аналитика бота",
-  "bot_logs": "Логи бота",
-  "bot_status_online": "Онлайн",
-  "bot_status_offline": "Оффлайн",
-  "language_selection": "Выбор языка",
-  "language_changed": "Язык успешно изменён",
-  "bot_manager_title": "Менеджер ботов",
-  "available_commands": "Доступные команды",
-  "change_language": "Сменить язык",
-  "manage_bots": "Управление ботами",
-  "help_command": "Помощь",
-  "current_features": "Текущие функции",
-  "multilingual_support": "Многоязычная поддержка",
-  "bot_management": "Управление ботом",
-  "user_preferences": "Настройки пользователя",
-  "demo_mode": "Демо-режим активен",
-  "welcome": "Добро пожаловать! Выберите язык:",
-  "data_export": "Экспорт данных"
-}
-    },
-    'pt': {  # Português
-        # 'example_key': 'Translation in Português'
-        {
-  "bot_token": "Token do bot",
-  "token_not_found": "Token não encontrado",
-  "bot_not_found": "Bot não encontrado",
-  "error_try_again": "Erro, tente novamente",
-  "back": "Voltar",
-  "cancel": "Cancelar",
-  "token_invalid": "Token inválido",
-  "token_validation_error": "Erro de validação do token",
-  "bot_already_exists": "Este bot já existe",
-  "creating_bot_app": "Criando aplicativo do bot...",
-  "start_bot_success": "Bot iniciado com sucesso",
-  "start_bot_error": "Erro ao iniciar o bot",
-  "bot_saved_success": "Bot salvo com sucesso",
-  "delete_confirmation": "Confirmação de exclusão",
-  "this_action_irreversible": "Esta ação é irreversível",
-  "yes_delete": "Sim, excluir",
-  "no_cancel": "Não, cancelar",
-  "delete_scheduled": "Exclusão agendada",
-  "deletion_cancelled": "Exclusão cancelada",
-  "cancel_deletion": "Cancelar exclusão",
-  "bot_info_title": "Informações do bot",
-  "start_child_bot": "Iniciar bot",
-  "stop_child_bot": "Parar bot",
-  "restart_child_bot": "Reiniciar bot",
-  "bot_settings": "Configurações do bot",
-  "bot_analytics": "Análises do bot",
-  "bot_logs": "Registros do bot",
-  "bot_status_online": "Online",
-  "bot_status_offline": "Offline",
-  "language_selection": "Seleção de idioma",
-  "language_changed": "Idioma alterado com sucesso",
-  "bot_manager_title": "Gerenciador de bots",
-  "available_commands": "Comandos disponíveis",
-  "change_language": "Alterar idioma",
-  "manage_bots": "Gerenciar bots",
-  "help_command": "Ajuda",
-  "current_features": "Recursos atuais",
-  "multilingual_support": "Suporte multilíngue",
-  "bot_management": "Gestão de bots",
-  "user_preferences": "Preferências do usuário",
-  "demo_mode": "Modo demonstração ativado",
-  "welcome": "Bem-vindo! Escolha seu idioma:",
-  "data_export": "Exportar dados"
-}
-    },
-    'it': {  # Italiano
-        # 'example_key': 'Translation in Italiano'
-        {
-  "bot_token": "Token del bot",
-  "token_not_found": "Token non trovato",
-  "bot_not_found": "Bot non trovato",
-  "error_try_again": "Errore, riprova",
-  "back": "Indietro",
-  "cancel": "Annulla",
-  "token_invalid": "Token non valido",
-  "token_validation_error": "Errore di convalida del token",
-  "bot_already_exists": "Questo bot esiste già",
-  "creating_bot_app": "Creazione dell'app del bot...",
-  "start_bot_success": "Bot avviato con successo",
-  "start_bot_error": "Errore durante l'avvio del bot",
-  "bot_saved_success": "Bot salvato con successo",
-  "delete_confirmation": "Conferma eliminazione",
-  "this_action_irreversible": "Questa azione è irreversibile",
-  "yes_delete": "Sì, elimina",
-  "no_cancel": "No, annulla",
-  "delete_scheduled": "Eliminazione programmata",
-  "deletion_cancelled": "Eliminazione annullata",
-  "cancel_deletion": "Annulla eliminazione",
-  "bot_info_title": "Informazioni del bot",
-  "start_child_bot": "Avvia bot",
-  "stop_child_bot": "Ferma bot",
-  "restart_child_bot": "Riavvia bot",
-  "bot_settings": "Impostazioni del bot",
-  "bot_analytics": "Analisi del bot",
-  "bot_logs": "Log del bot",
-  "bot_status_online": "Online",
-  "bot_status_offline": "Offline",
-  "language_selection": "Selezione della lingua",
-  "language_changed": "Lingua modificata con successo",
-  "bot_manager_title": "Gestore dei bot",
-  "available_commands": "Comandi disponibili",
-  "change_language": "Cambia lingua",
-  "manage_bots": "Gestisci i bot",
-  "help_command": "Aiuto",
-  "current_features": "Funzionalità attuali",
-  "multilingual_support": "Supporto multilingue",
-  "bot_management": "Gestione bot",
-  "user_preferences": "Preferenze utente",
-  "demo_mode": "Modalità demo attiva",
-  "welcome": "Benvenuto! Scegli la tua lingua:",
-  "data_export": "Esporta dati"
-}
-    },
-    'ar': {  # العربية
-        # 'example_key': 'Translation in العربية'
-        {
-  "bot_token": "رمز البوت",
-  "token_not_found": "الرمز غير موجود",
-  "bot_not_found": "البوت غير موجود",
-  "error_try_again": "حدث خطأ، يرجى المحاولة مرة أخرى",
-  "back": "رجوع",
-  "cancel": "إلغاء",
-  "token_invalid": "رمز غير صالح",
-  "token_validation_error": "خطأ في التحقق من الرمز",
-  "bot_already_exists": "هذا البوت موجود بالفعل",
-  "creating_bot_app": "جاري إنشاء تطبيق البوت...",
-  "start_bot_success": "تم تشغيل البوت بنجاح",
-  "start_bot_error": "حدث خطأ أثناء تشغيل البوت",
-  "bot_saved_success": "تم حفظ البوت بنجاح",
-  "delete_confirmation": "تأكيد الحذف",
-  "this_action_irreversible": "هذا الإجراء لا يمكن التراجع عنه",
-  "yes_delete": "نعم، احذف",
-  "no_cancel": "لا، إلغاء",
-  "delete_scheduled": "تم تحديد موعد الحذف",
-  "deletion_cancelled": "تم إلغاء الحذف",
-  "cancel_deletion": "إلغاء الحذف",
-  "bot_info_title": "معلومات البوت",
-  "start_child_bot": "بدء البوت",
-  "stop_child_bot": "إيقاف البوت",
-  "restart_child_bot": "إعادة تشغيل البوت",
-  "bot_settings": "إعدادات البوت",
-  "bot_analytics": "تحليلات البوت",
-  "bot_logs": "سجلات البوت",
-  "bot_status_online": "متصل",
-  "bot_status_offline": "غير متصل",
-  "language_selection": "اختيار اللغة",
-  "language_changed": "تم تغيير اللغة بنجاح",
-  "bot_manager_title": "مدير البوتات",
-  "available_commands": "الأوامر المتاحة",
-  "change_language": "تغيير اللغة",
-  "manage_bots": "إدارة البوتات",
-  "help_command": "مساعدة",
-  "current_features": "الميزات الحالية",
-  "multilingual_support": "دعم متعدد اللغات",
-  "bot_management": "إدارة البوتات",
-  "user_preferences": "تفضيلات المستخدم",
-  "demo_mode": "وضع العرض مفعل",
-  "welcome": "مرحبًا! يرجى اختيار لغتك:",
-  "data_export": "تصدير البيانات"
-}
-    },
-    'tr': {  # Türkçe
-        # 'example_key': 'Translation in Türkçe'
-        {
-  "bot_token": "Bot belirteci",
-  "token_not_found": "Belirteç bulunamadı",
-  "bot_not_found": "Bot bulunamadı",
-  "error_try_again": "Hata oluştu, lütfen tekrar deneyin",
-  "back": "Geri",
-  "cancel": "İptal",
-  "token_invalid": "Geçersiz belirteç",
-  "token_validation_error": "Belirteç doğrulama hatası",
-  "bot_already_exists": "Bu bot zaten mevcut",
-  "creating_bot_app": "Bot uygulaması oluşturuluyor...",
-  "start_bot_success": "Bot başarıyla başlatıldı",
-  "start_bot_error": "Bot başlatılırken hata oluştu",
-  "bot_saved_success": "Bot başarıyla kaydedildi",
-  "delete_confirmation": "Silme onayı",
-  "this_action_irreversible": "Bu işlem geri alınamaz",
-  "yes_delete": "Evet, sil",
-  "no_cancel": "Hayır, iptal et",
-  "delete_scheduled": "Silme zamanlandı",
-  "deletion_cancelled": "Silme işlemi iptal edildi",
-  "cancel_deletion": "Silme işlemini iptal et",
-  "bot_info_title": "Bot bilgileri",
-  "start_child_bot": "Botu başlat",
-  "stop_child_bot": "Botu durdur",
-  "restart_child_bot": "Botu yeniden başlat",
-  "bot_settings": "Bot ayarları",
-  "bot_analytics": "Bot analizleri",
-  "bot_logs": "Bot günlükleri",
-  "bot_status_online": "Çevrimiçi",
-  "bot_status_offline": "Çevrimdışı",
-  "language_selection": "Dil seçimi",
-  "language_changed": "Dil başarıyla değiştirildi",
-  "bot_manager_title": "Bot yöneticisi",
-  "available_commands": "Mevcut komutlar",
-  "change_language": "Dili değiştir",
-  "manage_bots": "Botları yönet",
-  "help_command": "Yardım",
-  "current_features": "Mevcut özellikler",
-  "multilingual_support": "Çoklu dil desteği",
-  "bot_management": "Bot yönetimi",
-  "user_preferences": "Kullanıcı tercihleri",
-  "demo_mode": "Demo modu etkin",
-  "welcome": "Hoş geldiniz! Lütfen dilinizi seçin:",
-  "data_export": "Verileri dışa aktar"
-}
-    },
-    'vi': {  # Tiếng Việt
-        # 'example_key': 'Translation in Tiếng Việt'
-        {
-  "bot_token": "Mã token của bot",
-  "token_not_found": "Không tìm thấy token",
-  "bot_not_found": "Không tìm thấy bot",
-  "error_try_again": "Đã xảy ra lỗi, vui lòng thử lại",
-  "back": "Quay lại",
-  "cancel": "Hủy",
-  "token_invalid": "Token không hợp lệ",
-  "token_validation_error": "Lỗi xác thực token",
-  "bot_already_exists": "Bot này đã tồn tại",
-  "creating_bot_app": "Đang tạo ứng dụng bot...",
-  "start_bot_success": "Khởi động bot thành công",
-  "start_bot_error": "Lỗi khi khởi động bot",
-  "bot_saved_success": "Đã lưu bot thành công",
-  "delete_confirmation": "Xác nhận xóa",
-  "this_action_irreversible": "Hành động này không thể hoàn tác",
-  "yes_delete": "Có, xóa",
-  "no_cancel": "Không, hủy",
-  "delete_scheduled": "Đã lên lịch xóa",
-  "deletion_cancelled": "Đã hủy xóa",
-  "cancel_deletion": "Hủy xóa",
-  "bot_info_title": "Thông tin bot",
-  "start_child_bot": "Khởi động bot",
-  "stop_child_bot": "Dừng bot",
-  "restart_child_bot": "Khởi động lại bot",
-  "bot_settings": "Cài đặt bot",
-  "bot_analytics": "Phân tích bot",
-  "bot_logs": "Nhật ký bot",
-  "bot_status_online": "Trực tuyến",
-  "bot_status_offline": "Ngoại tuyến",
-  "language_selection": "Chọn ngôn ngữ",
-  "language_changed": "Thay đổi ngôn ngữ thành công",
-  "bot_manager_title": "Trình quản lý bot",
-  "available_commands": "Lệnh khả dụng",
-  "change_language": "Thay đổi ngôn ngữ",
-  "manage_bots": "Quản lý bot",
-  "help_command": "Trợ giúp",
-  "current_features": "Tính năng hiện tại",
-  "multilingual_support": "Hỗ trợ đa ngôn ngữ",
-  "bot_management": "Quản lý bot",
-  "user_preferences": "Tùy chọn người dùng",
-  "demo_mode": "Chế độ demo đang hoạt động",
-  "welcome": "Chào mừng! Vui lòng chọn ngôn ngữ:",
-  "data_export": "Xuất dữ liệu"
-}
-    },
-    'pl': {  # Polski
-        # 'example_key': 'Translation in Polski'
-        {
-  "bot_token": "Token bota",
-  "token_not_found": "Nie znaleziono tokenu",
-  "bot_not_found": "Nie znaleziono bota",
-  "error_try_again": "Wystąpił błąd, spróbuj ponownie",
-  "back": "Wstecz",
-  "cancel": "Anuluj",
-  "token_invalid": "Nieprawidłowy token",
-  "token_validation_error": "Błąd walidacji tokenu",
-  "bot_already_exists": "Ten bot już istnieje",
-  "creating_bot_app": "Tworzenie aplikacji bota...",
-  "start_bot_success": "Bot został pomyślnie uruchomiony",
-  "start_bot_error": "Błąd podczas uruchamiania bota",
-  "bot_saved_success": "Bot został pomyślnie zapisany",
-  "delete_confirmation": "Potwierdzenie usunięcia",
-  "this_action_irreversible": "Tej operacji nie można cofnąć",
-  "yes_delete": "Tak, usuń",
-  "no_cancel": "Nie, anuluj",
-  "delete_scheduled": "Usunięcie zaplanowane",
-  "deletion_cancelled": "Usunięcie anulowane",
-  "cancel_deletion": "Anuluj usunięcie",
-  "bot_info_title": "Informacje o bocie",
-  "start_child_bot": "Uruchom bota",
-  "stop_child_bot": "Zatrzymaj bota",
-  "restart_child_bot": "Uruchom ponownie bota",
-  "bot_settings": "Ustawienia bota",
-  "bot_analytics": "Analizy bota",
-  "bot_logs": "Logi bota",
-  "bot_status_online": "Online",
-  "bot_status_offline": "Offline",
-  "language_selection": "Wybór języka",
-  "language_changed": "Język został pomyślnie zmieniony",
-  "bot_manager_title": "Menedżer botów",
-  "available_commands": "Dostępne polecenia",
-  "change_language": "Zmień język",
-  "manage_bots": "Zarządzaj botami",
-  "help_command": "Pomoc",
-  "current_features": "Obecne funkcje",
-  "multilingual_support": "Obsługa wielu języków",
-  "bot_management": "Zarządzanie botami",
-  "user_preferences": "Preferencje użytkownika",
-  "demo_mode": "Tryb demonstracyjny aktywny",
-  "welcome": "Witaj! Wybierz swój język:",
-  "data_export": "Eksport danych"
-}
-    },
-    'nl': {  # Nederlands
-        # 'example_key': 'Translation in Nederlands'
-        {
-  "bot_token": "Bot-token",
-  "token_not_found": "Token niet gevonden",
-  "bot_not_found": "Bot niet gevonden",
-  "error_try_again": "Fout, probeer het opnieuw",
-  "back": "Terug",
-  "cancel": "Annuleren",
-  "token_invalid": "Ongeldig token",
-  "token_validation_error": "Fout bij tokenvalidatie",
-  "bot_already_exists": "Deze bot bestaat al",
-  "creating_bot_app": "Bot-app wordt aangemaakt...",
-  "start_bot_success": "Bot succesvol gestart",
-  "start_bot_error": "Fout bij het starten van de bot",
-  "bot_saved_success": "Bot succesvol opgeslagen",
-  "delete_confirmation": "Verwijderbevestiging",
-  "this_action_irreversible": "Deze actie is onomkeerbaar",
-  "yes_delete": "Ja, verwijderen",
-  "no_cancel": "Nee, annuleren",
-  "delete_scheduled": "Verwijdering gepland",
-  "deletion_cancelled": "Verwijdering geannuleerd",
-  "cancel_deletion": "Verwijdering annuleren",
-  "bot_info_title": "Botinformatie",
-  "start_child_bot": "Start bot",
-  "stop_child_bot": "Stop bot",
-  "restart_child_bot": "Herstart bot",
-  "bot_settings": "Botinstellingen",
-  "bot_analytics": "Botanalyse",
-  "bot_logs": "Botlogboeken",
-  "bot_status_online": "Online",
-  "bot_status_offline": "Offline",
-  "language_selection": "Taalkeuze",
-  "language_changed": "Taal succesvol gewijzigd",
-  "bot_manager_title": "Botbeheerder",
-  "available_commands": "Beschikbare commando's",
-  "change_language": "Taal wijzigen",
-  "manage_bots": "Beheer bots",
-  "help_command": "Help",
-  "current_features": "Huidige functies",
-  "multilingual_support": "Meertalige ondersteuning",
-  "bot_management": "Botbeheer",
-  "user_preferences": "Gebruikersvoorkeuren",
-  "demo_mode": "Demomodus actief",
-  "welcome": "Welkom! Kies je taal:",
-  "data_export": "Gegevens exporteren"
-}
-    },
-    'sv': {  # Svenska
-        # 'example_key': 'Translation in Svenska'
-        {
-  "bot_token": "Bot-token",
-  "token_not_found": "Token hittades inte",
-  "bot_not_found": "Bot hittades inte",
-  "error_try_again": "Fel, försök igen",
-  "back": "Tillbaka",
-  "cancel": "Avbryt",
-  "token_invalid": "Ogiltig token",
-  "token_validation_error": "Tokenverifieringsfel",
-  "bot_already_exists": "Denna bot finns redan",
-  "creating_bot_app": "Skapar bot-applikation...",
-  "start_bot_success": "Bot startades framgångsrikt",
-  "start_bot_error": "Fel vid start av bot",
-  "bot_saved_success": "Bot sparades framgångsrikt",
-  "delete_confirmation": "Bekräfta borttagning",
-  "this_action_irreversible": "Denna åtgärd kan inte ångras",
-  "yes_delete": "Ja, ta bort",
-  "no_cancel": "Nej, avbryt",
-  "delete_scheduled": "Borttagning planerad",
-  "deletion_cancelled": "Borttagning avbröts",
-  "cancel_deletion": "Avbryt borttagning",
-  "bot_info_title": "Botinformation",
-  "start_child_bot": "Starta bot",
-  "stop_child_bot": "Stoppa bot",
-  "restart_child_bot": "Starta om bot",
-  "bot_settings": "Botinställningar",
-  "bot_analytics": "Botanalys",
-  "bot_logs": "Botloggar",
-  "bot_status_online": "Online",
-  "bot_status_offline": "Offline",
-  "language_selection": "Språkval",
-  "language_changed": "Språk har ändrats",
-  "bot_manager_title": "Bothanterare",
-  "available_commands": "Tillgängliga kommandon",
-  "change_language": "Byt språk",
-  "manage_bots": "Hantera bottar",
-  "help_command": "Hjälp",
-  "current_features": "Nuvarande funktioner",
-  "multilingual_support": "Flerspråkigt stöd",
-  "bot_management": "Botadministration",
-  "user_preferences": "Användarinställningar",
-  "demo_mode": "Demoläge aktivt",
-  "welcome": "Välkommen! Välj ditt språk:",
-  "data_export": "Exportera data"
-}
-    },
-    'uk': {  # Українська
-        # 'example_key': 'Translation in Українська'
-        {
-  "bot_token": "Токен бота",
-  "token_not_found": "Токен не знайдено",
-  "bot_not_found": "Бота не знайдено",
-  "error_try_again": "Сталася помилка, спробуйте ще раз",
-  "back": "Назад",
-  "cancel": "Скасувати",
-  "token_invalid": "Недійсний токен",
-  "token_validation_error": "Помилка валідації токена",
-  "bot_already_exists": "Цей бот вже існує",
-  "creating_bot_app": "Створення застосунку для бота...",
-  "start_bot_success": "Бот успішно запущено",
-  "start_bot_error": "Помилка при запуску бота",
-  "bot_saved_success": "Бота успішно збережено",
-  "delete_confirmation": "Підтвердження видалення",
-  "this_action_irreversible": "Цю дію неможливо скасувати",
-  "yes_delete": "Так, видалити",
-  "no_cancel": "Ні, скасувати",
-  "delete_scheduled": "Видалення заплановано",
-  "deletion_cancelled": "Видалення скасовано",
-  "cancel_deletion": "Скасувати видалення",
-  "bot_info_title": "Інформація про бота",
-  "start_child_bot": "Запустити бота",
-  "stop_child_bot": "Зупинити бота",
-  "restart_child_bot": "Перезапустити бота",
-  "bot_settings": "Налаштування бота",
-  "bot_analytics": "Аналітика бота",
-  "bot_logs": "Логи бота",
-  "bot_status_online": "Онлайн",
-  "bot_status_offline": "Офлайн",
-  "language_selection": "Вибір мови",
-  "language_changed": "Мову успішно змінено",
-  "bot_manager_title": "Менеджер ботів",
-  "available_commands": "Доступні команди",
-  "change_language": "Змінити мову",
-  "manage_bots": "Керувати ботами",
-  "help_command": "Допомога",
-  "current_features": "Поточні функції",
-  "multilingual_support": "Підтримка багатомовності",
-  "bot_management": "Керування ботом",
-  "user_preferences": "Налаштування користувача",
-  "demo_mode": "Демо-режим активний",
-  "welcome": "Ласкаво просимо! Оберіть мову:",
-  "data_export": "Експорт даних"
-}
-    },
-    'sw': {  # Kiswahili
-        # 'example_key': 'Translation in Kiswahili'
-        {
-  "bot_token": "Tokeni ya bot",
-  "token_not_found": "Tokeni haijapatikana",
-  "bot_not_found": "Bot haijapatikana",
-  "error_try_again": "Hitilafu imetokea, tafadhali jaribu tena",
-  "back": "Rudi nyuma",
-  "cancel": "Ghairi",
-  "token_invalid": "Tokeni si sahihi",
-  "token_validation_error": "Hitilafu ya uthibitishaji wa tokeni",
-  "bot_already_exists": "Bot hii tayari ipo",
-  "creating_bot_app": "Inaunda programu ya bot...",
-  "start_bot_success": "Bot imeanza kwa mafanikio",
-  "start_bot_error": "Hitilafu ilipotokea wakati wa kuanza bot",
-  "bot_saved_success": "Bot imehifadhiwa kwa mafanikio",
-  "delete_confirmation": "Uthibitisho wa kufuta",
-  "this_action_irreversible": "Hatua hii haiwezi kubatilishwa",
-  "yes_delete": "Ndio, futa",
-  "no_cancel": "Hapana, ghairi",
-  "delete_scheduled": "Kufuta kumewekwa ratiba",
-  "deletion_cancelled": "Kufuta kumefutwa",
-  "cancel_deletion": "Ghairi kufuta",
-  "bot_info_title": "Maelezo ya bot",
-  "start_child_bot": "Anzisha bot",
-  "stop_child_bot": "Simamisha bot",
-  "restart_child_bot": "Anzisha upya bot",
-  "bot_settings": "Mipangilio ya bot",
-  "bot_analytics": "Takwimu za bot",
-  "bot_logs": "Rekodi za bot",
-  "bot_status_online": "Mtandaoni",
-  "bot_status_offline": "Nje ya mtandao",
-  "language_selection": "Chagua lugha",
-  "language_changed": "Lugha imebadilishwa kwa mafanikio",
-  "bot_manager_title": "Meneja wa bot",
-  "available_commands": "Amri zinazopatikana",
-  "change_language": "Badilisha lugha",
-  "manage_bots": "Simamia bot",
-  "help_command": "Msaada",
-  "current_features": "Vipengele vya sasa",
-  "multilingual_support": "Msaada wa lugha nyingi",
-  "bot_management": "Usimamizi wa bot",
-  "user_preferences": "Mapendeleo ya mtumiaji",
-  "demo_mode": "Hali ya majaribio imewashwa",
-  "welcome": "Karibu! Tafadhali chagua lugha yako:",
-  "data_export": "Hamisha data"
-}
-    },
-    'he': {  # עברית
-        # 'example_key': 'Translation in עברית'
-        {
-  "bot_token": "אסימון הבוט",
-  "token_not_found": "האסימון לא נמצא",
-  "bot_not_found": "הבוט לא נמצא",
-  "error_try_again": "שגיאה, נסה שוב",
-  "back": "חזרה",
-  "cancel": "ביטול",
-  "token_invalid": "אסימון שגוי",
-  "token_validation_error": "שגיאה באימות האסימון",
-  "bot_already_exists": "הבוט כבר קיים",
-  "creating_bot_app": "יוצר אפליקציית בוט...",
-  "start_bot_success": "הבוט הופעל בהצלחה",
-  "start_bot_error": "שגיאה בעת הפעלת הבוט",
-  "bot_saved_success": "הבוט נשמר בהצלחה",
-  "delete_confirmation": "אישור מחיקה",
-  "this_action_irreversible": "פעולה זו אינה הפיכה",
-  "yes_delete": "כן, מחק",
-  "no_cancel": "לא, בטל",
-  "delete_scheduled": "המחיקה תוזמנה",
-  "deletion_cancelled": "המחיקה בוטלה",
-  "cancel_deletion": "בטל מחיקה",
-  "bot_info_title": "מידע על הבוט",
-  "start_child_bot": "הפעלת הבוט",
-  "stop_child_bot": "הפסקת הבוט",
-  "restart_child_bot": "אתחול הבוט",
-  "bot_settings": "הגדרות הבוט",
-  "bot_analytics": "ניתוח נתוני הבוט",
-  "bot_logs": "יומני הבוט",
-  "bot_status_online": "מקוון",
-  "bot_status_offline": "לא מקוון",
-  "language_selection": "בחירת שפה",
-  "language_changed": "השפה שונתה בהצלחה",
-  "bot_manager_title": "מנהל הבוטים",
-  "available_commands": "פקודות זמינות",
-  "change_language": "שנה שפה",
-  "manage_bots": "ניהול בוטים",
-  "help_command": "עזרה",
-  "current_features": "פיצ׳רים נוכחיים",
-  "multilingual_support": "תמיכה רב־לשונית",
-  "bot_management": "ניהול בוטים",
-  "user_preferences": "העדפות משתמש",
-  "demo_mode": "מצב הדגמה פעיל",
-  "welcome": "ברוך הבא! אנא בחר שפה:",
-  "data_export": "ייצוא נתונים"
-}
-    },
-    'ro': {  # Română
-        # 'example_key': 'Translation in Română'
-        {
-  "bot_token": "Tokenul botului",
-  "token_not_found": "Tokenul nu a fost găsit",
-  "bot_not_found": "Botul nu a fost găsit",
-  "error_try_again": "Eroare, te rog încearcă din nou",
-  "back": "Înapoi",
-  "cancel": "Anulează",
-  "token_invalid": "Token invalid",
-  "token_validation_error": "Eroare la validarea tokenului",
-  "bot_already_exists": "Acest bot există deja",
-  "creating_bot_app": "Se creează aplicația botului...",
-  "start_bot_success": "Botul a fost pornit cu succes",
-  "start_bot_error": "Eroare la pornirea botului",
-  "bot_saved_success": "Botul a fost salvat cu succes",
-  "delete_confirmation": "Confirmare ștergere",
-  "this_action_irreversible": "Această acțiune este ireversibilă",
-  "yes_delete": "Da, șterge",
-  "no_cancel": "Nu, anulează",
-  "delete_scheduled": "Ștergerea a fost programată",
-  "deletion_cancelled": "Ștergerea a fost anulată",
-  "cancel_deletion": "Anulează ștergerea",
-  "bot_info_title": "Informații despre bot",
-  "start_child_bot": "Pornește botul",
-  "stop_child_bot": "Oprește botul",
-  "restart_child_bot": "Repornește botul",
-  "bot_settings": "Setări bot",
-  "bot_analytics": "Analize bot",
-  "bot_logs": "Jurnale bot",
-  "bot_status_online": "Online",
-  "bot_status_offline": "Offline",
-  "language_selection": "Selectare limbă",
-  "language_changed": "Limba a fost schimbată cu succes",
-  "bot_manager_title": "Managerul de boturi",
-  "available_commands": "Comenzi disponibile",
-  "change_language": "Schimbă limba",
-  "manage_bots": "Gestionează boturile",
-  "help_command": "Ajutor",
-  "current_features": "Funcționalități curente",
-  "multilingual_support": "Suport multilingv",
-  "bot_management": "Administrare boturi",
-  "user_preferences": "Preferințe utilizator",
-  "demo_mode": "Mod demo activat",
-  "welcome": "Bine ai venit! Alege limba:",
-  "data_export": "Exportă datele"
-}
-    },
-    'fa': {  # فارسی
-        # 'example_key': 'Translation in فارسی'
-        {
-  "bot_token": "توکن ربات",
-  "token_not_found": "توکن یافت نشد",
-  "bot_not_found": "ربات یافت نشد",
-  "error_try_again": "خطا، لطفاً دوباره تلاش کنید",
-  "back": "بازگشت",
-  "cancel": "لغو",
-  "token_invalid": "توکن نامعتبر است",
-  "token_validation_error": "خطا در اعتبارسنجی توکن",
-  "bot_already_exists": "این ربات قبلاً وجود دارد",
-  "creating_bot_app": "در حال ساخت اپلیکیشن ربات...",
-  "start_bot_success": "ربات با موفقیت راه‌اندازی شد",
-  "start_bot_error": "خطا در هنگام راه‌اندازی ربات",
-  "bot_saved_success": "ربات با موفقیت ذخیره شد",
-  "delete_confirmation": "تأیید حذف",
-  "this_action_irreversible": "این عملیات قابل بازگشت نیست",
-  "yes_delete": "بله، حذف شود",
-  "no_cancel": "خیر، لغو شود",
-  "delete_scheduled": "حذف زمان‌بندی شده است",
-  "deletion_cancelled": "حذف لغو شد",
-  "cancel_deletion": "لغو حذف",
-  "bot_info_title": "اطلاعات ربات",
-  "start_child_bot": "شروع ربات",
-  "stop_child_bot": "توقف ربات",
-  "restart_child_bot": "راه‌اندازی مجدد ربات",
-  "bot_settings": "تنظیمات ربات",
-  "bot_analytics": "تحلیل‌های ربات",
-  "bot_logs": "گزارش‌های ربات",
-  "bot_status_online": "آنلاین",
-  "bot_status_offline": "آفلاین",
-  "language_selection": "انتخاب زبان",
-  "language_changed": "زبان با موفقیت تغییر کرد",
-  "bot_manager_title": "مدیر ربات",
-  "available_commands": "دستورات قابل استفاده",
-  "change_language": "تغییر زبان",
-  "manage_bots": "مدیریت ربات‌ها",
-  "help_command": "راهنما",
-  "current_features": "ویژگی‌های فعلی",
-  "multilingual_support": "پشتیبانی چندزبانه",
-  "bot_management": "مدیریت ربات",
-  "user_preferences": "تنظیمات کاربر",
-  "demo_mode": "حالت دمو فعال است",
-  "welcome": "خوش آمدید! لطفاً زبان خود را انتخاب کنید:",
-  "data_export": "خروجی گرفتن از داده‌ها"
-}
-    },
-    'ms': {  # Bahasa Melayu
-        # 'example_key': 'Translation in Bahasa Melayu'
-        {
-  "bot_token": "Token bot",
-  "token_not_found": "Token tidak dijumpai",
-  "bot_not_found": "Bot tidak dijumpai",
-  "error_try_again": "Ralat berlaku, sila cuba lagi",
-  "back": "Kembali",
-  "cancel": "Batal",
-  "token_invalid": "Token tidak sah",
-  "token_validation_error": "Ralat pengesahan token",
-  "bot_already_exists": "Bot ini sudah wujud",
-  "creating_bot_app": "Sedang mencipta aplikasi bot...",
-  "start_bot_success": "Bot berjaya dimulakan",
-  "start_bot_error": "Ralat semasa memulakan bot",
-  "bot_saved_success": "Bot berjaya disimpan",
-  "delete_confirmation": "Pengesahan penghapusan",
-  "this_action_irreversible": "Tindakan ini tidak boleh diundurkan",
-  "yes_delete": "Ya, padam",
-  "no_cancel": "Tidak, batal",
-  "delete_scheduled": "Penghapusan telah dijadualkan",
-  "deletion_cancelled": "Penghapusan telah dibatalkan",
-  "cancel_deletion": "Batal penghapusan",
-  "bot_info_title": "Maklumat bot",
-  "start_child_bot": "Mulakan bot",
-  "stop_child_bot": "Hentikan bot",
-  "restart_child_bot": "Mulakan semula bot",
-  "bot_settings": "Tetapan bot",
-  "bot_analytics": "Analitik bot",
-  "bot_logs": "Log bot",
-  "bot_status_online": "Dalam talian",
-  "bot_status_offline": "Luar talian",
-  "language_selection": "Pemilihan bahasa",
-  "language_changed": "Bahasa telah berjaya ditukar",
-  "bot_manager_title": "Pengurus bot",
-  "available_commands": "Arahan yang tersedia",
-  "change_language": "Tukar bahasa",
-  "manage_bots": "Urus bot",
-  "help_command": "Bantuan",
-  "current_features": "Ciri-ciri semasa",
-  "multilingual_support": "Sokongan berbilang bahasa",
-  "bot_management": "Pengurusan bot",
-  "user_preferences": "Keutamaan pengguna",
-  "demo_mode": "Mod demo diaktifkan",
-  "welcome": "Selamat datang! Sila pilih bahasa anda:",
-  "data_export": "Eksport data"
-}
-    },
-    'id': {  # Bahasa Indonesia
-        # 'example_key': 'Translation in Bahasa Indonesia'
-        {
-  "bot_token": "Token bot",
-  "token_not_found": "Token tidak ditemukan",
-  "bot_not_found": "Bot tidak ditemukan",
-  "error_try_again": "Terjadi kesalahan, silakan coba lagi",
-  "back": "Kembali",
-  "cancel": "Batalkan",
-  "token_invalid": "Token tidak valid",
-  "token_validation_error": "Kesalahan validasi token",
-  "bot_already_exists": "Bot ini sudah ada",
-  "creating_bot_app": "Membuat aplikasi bot...",
-  "start_bot_success": "Bot berhasil dijalankan",
-  "start_bot_error": "Kesalahan saat menjalankan bot",
-  "bot_saved_success": "Bot berhasil disimpan",
-  "delete_confirmation": "Konfirmasi penghapusan",
-  "this_action_irreversible": "Tindakan ini tidak dapat dibatalkan",
-  "yes_delete": "Ya, hapus",
-  "no_cancel": "Tidak, batalkan",
-  "delete_scheduled": "Penghapusan dijadwalkan",
-  "deletion_cancelled": "Penghapusan dibatalkan",
-  "cancel_deletion": "Batalkan penghapusan",
-  "bot_info_title": "Informasi bot",
-  "start_child_bot": "Jalankan bot",
-  "stop_child_bot": "Hentikan bot",
-  "restart_child_bot": "Mulai ulang bot",
-  "bot_settings": "Pengaturan bot",
-  "bot_analytics": "Analitik bot",
-  "bot_logs": "Log bot",
-  "bot_status_online": "Online",
-  "bot_status_offline": "Offline",
-  "language_selection": "Pemilihan bahasa",
-  "language_changed": "Bahasa berhasil diubah",
-  "bot_manager_title": "Manajer bot",
-  "available_commands": "Perintah yang tersedia",
-  "change_language": "Ubah bahasa",
-  "manage_bots": "Kelola bot",
-  "help_command": "Bantuan",
-  "current_features": "Fitur saat ini",
-  "multilingual_support": "Dukungan multibahasa",
-  "bot_management": "Manajemen bot",
-  "user_preferences": "Preferensi pengguna",
-  "demo_mode": "Mode demo aktif",
-  "welcome": "Selamat datang! Silakan pilih bahasa Anda:",
-  "data_export": "Ekspor data"
-}
-    },
-}
-def get_text(lang: str, key: str) -> str:
-    """Récupère le texte traduit selon la langue"""
-    return TRANSLATIONS.get(lang, TRANSLATIONS['fr']).get(key, key)
-
-        # La fonction register_user_bot_handlers est asynchrone et sera appelée dans la tâche asyncio
-        
-    return application
+        keyboard = keyboards.get("main_menu", lang or 'fr')
+        
+        if update.message:
+            await update.message.reply_text(text, reply_markup=keyboard, parse_mode="HTML")
+        else:
+            await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
+            
     except Exception as e:
-    logger.error(f"Erreur dans handle_pdg_token_input: {e} [ERR_BLM_037]", exc_info=True)
-    await update.message.reply_text("❌ Erreur lors de la configuration du Bot PDG. Veuillez réessayer. Contactez le support (@TeleSucheSupport) si le problème persiste. (ERR_BLM_037)")
+        logger.error(f"Erreur dans show_main_menu: {e}")
 
-async def check_bot_limits(user_id: int) -> bool:
-    """Vérifie si l'utilisateur peut ajouter un nouveau bot"""
-    plan = get_user_plan(user_id)
-    user_bots = db.get_user_bots(user_id)
-    plan_limits = get_plan_limits(plan)
-    
-    # Check for trial period for 'free' plan
-    if plan == "free":
-        trial_end_date = db.get_user_trial_end_date(user_id)
-        if trial_end_date and datetime.now() < datetime.fromisoformat(trial_end_date):
-            # During trial, allow up to 10 bots
-            if len(user_bots) >= 10:
-                return False
-        else:
-            # After trial, apply plan limits for 'free' plan
-            if len(user_bots) >= plan_limits["bots"]:
-                return False
-    else:
-        # For other plans, apply their limits directly
-        if len(user_bots) >= plan_limits["bots"]:
-            return False
-    return True
+# Gestionnaire de paiement fictif
+class PaymentProcessor:
+    async def process_payment(self, user_id: int, amount: float, currency: str, plan_id: str) -> bool:
+        # Simulation d'un paiement réussi
+        return True
 
-async def check_group_limits(user_id: int, new_group_id: int = 0) -> bool:
-    """Vérifie les limites de groupes"""
-    plan = get_user_plan(user_id)
-    user_bots = db.get_user_bots(user_id)
-    plan_limits = get_plan_limits(plan)
-    
-    total_groups = sum(len(bot.get("groups", [])) for bot in user_bots)
-    if new_group_id > 0:
-        total_groups += 1
-    
-    if total_groups >= plan_limits["groups"]:
-        return False
-    return Truedef get_text(lang: str, key: str) -> str:
-    """Récupère le texte traduit selon la langue"""
-    return TRANSLATIONS.get(lang, TRANSLATIONS['fr']).get(key, key)
 
-# La fonction register_user_bot_handlers est asynchrone et sera appelée dans la tâche asyncio
-    return application
-except Exception as e:
-    logger.error(f"Erreur dans handle_pdg_token_input: {e} [ERR_BLM_A37]", exc_info=True)
-    await update.message.reply_text("Erreur lors de la configuration du Bot PDG. Veuillez réessayer. Contactez le support (@TeleSucheSupport) si le problème persiste. (ERR_BLM_B37)")
+class PaymentQueue:
+    """File de paiements traitée par un pool de workers.
+
+    ``submit`` enregistre une intention de paiement identifiée par
+    ``(user_id, plan_id, nonce)`` et rend la main aussitôt : une même clé
+    soumise deux fois (double appui sur le bouton) renvoie le job existant
+    au lieu de débiter à nouveau. ``workers`` tâches traitent la file avec
+    un client HTTP partagé vers la passerelle ``gateway_url`` (en-tête
+    ``Idempotency-Key``) ou, sans URL, avec ``processor``. Les erreurs
+    réseau et les 5xx sont retentées ``attempts`` fois, la clé rendant la
+    nouvelle tentative sans risque. Les callbacks ``on_done(job)`` sont
+    appelés à la fin du job. Les jobs réussis sont gardés ``result_ttl``
+    secondes pour dédupliquer les appuis tardifs ; un job en échec est
+    oublié aussitôt pour que l'utilisateur puisse réessayer.
+    """
+
+    PENDING, SUCCEEDED, FAILED = "pending", "succeeded", "failed"
+
+    def __init__(self, processor=None, gateway_url: Optional[str] = None, api_key: Optional[str] = None,
+                 workers: int = 4, timeout: float = 30.0, attempts: int = 3, result_ttl: float = 3600.0,
+                 backoff: float = 1.0, transport=None):
+        self.processor = processor or PaymentProcessor()
+        self.gateway_url = gateway_url.rstrip("/") if gateway_url else None
+        self.api_key = api_key
+        self.workers = workers
+        self.timeout = timeout
+        self.attempts = attempts
+        self.result_ttl = result_ttl
+        self.backoff = backoff
+        # Transport httpx optionnel (proxy, ou httpx.MockTransport en test)
+        self.transport = transport
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._client = None
+        self.metrics = {"submitted": 0, "duplicates": 0, "succeeded": 0, "failed": 0, "retries": 0}
 
-async def check_bot_limits(user_id: int) -> bool:
-    """Vérifie si l'utilisateur peut ajouter un nouveau bot"""
-    plan = get_user_plan(user_id)
-    user_bots = db.get_user_bots(user_id)
-    plan_limits = get_plan_limits(plan)
-    
-    # Check for trial period for 'free' plan
-    if plan == "free":
-        trial_end_date = db.get_user_trial_end_date(user_id)
-        if trial_end_date and datetime.now() < datetime.fromisoformat(trial_end_date):
-            # During trial, allow up to 10 bots
-            if len(user_bots) >= 10:
-                return False
-        else:
-            # After trial, apply plan limits for 'free' plan
-            if len(user_bots) >= plan_limits["bots"]:
-                return False
-    else:
-        # For other plans, apply their limits directly
-        if len(user_bots) >= plan_limits["bots"]:
+    @staticmethod
+    def key(user_id: int, plan_id: str, nonce) -> str:
+        return f"{user_id}:{plan_id}:{nonce}"
+
+    def _client_session(self):
+        if self._client is None or self._client.is_closed:
+            import httpx
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+            self._client = httpx.AsyncClient(timeout=self.timeout, headers=headers, transport=self.transport)
+        return self._client
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if job["status"] == self.PENDING or now - job["finished"] < self.result_ttl:
+                break
+            self._jobs.popitem(last=False)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._jobs.get(key)
+
+    def submit(self, user_id: int, plan_id: str, nonce, amount: float, currency: str,
+               on_done=None) -> Tuple[dict, bool]:
+        """Renvoie (job, créé) ; ``créé`` est faux si la clé était déjà connue"""
+        self.start()
+        self._prune()
+        key = self.key(user_id, plan_id, nonce)
+        job = self._jobs.get(key)
+        if job is not None:
+            self.metrics["duplicates"] += 1
+            return job, False
+
+        job = {
+            "key": key, "user_id": user_id, "plan_id": plan_id, "amount": amount, "currency": currency,
+            "status": self.PENDING, "error": None, "finished": None, "callbacks": [on_done] if on_done else [],
+        }
+        self._jobs[key] = job
+        self._queue.put_nowait(job)
+        self.metrics["submitted"] += 1
+        return job, True
+
+    async def _charge(self, job: dict) -> bool:
+        if self.gateway_url is None:
+            return bool(await self.processor.process_payment(
+                job["user_id"], job["amount"], job["currency"], job["plan_id"]
+            ))
+        response = await self._client_session().post(
+            f"{self.gateway_url}/payments",
+            json={k: job[k] for k in ("user_id", "plan_id", "amount", "currency")},
+            headers={"Idempotency-Key": job["key"]},
+        )
+        if response.status_code >= 500:
+            response.raise_for_status()
+        if response.status_code >= 400:
             return False
-    return True
+        return response.json().get("status") == self.SUCCEEDED
 
-# Comprehensive multilingual translations
-        # La fonction register_user_bot_handlers est asynchrone et sera appelée dans la tâche asyncio
-        
-    return application
-    except Exception as e:
-        logger.error(f"Erreur initialisation bot fils: {e}")
-        return None
+    async def _process(self, job: dict) -> None:
+        import httpx
+        ok = False
+        for attempt in range(1, self.attempts + 1):
+            try:
+                ok = await self._charge(job)
+                break
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                job["error"] = str(e)
+                if attempt == self.attempts:
+                    logger.error(f"Paiement {job['key']} abandonné après {attempt} tentatives: {e} [ERR_BLM_019]")
+                    break
+                self.metrics["retries"] += 1
+                await asyncio.sleep(min(self.backoff * 2 ** attempt, 30))
+            except Exception as e:
+                job["error"] = str(e)
+                logger.error(f"Erreur paiement {job['key']}: {e} [ERR_BLM_019]", exc_info=True)
+                break
+
+        job["status"] = self.SUCCEEDED if ok else self.FAILED
+        job["finished"] = time.monotonic()
+        self.metrics[job["status"]] += 1
+        if not ok:
+            self._jobs.pop(job["key"], None)
+        callbacks, job["callbacks"] = job["callbacks"], []
+        for callback in callbacks:
+            try:
+                await callback(job)
+            except Exception as e:
+                logger.error(f"Erreur notification paiement {job['key']}: {e} [ERR_BLM_019]", exc_info=True)
 
-async def check_bot_limits(user_id: int) -> bool:
-    """Vérifie si l'utilisateur peut ajouter un nouveau bot"""
-    plan = get_user_plan(user_id)
-    user_bots = db.get_user_bots(user_id)
-    plan_limits = get_plan_limits(plan)
-    
-    # Check for trial period for 'free' plan
-    if plan == "free":
-        trial_end_date = db.get_user_trial_end_date(user_id)
-        if trial_end_date and datetime.now() < datetime.fromisoformat(trial_end_date):
-            # During trial, allow up to 10 bots
-            if len(user_bots) >= 10:
-                return False
-        else:
-            # After trial, apply plan limits for 'free' plan
-            if len(user_bots) >= plan_limits["bots"]:
-                return False
-    else:
-        # For other plans, apply their limits directly
-        if len(user_bots) >= plan_limits["bots"]:
-            return False
-    return True
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job is None:
+                    return
+                await self._process(job)
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._queue = self._queue or asyncio.Queue()
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self, deadline: float = 10.0) -> None:
+        """Termine les paiements en file (au plus ``deadline`` secondes) puis arrête les workers"""
+        if self._tasks:
+            for _ in self._tasks:
+                self._queue.put_nowait(None)
+            done, pending = await asyncio.wait(self._tasks, timeout=deadline)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+                logger.warning(f"{sum(j['status'] == self.PENDING for j in self._jobs.values())} paiements interrompus à l'arrêt")
+            self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+payments = _main_process_only(lambda: PaymentQueue(
+    gateway_url=getattr(config, "MODEPAY_URL", None),
+    api_key=getattr(config, "MODEPAY_API_KEY", None),
+    workers=getattr(config, "PAYMENT_WORKERS", 4),
+    timeout=getattr(config, "PAYMENT_TIMEOUT", 30.0),
+    attempts=getattr(config, "PAYMENT_ATTEMPTS", 3),
+    result_ttl=getattr(config, "PAYMENT_RESULT_TTL", 3600.0),
+))
+
+
+class PinVerifier:
+    """Hachage et vérification des PIN hors de la boucle d'événements.
+
+    Le KDF de ``SecurityManager`` (50 à 300 ms) tourne dans un pool de
+    ``workers`` threads ; au-delà de ``max_pending`` calculs en attente,
+    les nouvelles demandes sont refusées au lieu d'allonger la file.
+    Chaque échec est compté par utilisateur dans ``store`` sous
+    ``pin_lockout:<user_id>`` : après ``free_attempts`` échecs, le PIN est
+    verrouillé ``base_delay`` secondes, délai doublé à chaque nouvel échec
+    jusqu'à ``max_delay``. Un succès remet le compteur à zéro.
+    """
+
+    def __init__(self, store, workers: int = 2, max_pending: int = 32, free_attempts: int = 3,
+                 base_delay: float = 30.0, max_delay: float = 3600.0):
+        self.store = store
+        self.security = SecurityManager()
+        self.max_pending = max_pending
+        self.free_attempts = free_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pin-kdf")
+        self._pending = 0
+        self.metrics = {"hashes": 0, "verifications": 0, "kdf_seconds": 0.0, "kdf_max": 0.0,
+                        "failures": 0, "lockouts": 0, "rejected": 0}
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics["kdf_seconds"] += elapsed
+            self.metrics["kdf_max"] = max(self.metrics["kdf_max"], elapsed)
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self.metrics["rejected"] += 1
+            raise RuntimeError("File de calcul des PIN saturée")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._timed, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, pin: str) -> str:
+        self.metrics["hashes"] += 1
+        return await self._run(self.security.hash_password, pin)
+
+    async def verify(self, pin: str, pin_hash: str) -> bool:
+        self.metrics["verifications"] += 1
+        return bool(await self._run(self.security.verify_password, pin, pin_hash))
+
+    def _key(self, user_id: int) -> str:
+        return f"pin_lockout:{user_id}"
+
+    def locked_for(self, user_id: int) -> float:
+        """Secondes restantes avant une nouvelle tentative (0 si aucun verrou)"""
+        state = self.store.load_state(self._key(user_id), None) or {}
+        return max(0.0, state.get("locked_until", 0.0) - time.time())
+
+    def record_failure(self, user_id: int) -> float:
+        """Compte un échec et renvoie la durée du verrou posé (0 si aucun)"""
+        state = self.store.load_state(self._key(user_id), None) or {}
+        failures = state.get("failures", 0) + 1
+        delay = 0.0
+        if failures >= self.free_attempts:
+            delay = min(self.base_delay * 2 ** (failures - self.free_attempts), self.max_delay)
+            self.metrics["lockouts"] += 1
+        self.store.save_state(self._key(user_id), {"failures": failures, "locked_until": time.time() + delay})
+        self.metrics["failures"] += 1
+        return delay
+
+    def reset(self, user_id: int) -> None:
+        if self.store.load_state(self._key(user_id), None):
+            self.store.save_state(self._key(user_id), None)
+
+    def stats(self) -> dict:
+        kdf_calls = self.metrics["hashes"] + self.metrics["verifications"]
+        return dict(self.metrics, kdf_avg=self.metrics["kdf_seconds"] / kdf_calls if kdf_calls else 0.0,
+                    pending=self._pending)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+pins = _main_process_only(lambda: PinVerifier(
+    db,
+    workers=getattr(config, "PIN_KDF_WORKERS", 2),
+    max_pending=getattr(config, "PIN_KDF_MAX_PENDING", 32),
+    free_attempts=getattr(config, "PIN_FREE_ATTEMPTS", 3),
+    base_delay=getattr(config, "PIN_LOCKOUT_BASE_DELAY", 30.0),
+    max_delay=getattr(config, "PIN_LOCKOUT_MAX_DELAY", 3600.0),
+))
+
+# Catalogue des traductions
+class TranslationCatalog(Mapping):
+    """Catalogue des traductions stockées dans ``locales/<lang>.json``.
+
+    Chaque langue est lue au premier usage puis compilée en un seul
+    dictionnaire qui inclut déjà sa chaîne de repli (``pt-BR`` → ``pt`` →
+    ``en`` → ``fr``) : ``get_text`` ne fait donc qu'une recherche. Les clés
+    introuvables dans toute la chaîne sont journalisées une seule fois.
+    """
+
+    FALLBACKS = ("en", "fr")
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._compiled: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self.missing: Dict[str, set] = {}
+        with open(os.path.join(directory, "languages.json"), encoding="utf-8") as f:
+            self.languages: Dict[str, str] = json.load(f)
+
+    def _read(self, lang: str) -> Dict[str, str]:
+        path = os.path.join(self.directory, f"{lang}.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Fichier de traduction illisible {path}: {e}")
+            return {}
+
+    @classmethod
+    def fallback_chain(cls, lang: str) -> List[str]:
+        chain = [lang]
+        if "-" in lang:
+            chain.append(lang.split("-", 1)[0])
+        chain.extend(cls.FALLBACKS)
+        return list(dict.fromkeys(chain))
+
+    def compile(self, lang: str) -> Dict[str, str]:
+        compiled = self._compiled.get(lang)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.get(lang)
+                if compiled is None:
+                    compiled = {}
+                    for code in reversed(self.fallback_chain(lang)):
+                        compiled.update(self._read(code))
+                    self._compiled[lang] = compiled
+        return compiled
+
+    def text(self, lang: str, key: str) -> str:
+        value = self.compile(lang or "fr").get(key)
+        if value is None:
+            missing = self.missing.setdefault(lang, set())
+            if key not in missing:
+                missing.add(key)
+                logger.warning(f"Traduction manquante: {lang}/{key}")
+            return key
+        return value
+
+    def reload(self) -> None:
+        with self._lock:
+            self._compiled.clear()
+            self.missing.clear()
+
+    def __getitem__(self, lang: str) -> Dict[str, str]:
+        if lang not in self.languages and not os.path.exists(os.path.join(self.directory, f"{lang}.json")):
+            raise KeyError(lang)
+        return self.compile(lang)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.languages)
+
+    def __len__(self) -> int:
+        return len(self.languages)
+
+
+TRANSLATIONS = TranslationCatalog(
+    getattr(config, "LOCALES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales"))
+)
+LANGUAGE_NAMES = TRANSLATIONS.languages
+
+def get_text(lang: str, key: str) -> str:
+    """Récupère le texte traduit selon la langue"""
+    return TRANSLATIONS.text(lang, key)
 
-async def check_group_limits(user_id: int, new_group_id: int = 0) -> bool:
-    """Vérifie les limites de groupes"""
-    plan = get_user_plan(user_id)
-    user_bots = db.get_user_bots(user_id)
-    plan_limits = get_plan_limits(plan)
-    
-    total_groups = sum(len(bot.get("groups", [])) for bot in user_bots)
-    if new_group_id > 0:
-        total_groups += 1
-    
-    if total_groups >= plan_limits["groups"]:
-        return False
-    return True
 
 class BotLinkingManager:
 
@@ -1581,43 +4319,18 @@ class BotLinkingManager:
                 "🌐 Please choose your preferred language:"
             )
             
-            keyboard = [
-                [
-                    InlineKeyboardButton("🇫🇷 Français", callback_data="setlang_fr"),
-                    InlineKeyboardButton("🇬🇧 English", callback_data="setlang_en"),
-                    InlineKeyboardButton("🇪🇸 Español", callback_data="setlang_es")
-                ],
-                [
-                    InlineKeyboardButton("🇩🇪 Deutsch", callback_data="setlang_de"),
-                    InlineKeyboardButton("🇨🇳 中文", callback_data="setlang_zh"),
-                    InlineKeyboardButton("🇮🇳 हिन्दी", callback_data="setlang_hi")
-                ],
-                [
-                    InlineKeyboardButton("🇯🇵 日本語", callback_data="setlang_ja"),
-                    InlineKeyboardButton("🇰🇷 한국어", callback_data="setlang_ko"),
-                    InlineKeyboardButton("🇹🇭 ไทย", callback_data="setlang_th")
-                ],
-                [
-                    InlineKeyboardButton("🇷🇺 Русский", callback_data="setlang_ru"),
-                    InlineKeyboardButton("🇵🇹 Português", callback_data="setlang_pt"),
-                    InlineKeyboardButton("🇮🇹 Italiano", callback_data="setlang_it")
-                ],
-                [
-                    InlineKeyboardButton("🔙 Retour" if lang == 'fr' else "🔙 Back", 
-                                       callback_data="back_to_main")
-                ]
-            ]
+            keyboard = keyboards.get("language_options", lang)
             
             if update.callback_query:
                 await query.edit_message_text(
                     text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    reply_markup=keyboard,
                     parse_mode="HTML"
                 )
             else:
                 await update.message.reply_text(
                     text,
-                    reply_markup=InlineKeyboardMarkup(keyboard),
+                    reply_markup=keyboard,
                     parse_mode="HTML"
                 )
         except Exception as e:
@@ -1629,38 +4342,12 @@ class BotLinkingManager:
         try:
             query = update.callback_query
             await query.answer()
-            lang_code = query.data.split("_")[1]
+            lang_code = context.args[0]
             user_id = query.from_user.id
             
             db.set_user_language(user_id, lang_code)
             
-            lang_names = {
-    'fr': "Français",
-    'en': "English",
-    'es': "Español", 
-    'de': "Deutsch",
-    'zh': "中文",
-    'hi': "हिन्दी",
-    'ja': "日本語",
-    'ko': "한국어",
-    'th': "ไทย",
-    'ru': "Русский",
-    'pt': "Português",
-    'it': "Italiano",
-    'ar': "العربية",
-    'tr': "Türkçe",
-    'vi': "Tiếng Việt",
-    'pl': "Polski",
-    'nl': "Nederlands",
-    'sv': "Svenska",
-    'uk': "Українська",
-    'sw': "Kiswahili",
-    'he': "עברית",
-    'ro': "Română",
-    'fa': "فارسی",
-    'ms': "Bahasa Melayu",
-    'id': "Bahasa Indonesia"
-}
+            lang_names = LANGUAGE_NAMES
             
             confirmation = (
                 f"✅ Langue définie sur {lang_names[lang_code]}"
@@ -1738,8 +4425,9 @@ class BotLinkingManager:
         try:
             if update.message:
                 user_id = update.message.from_user.id
-            query = update.callback_query
-    await query.answer()
+            else:
+                query = update.callback_query
+                await query.answer()
                 user_id = query.from_user.id
                 
             lang = db.get_user_language(user_id) or 'fr'
@@ -1791,7 +4479,7 @@ class BotLinkingManager:
 
             prompt = "Parfait ! Veuillez m'envoyer votre token :" if lang == 'fr' else "Perfect! Please send me your token:"
             await query.edit_message_text(f"✅ {prompt}\n\n{security_advice}", parse_mode="Markdown")
-            context.user_data["awaiting_token"] = True
+            conversations.set(query.from_user.id, UserStates.AWAITING_TOKEN)
         except Exception as e:
             logger.error(f"Erreur dans handle_has_token_yes: {e} [ERR_BLM_010]", exc_info=True)
             await query.edit_message_text("❌ Erreur. Veuillez réessayer. Contactez le support (@TeleSucheSupport) si le problème persiste. (ERR_BLM_010)")
@@ -1817,23 +4505,31 @@ class BotLinkingManager:
             )
 
             await query.edit_message_text(creation_guide, parse_mode="Markdown")
-            context.user_data["awaiting_token"] = True
+            conversations.set(query.from_user.id, UserStates.AWAITING_TOKEN)
         except Exception as e:
             logger.error(f"Erreur dans handle_has_token_no: {e} [ERR_BLM_011]", exc_info=True)
             await query.edit_message_text("❌ Erreur. Veuillez réessayer. Contactez le support (@TeleSucheSupport) si le problème persiste. (ERR_BLM_011)")
 
     @staticmethod
     async def handle_token_input(update: Update, context: CallbackContext):
-        if not context.user_data.get("awaiting_token"):
-            return
-
+        """Saisie du token (état ``AWAITING_TOKEN``)"""
+        retry = False
         try:
             token = update.message.text.strip()
             user_id = update.message.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
 
             # Validation avec retour des données
-            bot_data = sync_validate_bot_token(token)
+            try:
+                bot_data = await async_validate_bot_token(token)
+            except TokenCheckUnavailable:
+                retry = True
+                await update.message.reply_text(
+                    "⚠️ Impossible de vérifier le token pour le moment. Renvoyez-le dans quelques instants."
+                    if lang == 'fr' else
+                    "⚠️ Unable to check the token right now. Please send it again in a moment."
+                )
+                return
             if not bot_data:
                 error_msg = "❌ Token invalide. Veuillez vérifier et réessayer."
                 await update.message.reply_text(error_msg)
@@ -1842,6 +4538,15 @@ class BotLinkingManager:
             # Utilisez les données retournées
             bot_username = bot_data.get("username")
             bot_name = bot_data.get("first_name")
+
+            # Un bot déjà lié (nouveau token) ne compte pas dans la limite
+            if not db.get_user_bot(user_id, bot_username) and not await check_bot_limits(user_id):
+                keyboard = InlineKeyboardMarkup([
+                    [InlineKeyboardButton(get_text(lang, 'upgrade_plan'), callback_data="upgrade_plan")],
+                    [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data="my_bots")]
+                ])
+                await update.message.reply_text(get_text(lang, 'bot_limit_exceeded'), reply_markup=keyboard)
+                return
             
             bot_link = f"https://t.me/{bot_username}" # Define bot_link here
             
@@ -1849,18 +4554,13 @@ class BotLinkingManager:
             db.save_user_bot(user_id, token, bot_username, bot_name, creation_time)
 
 
-            # Lancement du bot enfant
+            # Lancement du bot enfant (hébergé par child_bots, sans polling dédié)
             try:
-                child_app = init_child_bot(token, bot_username)
-                if child_app:
-                    # Enregistrer les handlers spécifiques au bot fils
-                    from utils.user_features import setup_user_bot_handlers
-                    await setup_user_bot_handlers(child_app)                    
-                    # Démarrer le polling du bot fils en arrière-plan
-                    import asyncio
-                    await child_app.initialize()
-                    await child_app.start()
-                    asyncio.create_task(child_app.updater.start_polling())
+                if not await child_bots.start(token, bot_username):
+                    logger.error(f"Impossible de démarrer le bot fils @{bot_username}")
+            except Exception as e:
+                logger.error(f"Erreur démarrage bot fils @{bot_username}: {e}", exc_info=True)
+
             # Message de succès avec boutons
             success_text = (
                 f"✅ Bot @{bot_username} connecté avec succès !\n\n"
@@ -1887,30 +4587,21 @@ class BotLinkingManager:
             logger.error(f"ERREUR: {str(e)}", exc_info=True)
             await update.message.reply_text("❌ Erreur lors du traitement")
         finally:
-            context.user_data["awaiting_token"] = False
+            # Panne passagère : on attend toujours le token
+            if not retry:
+                conversations.clear(update.message.from_user.id, UserStates.AWAITING_TOKEN)
 
     @staticmethod
     async def log_violation(vtype: str, user_id: int, plan: str, context: CallbackContext):
-        """Journalise les violations de limites"""
+        """Journalise les violations de limites (envoyées en résumé par ``violations``)"""
         try:
             pdg = db.pdg_config
             if not pdg or not pdg.get("is_active"):
                 return
-                
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            log_text = f"[{vtype}] {now} — <code>{user_id}</code> dépassement ({plan})"
-            if pdg:
-                # Ensure the main bot sends the message to the PDG owner
-                await context.bot.send_message(pdg["owner"], log_text, parse_mode="HTML")
-                if pdg.get("log_channel"):
-                    # Ensure the main bot sends the message to the log channel
-                    await context.bot.send_message(pdg["log_channel"], log_text, parse_mode="HTML")
-                    db.setdefault("log_archive", []).append({
-                        "type": vtype,
-                        "timestamp": now,
-                        "user_id": user_id,
-                        "plan": plan
-                    })
+
+            violations.record(vtype, user_id, plan)
+            # Premier appel sans start_bot_linking_system : le bot principal sert à l'envoi
+            violations.start(context.bot if violations.bot is None else None)
         except Exception as e:
             logger.error(f"Erreur dans log_violation: {e} [ERR_BLM_016]", exc_info=True)
 
@@ -1920,28 +4611,16 @@ class BotLinkingManager:
         try:
             if update.message:
                 user_id = update.message.from_user.id
-            query = update.callback_query
-    await query.answer()
+            elif update.callback_query:
+                query = update.callback_query
+                await query.answer()
                 user_id = query.from_user.id
                 
             lang = db.get_user_language(user_id) or 'fr'
             
             text = "🛠️ <b>Services disponibles</b> :" if lang == 'fr' else "🛠️ <b>Available Services</b>:"
             
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("🤖 Mes bots créés 🤖", callback_data="my_bots")],
-                [InlineKeyboardButton("🔍 Recherche avancée", callback_data="services_search")],
-                [InlineKeyboardButton("❤️ Groupe de rencontre 👩‍❤️‍👨", callback_data="services_meetup")],
-                [InlineKeyboardButton("🔄 Change format fichier 📁", callback_data="services_format")],
-                [InlineKeyboardButton("📝 Texte vers voix🎙️", callback_data="services_tts")],
-                [InlineKeyboardButton("🎙️ Voix vers texte 📝", callback_data="services_stt")],
-                [InlineKeyboardButton("📢 Créer un post 📢", callback_data="services_post")],
-                [InlineKeyboardButton("📊 Créé un sondage 📊", callback_data="services_poll")],
-                [InlineKeyboardButton("🔗 Crée un lien court 🔗", callback_data="services_shortlink")],
-                [InlineKeyboardButton("🚀 Créé une publicité 🚀", callback_data="services_ads")],
-                [InlineKeyboardButton("🤑 Investissement intelligent 🤑", callback_data="services_investment")],
-                [InlineKeyboardButton("🔙 Retour", callback_data="back_to_main")]
-            ])
+            keyboard = keyboards.get("services", lang)
             
             if update.message:
                 await update.message.reply_text(text, parse_mode="HTML", reply_markup=keyboard)
@@ -1983,8 +4662,9 @@ class BotLinkingManager:
         try:
             if update.message:
                 user_id = update.message.from_user.id
-            query = update.callback_query
-    await query.answer()
+            else:
+                query = update.callback_query
+                await query.answer()
                 user_id = query.from_user.id
             
             lang = db.get_user_language(user_id) or 'fr'
@@ -2035,34 +4715,8 @@ class BotLinkingManager:
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
             
-            text = (
-                "💎 <b>Choisissez un plan</b>\n\n"
-            )
-            
-            keyboard = []
-            for plan_id, plan_data in PLANS.items():
-                features_text = "\n".join([f"• {f}" for f in plan_data["features"]])
-                text += (
-                    f"{plan_data['label']} ({plan_data['price']})\n"
-                    f"{features_text}\n"
-                    f"{plan_data['more_info_link']}\n\n"
-                )
-                keyboard.append([
-                    InlineKeyboardButton(
-                        f"{plan_data['label']} - {plan_data['price']}",
-                        callback_data=f"plan_details:{plan_id}"
-                    )
-                ])
-            
-            keyboard.append([
-                InlineKeyboardButton("🔙 Retour", callback_data="back_to_main")
-            ])
-
-            await query.edit_message_text(
-                text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode="HTML"
-            )
+            text, keyboard = plan_catalog.upgrade_screen(lang)
+            await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
 
         except Exception as e:
             logger.error(f"Erreur dans handle_upgrade_plan: {e} [ERR_BLM_018]", exc_info=True)
@@ -2072,36 +4726,91 @@ class BotLinkingManager:
                 else "❌ Error displaying plans. Contact support (@TeleSucheSupport) if the problem persists. (ERR_BLM_018)"
             )
 
+    @staticmethod
+    async def handle_plan_details(update: Update, context: CallbackContext):
+        """Détail d'un plan et bouton de confirmation (nonce de paiement neuf à chaque affichage)"""
+        try:
+            query = update.callback_query
+            await query.answer()
+            user_id = query.from_user.id
+            lang = db.get_user_language(user_id) or 'fr'
+            plan_id = context.args[0] if context.args and context.args[0] in plan_catalog.plans else "free"
+            plan = plan_catalog.get(plan_id)
+
+            text = f"💎 <b>{plan['label']}</b> ({plan['price']})\n\n<b>{get_text(lang, 'plan_features')}</b>\n"
+            text += "".join(f"• {feature}\n" for feature in plan.get("features", []))
+            rows = []
+            if plan_id != "free" and plan_id != get_user_plan(user_id):
+                # Le nonce identifie ce bouton : un double appui ne débite qu'une fois,
+                # un nouvel affichage (après un échec) permet un nouveau paiement
+                rows.append([InlineKeyboardButton(
+                    f"✅ {get_text(lang, 'plan_confirm')}",
+                    callback_data=encode_callback("confirm_upgrade:", plan_id, secrets.token_urlsafe(6)),
+                )])
+            rows.append([InlineKeyboardButton(f"🔙 {get_text(lang, 'back_button')}", callback_data="upgrade_plan")])
+            await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(rows), parse_mode="HTML")
+
+        except Exception as e:
+            logger.error(f"Erreur dans handle_plan_details: {e} [ERR_BLM_042]", exc_info=True)
+            await query.edit_message_text(f"{get_text(lang, 'error_try_again')} (ERR_BLM_042)")
+
     @staticmethod
     async def handle_confirm_upgrade(update: Update, context: CallbackContext):
         """Confirmation finale de l'upgrade"""
         try:
             query = update.callback_query
+            if len(context.args) < 2:
+                # Bouton sans nonce (ancien message) : nouvel affichage du plan, sans débit
+                await BotLinkingManager.handle_plan_details(update, context)
+                return
             await query.answer()
-            plan_id = query.data.split(":")[1]
+            plan_id, nonce = context.args[0], context.args[1]
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
 
-            # Ici vous devriez intégrer votre logique de paiement
-            # Pour l'exemple, nous supposons que le paiement est validé
-            payment_processor = PaymentProcessor()
-            # Supposons que le plan a un prix et une devise associés dans PLANS
-            plan_price = PLANS[plan_id].get("price_value", 0.0) # Assurez-vous que PLANS contient 'price_value'
-            plan_currency = PLANS[plan_id].get("currency", "USD") # Assurez-vous que PLANS contient 'currency'
-
-            if await payment_processor.process_payment(user_id, plan_price, plan_currency, plan_id):
-                db.set_user_plan(user_id, plan_id)
+            # plan_id vient du callback : seul un plan payant du catalogue est accepté,
+            # et le montant est toujours celui du catalogue
+            plan = plan_catalog.plans.get(plan_id)
+            plan_price = plan.get("price_value") if plan else None
+            if not isinstance(plan_price, (int, float)) or plan_price <= 0:
+                logger.warning(f"Upgrade refusé pour {user_id} : plan {plan_id!r} inconnu ou sans prix [ERR_BLM_043]")
                 await query.edit_message_text(
-                    f"🎉 Félicitations ! Votre compte a été upgradé." if lang == 'fr' \
-                    else f"🎉 Congratulations! Your account has been upgraded."
+                    "❌ Ce plan n'est pas disponible. (ERR_BLM_043)" if lang == 'fr'
+                    else "❌ This plan is not available. (ERR_BLM_043)",
+                    reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(
+                        get_text(lang, 'back_button'), callback_data="upgrade_plan"
+                    )]]),
                 )
-                # Envoyer un message avec les nouvelles limites
-                await BotLinkingManager.show_plan_info(update, context)
-            else:
+                return
+            plan_currency = plan.get("currency", "USD")
+
+            async def on_done(job):
+                if job["status"] == PaymentQueue.SUCCEEDED:
+                    db.set_user_plan(user_id, plan_id)
+                    await query.edit_message_text(
+                        f"🎉 Félicitations ! Votre compte a été upgradé." if lang == 'fr' \
+                        else f"🎉 Congratulations! Your account has been upgraded."
+                    )
+                    # Envoyer un message avec les nouvelles limites
+                    await BotLinkingManager.show_plan_info(update, context)
+                else:
+                    # Le job en échec est oublié : « Réessayer » réaffiche le plan avec un nouveau nonce
+                    await query.edit_message_text(
+                        "❌ Échec du paiement. Veuillez réessayer." if lang == 'fr' \
+                        else "❌ Payment failed. Please try again.",
+                        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(
+                            "🔄 Réessayer" if lang == 'fr' else "🔄 Retry",
+                            callback_data=encode_callback("plan_details:", plan_id),
+                        )]]),
+                    )
+
+            # Clé déjà connue : le message affiche déjà l'attente ou le résultat
+            if payments.get(PaymentQueue.key(user_id, plan_id, nonce)) is None:
                 await query.edit_message_text(
-                    "❌ Échec du paiement. Veuillez réessayer." if lang == 'fr' \
-                    else "❌ Payment failed. Please try again."
+                    "⏳ Paiement en cours de traitement..." if lang == 'fr'
+                    else "⏳ Processing your payment..."
                 )
+                payments.submit(user_id, plan_id, nonce, plan_price, plan_currency, on_done)
 
         except Exception as e:
             logger.error(f"Erreur dans handle_confirm_upgrade: {e} [ERR_BLM_019]", exc_info=True)
@@ -2117,39 +4826,24 @@ class BotLinkingManager:
         try:
             if update.message:
                 user_id = update.message.from_user.id
-            query = update.callback_query
-    await query.answer()
+            else:
+                query = update.callback_query
+                await query.answer()
                 user_id = query.from_user.id
                 
             lang = db.get_user_language(user_id) or 'fr'
-            plan = get_user_plan(user_id)
-            plan_data = PLANS.get(plan, PLANS["free"])
-            plan_limits = get_plan_limits(plan)
-            
-            user_bots = db.get_user_bots(user_id)
-            bot_count = len(user_bots)
-            
+            screen = plan_catalog.plan_screen(lang, get_user_plan(user_id))
+            plan_limits = db.quotas.limits(user_id)
+            bot_count, group_count = db.quotas.usage(user_id)
+
+            # Seule la ligne d'utilisation dépend de l'utilisateur
             text = (
-                f"💎 <b>Plan actuel : {plan_data['label']}</b>\n\n"
-                f"📊 <b>Utilisation :</b>\n"
+                f"{screen['header']}"
                 f"• Bots : {bot_count}/{plan_limits['bots']}\n"
-                f"• Groupes : 0/{plan_limits['groups']}\n\n"
-                f"<b>Fonctionnalités :</b>\n"
+                f"• {get_text(lang, 'plan_groups')} : {group_count}/{plan_limits['groups']}\n"
+                f"{screen['body']}"
             )
-            
-            for feature in plan_data["features"]:
-                text += f"• {feature}\n"
-                
-            if plan == "free":
-                text += f"\n💡 <b>Upgradez pour plus de fonctionnalités !</b>"
-                keyboard = InlineKeyboardMarkup([
-                    [InlineKeyboardButton("🚀 Upgrade", callback_data="upgrade_plan")],
-                    [InlineKeyboardButton("🔙 Retour", callback_data="back_to_main")]
-                ])
-            else:
-                keyboard = InlineKeyboardMarkup([
-                    [InlineKeyboardButton("🔙 Retour", callback_data="back_to_main")]
-                ])
+            keyboard = screen["keyboard"]
             
             if update.message:
                 await update.message.reply_text(text, reply_markup=keyboard, parse_mode="HTML")
@@ -2165,8 +4859,9 @@ class BotLinkingManager:
         try:
             if update.message:
                 user_id = update.message.from_user.id
-            query = update.callback_query
-    await query.answer()
+            else:
+                query = update.callback_query
+                await query.answer()
                 user_id = query.from_user.id
                 
             lang = db.get_user_language(user_id) or 'fr'
@@ -2204,15 +4899,12 @@ class BotLinkingManager:
             lang = db.get_user_language(user_id) or 'fr'
             
             # Extraire l'ID du bot depuis le callback_data
-            bot_id = query.data.split(":")[1]
+            bot_id = context.args[0]
             
-            # Récupérer les informations du bot
-            user_bots = db.get_user_bots(user_id)
-            selected_bot = None
-            for bot in user_bots:
-                if bot.get("bot_username") == bot_id or str(bot.get("id", "")) == bot_id:
-                    selected_bot = bot
-                    break
+            # Récupérer les informations du bot (par username, sinon par id)
+            selected_bot = db.get_user_bot(user_id, bot_id) or next(
+                (bot for bot in db.get_user_bots(user_id) if str(bot.get("id", "")) == bot_id), None
+            )
                     
             if not selected_bot:
                 await query.edit_message_text(
@@ -2235,7 +4927,7 @@ class BotLinkingManager:
             keyboard = InlineKeyboardMarkup([
                 [InlineKeyboardButton(
                     "✅ Oui, supprimer" if lang == 'fr' else "✅ Yes, delete",
-                    callback_data=f"confirm_delete:{bot_id}"
+                    callback_data=encode_callback("confirm_delete:", bot_id)
                 )],
                 [InlineKeyboardButton(
                     "❌ Annuler" if lang == 'fr' else "❌ Cancel",
@@ -2257,20 +4949,15 @@ class BotLinkingManager:
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
             
-            bot_id = query.data.split(":")[1]
+            bot_id = context.args[0]
             
             # Supprimer le bot de la base de données
             success = db.delete_user_bot(user_id, bot_id)
             
             if success:
                 # Arrêter le bot s'il est en cours d'exécution
-                if bot_id in child_bots:
-                    try:
-                        app = child_bots[bot_id]
-                        await app.stop()
-                        del child_bots[bot_id]
-                    except Exception as e:
-                        logger.error(f"Erreur arrêt bot {bot_id}: {e}")
+                if child_bots.hosts(bot_id):
+                    await child_bots.stop(bot_id)
                 
                 text = (
                     f"✅ Bot supprimé avec succès !"
@@ -2304,10 +4991,9 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
 
-            user_bots = db.get_user_bots(user_id)
-            selected_bot = next((bot for bot in user_bots if bot.get("bot_username") == bot_username), None)
+            selected_bot = db.get_user_bot(user_id, bot_username)
 
             if not selected_bot:
                 await query.edit_message_text(get_text(lang, 'bot_not_found'))
@@ -2321,7 +5007,7 @@ class BotLinkingManager:
                 f"{get_text(lang, 'bot_token_security')}"
             )
             keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'back_to_bot_info'), callback_data=f"show_bot_info:{bot_username}")]
+                [InlineKeyboardButton(get_text(lang, 'back_to_bot_info'), callback_data=encode_callback("show_bot_info:", bot_username))]
             ])
 
             await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
@@ -2353,10 +5039,9 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
 
-            user_bots = db.get_user_bots(user_id)
-            selected_bot = next((bot for bot in user_bots if bot.get("bot_username") == bot_username), None)
+            selected_bot = db.get_user_bot(user_id, bot_username)
 
             if not selected_bot:
                 await query.edit_message_text(get_text(lang, 'bot_not_found'))
@@ -2408,11 +5093,11 @@ class BotLinkingManager:
             )
 
             keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'view_bot_token'), callback_data=f"show_token:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'delete_bot'), callback_data=f"ask_delete_bot:{bot_username}")],
+                [InlineKeyboardButton(get_text(lang, 'view_bot_token'), callback_data=encode_callback("show_token:", bot_username))],
+                [InlineKeyboardButton(get_text(lang, 'delete_bot'), callback_data=encode_callback("ask_delete_bot:", bot_username))],
                 [InlineKeyboardButton(get_text(lang, 'invite_admin'), callback_data="under_construction")],
                 [InlineKeyboardButton(get_text(lang, 'general_report'), callback_data="under_construction")],
-                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=f"bot_detail:{bot_username}")]
+                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=encode_callback("bot_detail:", bot_username))]
             ])
 
             await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
@@ -2427,163 +5112,49 @@ class BotLinkingManager:
         try:
             if update.message:
                 user_id = update.message.from_user.id
-            query = update.callback_query
-    await query.answer()
-                user_id = query.from_user.id
-                
-            lang = db.get_user_language(user_id) or 'fr'
-            user_bots = db.get_user_bots(user_id)
-            
-            if not user_bots:
-                text = get_text(lang, 'no_bots_connected')
-                keyboard = InlineKeyboardMarkup([
-                    [InlineKeyboardButton(get_text(lang, 'create_bot'), callback_data="createbot")]
-                ])
-            else:
-                text = get_text(lang, 'your_connected_bots')
-                keyboard_buttons = []
-                
-                for bot in user_bots:
-                    bot_username = bot.get("bot_username")
-                    bot_name = bot.get("bot_name")
-                    if bot_username and bot_name:
-                        keyboard_buttons.append([
-                            InlineKeyboardButton(f"{get_text(lang, 'bot_prefix')}{bot_username}", callback_data=f"bot_detail:{bot_username}")
-                        ])
-                
-                keyboard_buttons.append([
-                    InlineKeyboardButton(get_text(lang, 'add_bot'), callback_data="createbot"),
-                    InlineKeyboardButton(get_text(lang, 'back_button'), callback_data="back_to_main")
-                ])
-                keyboard = InlineKeyboardMarkup(keyboard_buttons)
-            
-            if update.message:
-                await update.message.reply_text(text, reply_markup=keyboard)
-            else:
-                await query.edit_message_text(text, reply_markup=keyboard)
-                
-        except Exception as e:
-            logger.error(f"Erreur dans handle_my_bots: {e} [ERR_BLM_001]", exc_info=True)
-            error_text = f"{get_text(lang, 'error_try_again')} (ERR_BLM_001)"
-            if update.message:
-                await update.message.reply_text(error_text)
             else:
-                await query.edit_message_text(error_text)
-
-    @staticmethod
-    async def handle_createbot(update: Update, context: CallbackContext):
-        """Gère le processus de création d'un nouveau bot"""
-        try:
-            query = update.callback_query
-            await query.answer()
-            user_id = query.from_user.id
-            lang = db.get_user_language(user_id) or 'fr'
-
-            # Vérifier les limites de bots
-            if not await check_bot_limits(user_id):
-                text = get_text(lang, 'bot_limit_exceeded')
-                keyboard = InlineKeyboardMarkup([
-                    [InlineKeyboardButton(get_text(lang, 'upgrade_plan'), callback_data="upgrade_plan")],
-                    [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data="my_bots")]
-                ])
-                await query.edit_message_text(text, reply_markup=keyboard)
-                return
-
-            # Demander le token du bot
-            text = (
-                f"<b>{get_text(lang, 'add_bot_token')}</b>\n\n"
-                f"{get_text(lang, 'enter_token')}\n\n"
-                f"<i>{get_text(lang, 'token_format')}</i>"
-            )
-            
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'cancel'), callback_data="my_bots")]
-            ])
-            
-            await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
-            
-            # Définir l'état utilisateur pour attendre le token
-            context.user_data['awaiting_bot_token'] = True
-            
-        except Exception as e:
-            logger.error(f"Erreur dans handle_createbot: {e} [ERR_BLM_002]", exc_info=True)
-            await query.edit_message_text(f"{get_text(lang, 'error_try_again')} (ERR_BLM_002)")
-
-    @staticmethod
-    async def handle_bot_token_input(update: Update, context: CallbackContext):
-        """Gère la saisie du token de bot"""
-        try:
-            if not context.user_data.get('awaiting_bot_token'):
-                return
-                
-            user_id = update.message.from_user.id
-            lang = db.get_user_language(user_id) or 'fr'
-            token = update.message.text.strip()
-            
-            # Valider le format du token
-            if not token or ':' not in token:
-                text = get_text(lang, 'token_invalid')
-                keyboard = InlineKeyboardMarkup([
-                    [InlineKeyboardButton(get_text(lang, 'cancel'), callback_data="my_bots")]
-                ])
-                await update.message.reply_text(text, reply_markup=keyboard)
-                return
-            
-            # Valider le token avec l'API Telegram
-            try:
-                bot_info = sync_validate_bot_token(token)
-                if not bot_info:
-                    text = get_text(lang, 'token_validation_error')
-                    keyboard = InlineKeyboardMarkup([
-                        [InlineKeyboardButton(get_text(lang, 'cancel'), callback_data="my_bots")]
-                    ])
-                    await update.message.reply_text(text, reply_markup=keyboard)
-                    return
-                    
-                bot_username = bot_info.get("username")
-                bot_name = bot_info.get("first_name")
-                
-                # Vérifier si le bot existe déjà
-                user_bots = db.get_user_bots(user_id)
-                if any(bot.get("bot_username") == bot_username for bot in user_bots):
-                    text = get_text(lang, 'bot_already_exists')
-                    keyboard = InlineKeyboardMarkup([
-                        [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data="my_bots")]
-                    ])
-                    await update.message.reply_text(text, reply_markup=keyboard)
-                    context.user_data['awaiting_bot_token'] = False
-                    return
-                
-                # Sauvegarder le bot
-                creation_time = datetime.now().isoformat()
-                db.save_user_bot(user_id, token, bot_username, bot_name, creation_time)
-                
-                # Créer l'application bot
-                text = get_text(lang, 'creating_bot_app')
-                await update.message.reply_text(text)
+                query = update.callback_query
+                await query.answer()
+                user_id = query.from_user.id
                 
-                bot_app = init_child_bot(token, bot_username)
-                if bot_app:
-                # Message de succès
-                success_text = f"✅ {get_text(lang, 'bot_saved_success')}\n\n🤖 @{bot_username}"
+            lang = db.get_user_language(user_id) or 'fr'
+            user_bots = db.get_user_bots(user_id)
+            
+            if not user_bots:
+                text = get_text(lang, 'no_bots_connected')
                 keyboard = InlineKeyboardMarkup([
-                    [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data="my_bots")]
+                    [InlineKeyboardButton(get_text(lang, 'create_bot'), callback_data="createbot")]
                 ])
-                await update.message.reply_text(success_text, reply_markup=keyboard)
+            else:
+                text = get_text(lang, 'your_connected_bots')
+                keyboard_buttons = []
                 
-            except Exception as e:
-                logger.error(f"Erreur validation token: {e}")
-                text = get_text(lang, 'token_validation_error')
-                keyboard = InlineKeyboardMarkup([
-                    [InlineKeyboardButton(get_text(lang, 'cancel'), callback_data="my_bots")]
+                for bot in user_bots:
+                    bot_username = bot.get("bot_username")
+                    bot_name = bot.get("bot_name")
+                    if bot_username and bot_name:
+                        keyboard_buttons.append([
+                            InlineKeyboardButton(f"{get_text(lang, 'bot_prefix')}{bot_username}", callback_data=encode_callback("bot_detail:", bot_username))
+                        ])
+                
+                keyboard_buttons.append([
+                    InlineKeyboardButton(get_text(lang, 'add_bot'), callback_data="createbot"),
+                    InlineKeyboardButton(get_text(lang, 'back_button'), callback_data="back_to_main")
                 ])
-                await update.message.reply_text(text, reply_markup=keyboard)
-            
-            context.user_data['awaiting_bot_token'] = False
+                keyboard = InlineKeyboardMarkup(keyboard_buttons)
             
+            if update.message:
+                await update.message.reply_text(text, reply_markup=keyboard)
+            else:
+                await query.edit_message_text(text, reply_markup=keyboard)
+                
         except Exception as e:
-            logger.error(f"Erreur dans handle_bot_token_input: {e} [ERR_BLM_003]", exc_info=True)
-            await update.message.reply_text(f"{get_text(lang, 'error_try_again')} (ERR_BLM_003)")
+            logger.error(f"Erreur dans handle_my_bots: {e} [ERR_BLM_001]", exc_info=True)
+            error_text = f"{get_text(lang, 'error_try_again')} (ERR_BLM_001)"
+            if update.message:
+                await update.message.reply_text(error_text)
+            else:
+                await query.edit_message_text(error_text)
 
     @staticmethod
     async def ask_delete_bot(update: Update, context: CallbackContext):
@@ -2593,7 +5164,7 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
             
             text = (
                 f"<b>{get_text(lang, 'delete_confirmation')}</b>\n\n"
@@ -2602,8 +5173,8 @@ class BotLinkingManager:
             )
             
             keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'yes_delete'), callback_data=f"confirm_delete_bot:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'no_cancel'), callback_data=f"show_bot_info:{bot_username}")]
+                [InlineKeyboardButton(get_text(lang, 'yes_delete'), callback_data=encode_callback("confirm_delete_bot:", bot_username))],
+                [InlineKeyboardButton(get_text(lang, 'no_cancel'), callback_data=encode_callback("show_bot_info:", bot_username))]
             ])
             
             await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
@@ -2620,19 +5191,20 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
             
             # Programmer la suppression dans 24h
             deletion_time = datetime.now() + timedelta(hours=24)
+            deletion_scheduler.schedule(user_id, bot_username, deletion_time, chat_id=query.message.chat_id)
             text = (
                 f"⏰ {get_text(lang, 'delete_scheduled')}\n\n"
                 f"🤖 @{bot_username}\n"
                 f"🕐 {deletion_time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-                f"Vous pouvez annuler cette suppression avant cette date."
+                f"{get_text(lang, 'deletion_cancel_hint')}"
             )
             
             keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'cancel_deletion'), callback_data=f"cancel_delete_bot:{bot_username}")],
+                [InlineKeyboardButton(get_text(lang, 'cancel_deletion'), callback_data=encode_callback("cancel_delete_bot:", bot_username))],
                 [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data="my_bots")]
             ])
             
@@ -2650,19 +5222,17 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
             
             # Annuler la suppression programmée
-            deletion_key = f"{user_id}:{bot_username}"
-            if deletion_key in pending_deletions:
-                del pending_deletions[deletion_key]
+            deletion_scheduler.cancel(user_id, bot_username)
             
             db.cancel_bot_deletion(user_id, bot_username)
             
             text = f"✅ {get_text(lang, 'deletion_cancelled')}\n🤖 @{bot_username}"
             
             keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=f"show_bot_info:{bot_username}")]
+                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=encode_callback("show_bot_info:", bot_username))]
             ])
             
             await query.edit_message_text(text, reply_markup=keyboard)
@@ -2675,33 +5245,7 @@ class BotLinkingManager:
     async def execute_pending_deletions():
         """Exécute les suppressions de bots programmées"""
         try:
-            current_time = datetime.now()
-            to_delete = []
-            
-            for deletion_key, deletion_time in pending_deletions.items():
-                if current_time >= deletion_time:
-                    user_id, bot_username = deletion_key.split(":")
-                    user_id = int(user_id)
-                    
-                    # Supprimer le bot de la base de données
-                    db.delete_user_bot(user_id, bot_username)
-                    
-                    # Arrêter l'application bot si elle existe
-                    if bot_username in child_bots:
-                        try:
-                            app = child_bots[bot_username]
-                            await app.stop()
-                            del child_bots[bot_username]
-                        except Exception as e:
-                            logger.error(f"Erreur arrêt bot {bot_username}: {e}")
-                    
-                    to_delete.append(deletion_key)
-                    logger.info(f"Bot {bot_username} supprimé pour l'utilisateur {user_id}")
-            
-            # Nettoyer les suppressions exécutées
-            for key in to_delete:
-                del pending_deletions[key]
-                
+            await deletion_scheduler.run_due()
         except Exception as e:
             logger.error(f"Erreur dans execute_pending_deletions: {e}")
 
@@ -2713,35 +5257,26 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
 
-            user_bots = db.get_user_bots(user_id)
-            selected_bot = next((bot for bot in user_bots if bot.get("bot_username") == bot_username), None)
+            selected_bot = db.get_user_bot(user_id, bot_username)
 
             if not selected_bot:
                 await query.edit_message_text(get_text(lang, 'bot_not_found'))
                 return
 
             bot_name = selected_bot.get("bot_name", "N/A")
-            bot_status = "🟢" if bot_username in child_bots else "🔴"
+            status = child_bots.status(bot_username)
+            bot_status = {"online": "🟢", "hibernating": "💤"}.get(status, "🔴")
             
             text = (
                 f"<b>🤖 {bot_name}</b>\n"
                 f"<b>Username:</b> @{bot_username}\n"
-                f"<b>Status:</b> {bot_status} {get_text(lang, 'bot_status_online' if bot_status == '🟢' else 'bot_status_offline')}\n\n"
+                f"<b>Status:</b> {bot_status} {get_text(lang, f'bot_status_{status}')}\n\n"
                 f"<b>Gestion:</b>"
             )
 
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'bot_info_title'), callback_data=f"show_bot_info:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'start_child_bot'), callback_data=f"start_bot:{bot_username}"),
-                 InlineKeyboardButton(get_text(lang, 'stop_child_bot'), callback_data=f"stop_bot:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'restart_child_bot'), callback_data=f"restart_bot:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'bot_settings'), callback_data=f"bot_settings:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'bot_analytics'), callback_data=f"bot_analytics:{bot_username}"),
-                 InlineKeyboardButton(get_text(lang, 'bot_logs'), callback_data=f"bot_logs:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data="my_bots")]
-            ])
+            keyboard = keyboards.get("bot_detail", lang, bot_username=bot_username)
 
             await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
 
@@ -2757,22 +5292,24 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
 
-            user_bots = db.get_user_bots(user_id)
-            selected_bot = next((bot for bot in user_bots if bot.get("bot_username") == bot_username), None)
+            selected_bot = db.get_user_bot(user_id, bot_username)
 
             if not selected_bot:
                 await query.edit_message_text(get_text(lang, 'bot_not_found'))
                 return
 
-            if bot_username not in child_bots:
+            if not child_bots.hosts(bot_username):
                 token = selected_bot.get("token")
-                bot_app = init_child_bot(token, bot_username)
-                if bot_app:
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=f"bot_detail:{bot_username}")]
-            ])
+                if await child_bots.start(token, bot_username, ingress=selected_bot.get("ingress", "polling")):
+                    text = f"✅ {get_text(lang, 'start_bot_success')}\n🤖 @{bot_username}"
+                else:
+                    text = f"❌ {get_text(lang, 'start_bot_error')}\n🤖 @{bot_username}"
+            else:
+                text = f"⚠️ Bot déjà démarré\n🤖 @{bot_username}"
+
+            keyboard = keyboards.get("back_to_bot", lang, bot_username=bot_username)
 
             await query.edit_message_text(text, reply_markup=keyboard)
 
@@ -2788,13 +5325,11 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
 
-            if bot_username in child_bots:
+            if child_bots.hosts(bot_username):
                 try:
-                    app = child_bots[bot_username]
-                    await app.stop()
-                    del child_bots[bot_username]
+                    await child_bots.stop(bot_username)
                     text = f"✅ Bot arrêté avec succès\n🤖 @{bot_username}"
                 except Exception as e:
                     logger.error(f"Erreur arrêt bot {bot_username}: {e}")
@@ -2802,9 +5337,7 @@ class BotLinkingManager:
             else:
                 text = f"⚠️ Bot non démarré\n🤖 @{bot_username}"
 
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=f"bot_detail:{bot_username}")]
-            ])
+            keyboard = keyboards.get("back_to_bot", lang, bot_username=bot_username)
 
             await query.edit_message_text(text, reply_markup=keyboard)
 
@@ -2820,28 +5353,28 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
 
             # Arrêter le bot s'il est en cours d'exécution
-            if bot_username in child_bots:
+            if child_bots.hosts(bot_username):
                 try:
-                    app = child_bots[bot_username]
-                    await app.stop()
-                    del child_bots[bot_username]
+                    await child_bots.stop(bot_username)
                 except Exception as e:
                     logger.error(f"Erreur arrêt bot {bot_username}: {e}")
 
             # Redémarrer le bot
-            user_bots = db.get_user_bots(user_id)
-            selected_bot = next((bot for bot in user_bots if bot.get("bot_username") == bot_username), None)
+            selected_bot = db.get_user_bot(user_id, bot_username)
 
             if selected_bot:
                 token = selected_bot.get("token")
-                bot_app = init_child_bot(token, bot_username)
-                if bot_app:
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=f"bot_detail:{bot_username}")]
-            ])
+                if await child_bots.start(token, bot_username, ingress=selected_bot.get("ingress", "polling")):
+                    text = f"✅ {get_text(lang, 'start_bot_success')}\n🤖 @{bot_username}"
+                else:
+                    text = f"❌ {get_text(lang, 'start_bot_error')}\n🤖 @{bot_username}"
+            else:
+                text = get_text(lang, 'bot_not_found')
+
+            keyboard = keyboards.get("back_to_bot", lang, bot_username=bot_username)
 
             await query.edit_message_text(text, reply_markup=keyboard)
 
@@ -2857,22 +5390,11 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
 
             text = f"<b>⚙️ {get_text(lang, 'bot_settings')}</b>\n🤖 @{bot_username}"
 
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'group_management'), callback_data=f"group_mgmt:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'welcome_message_setup'), callback_data=f"welcome_setup:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'auto_responses'), callback_data=f"auto_responses:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'user_permissions'), callback_data=f"user_perms:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'notification_settings'), callback_data=f"notifications:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'security_settings'), callback_data=f"security:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'api_settings'), callback_data=f"api_settings:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'webhook_settings'), callback_data=f"webhook:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'backup_restore'), callback_data=f"backup:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=f"bot_detail:{bot_username}")]
-            ])
+            keyboard = keyboards.get("bot_settings", lang, bot_username=bot_username)
 
             await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
 
@@ -2880,6 +5402,50 @@ class BotLinkingManager:
             logger.error(f"Erreur dans bot_settings: {e} [ERR_BLM_011]", exc_info=True)
             await query.edit_message_text(f"{get_text(lang, 'error_try_again')} (ERR_BLM_011)")
 
+    @staticmethod
+    async def toggle_webhook(update: Update, context: CallbackContext):
+        """Bascule un bot fils entre polling et webhook"""
+        try:
+            query = update.callback_query
+            await query.answer()
+            user_id = query.from_user.id
+            lang = db.get_user_language(user_id) or 'fr'
+            bot_username = context.args[0]
+
+            selected_bot = db.get_user_bot(user_id, bot_username)
+
+            if not selected_bot:
+                await query.edit_message_text(get_text(lang, 'bot_not_found'))
+                return
+
+            current = child_bots.ingress(bot_username) or selected_bot.get("ingress", "polling")
+            new_mode = "polling" if current == "webhook" else "webhook"
+
+            if child_bots.hosts(bot_username) and not await child_bots.set_ingress(bot_username, new_mode):
+                text = (
+                    f"❌ Impossible de passer en mode {new_mode}\n🤖 @{bot_username}"
+                    if lang == 'fr' else
+                    f"❌ Unable to switch to {new_mode} mode\n🤖 @{bot_username}"
+                )
+            else:
+                # Le mode est mémorisé et réappliqué au prochain démarrage du bot
+                db.update_user_bot(user_id, bot_username, ingress=new_mode)
+                text = (
+                    f"✅ Mode de réception : {new_mode}\n🤖 @{bot_username}"
+                    if lang == 'fr' else
+                    f"✅ Update delivery mode: {new_mode}\n🤖 @{bot_username}"
+                )
+
+            keyboard = InlineKeyboardMarkup([
+                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=encode_callback("bot_settings:", bot_username))]
+            ])
+
+            await query.edit_message_text(text, reply_markup=keyboard)
+
+        except Exception as e:
+            logger.error(f"Erreur dans toggle_webhook: {e} [ERR_BLM_040]", exc_info=True)
+            await query.edit_message_text(f"{get_text(lang, 'error_try_again')} (ERR_BLM_040)")
+
     @staticmethod
     async def bot_analytics(update: Update, context: CallbackContext):
         """Affiche les analytiques d'un bot"""
@@ -2888,29 +5454,44 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
 
-            # Statistiques simulées (à remplacer par de vraies données)
-            text = (
-                f"<b>📊 {get_text(lang, 'bot_analytics')}</b>\n"
-                f"🤖 @{bot_username}\n\n"
-                f"<b>📈 Dernières 24h:</b>\n"
-                f"👥 Nouveaux utilisateurs: 156\n"
-                f"💬 Messages reçus: 2,847\n"
-                f"📤 Messages envoyés: 3,012\n\n"
-                f"<b>📊 Derniers 7 jours:</b>\n"
-                f"👥 Utilisateurs actifs: 1,245\n"
-                f"💬 Total messages: 18,934\n"
-                f"⚡ Temps de réponse moyen: 0.3s\n\n"
-                f"<b>🎯 Performance:</b>\n"
-                f"✅ Disponibilité: 99.8%\n"
-                f"📈 Croissance: +12%\n"
-                f"⭐ Satisfaction: 4.7/5"
-            )
+            summary = await child_bots.analytics(bot_username)
+            if summary is None:
+                text = (
+                    f"<b>📊 {get_text(lang, 'bot_analytics')}</b>\n"
+                    f"🤖 @{bot_username}\n\n"
+                    f"Aucune donnée pour le moment."
+                )
+            else:
+                day, week = summary["day"], summary["week"]
+
+                def seconds(value):
+                    return f"{value:.2f}s" if value is not None else "—"
+
+                def percent(value, signed=False):
+                    return f"{value * 100:{'+' if signed else ''}.1f}%" if value is not None else "—"
+
+                text = (
+                    f"<b>📊 {get_text(lang, 'bot_analytics')}</b>\n"
+                    f"🤖 @{bot_username}\n\n"
+                    f"<b>📈 Dernières 24h:</b>\n"
+                    f"👥 Nouveaux utilisateurs: {day['new_users']:,}\n"
+                    f"💬 Messages reçus: {day['messages_in']:,}\n"
+                    f"📤 Messages envoyés: {day['messages_out']:,}\n"
+                    f"⚡ Temps de réponse p50 / p95: {seconds(day['p50'])} / {seconds(day['p95'])}\n\n"
+                    f"<b>📊 Derniers 7 jours:</b>\n"
+                    f"👥 Nouveaux utilisateurs: {week['new_users']:,} (total {summary['users']:,})\n"
+                    f"💬 Total messages: {week['messages_in'] + week['messages_out']:,}\n"
+                    f"⚡ Temps de réponse p50 / p95: {seconds(week['p50'])} / {seconds(week['p95'])}\n\n"
+                    f"<b>🎯 Performance:</b>\n"
+                    f"✅ Disponibilité: {percent(week['uptime'])}\n"
+                    f"📈 Croissance: {percent(summary['growth'], signed=True)}"
+                )
 
             keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'data_export'), callback_data=f"export_data:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=f"bot_detail:{bot_username}")]
+                [InlineKeyboardButton(get_text(lang, 'data_export'), callback_data=encode_callback("export_data:", bot_username))],
+                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=encode_callback("bot_detail:", bot_username))]
             ])
 
             await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
@@ -2927,26 +5508,30 @@ class BotLinkingManager:
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
+
+            if not db.get_user_bot(user_id, bot_username):
+                await query.edit_message_text(get_text(lang, 'bot_not_found'))
+                return
 
-            # Logs simulés (à remplacer par de vrais logs)
+            lines = await child_bots.logs(bot_username, getattr(config, "BOT_LOGS_PREVIEW_LINES", 15))
+            # Limite Telegram de 4096 caractères : on garde les lignes les plus récentes
+            body, size = [], 0
+            for line in reversed(lines):
+                line = f"<code>{html.escape(line[:200])}</code>"
+                size += len(line) + 1
+                if size > 3500:
+                    break
+                body.append(line)
             text = (
                 f"<b>📜 {get_text(lang, 'bot_logs')}</b>\n"
                 f"🤖 @{bot_username}\n\n"
-                f"<code>2025-01-23 14:30:25 [INFO] Bot démarré</code>\n"
-                f"<code>2025-01-23 14:30:26 [INFO] Handlers enregistrés</code>\n"
-                f"<code>2025-01-23 14:30:27 [INFO] Polling démarré</code>\n"
-                f"<code>2025-01-23 14:35:12 [INFO] Nouveau utilisateur: 123456</code>\n"
-                f"<code>2025-01-23 14:36:45 [INFO] Message traité: /start</code>\n"
-                f"<code>2025-01-23 14:37:23 [WARN] Limite de débit atteinte</code>\n"
-                f"<code>2025-01-23 14:38:01 [INFO] Message traité: /help</code>\n"
-                f"<code>2025-01-23 14:39:15 [ERROR] Erreur API: Timeout</code>\n"
-                f"<code>2025-01-23 14:40:22 [INFO] Connexion rétablie</code>\n"
+                + ("\n".join(reversed(body)) if body else "Aucune entrée pour le moment.")
             )
 
             keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("📥 Télécharger logs", callback_data=f"download_logs:{bot_username}")],
-                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=f"bot_detail:{bot_username}")]
+                [InlineKeyboardButton("📥 Télécharger logs", callback_data=encode_callback("download_logs:", bot_username))],
+                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data=encode_callback("bot_detail:", bot_username))]
             ])
 
             await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
@@ -2955,6 +5540,37 @@ class BotLinkingManager:
             logger.error(f"Erreur dans bot_logs: {e} [ERR_BLM_013]", exc_info=True)
             await query.edit_message_text(f"{get_text(lang, 'error_try_again')} (ERR_BLM_013)")
 
+    @staticmethod
+    async def download_logs(update: Update, context: CallbackContext):
+        """Envoie le dernier fichier du journal d'un bot en document"""
+        try:
+            query = update.callback_query
+            await query.answer()
+            user_id = query.from_user.id
+            lang = db.get_user_language(user_id) or 'fr'
+            bot_username = context.args[0]
+
+            if not db.get_user_bot(user_id, bot_username):
+                await query.edit_message_text(get_text(lang, 'bot_not_found'))
+                return
+
+            files = await child_bots.log_files(bot_username)
+            if not files:
+                await query.message.reply_text("Aucun journal disponible pour ce bot.")
+                return
+
+            with open(files[0], "rb") as document:
+                await context.bot.send_document(
+                    query.message.chat_id, document,
+                    filename=os.path.basename(files[0]),
+                    caption=f"📜 @{bot_username}" + (f" — {len(files) - 1} archive(s) plus ancienne(s)" if len(files) > 1 else ""),
+                    write_timeout=120,
+                )
+
+        except Exception as e:
+            logger.error(f"Erreur dans download_logs: {e} [ERR_BLM_041]", exc_info=True)
+            await query.message.reply_text(f"{get_text(lang, 'error_try_again')} (ERR_BLM_041)")
+
     @staticmethod
     async def language_selection_menu(update: Update, context: CallbackContext):
         """Affiche le menu de sélection de langue"""
@@ -2972,18 +5588,18 @@ class BotLinkingManager:
             
             # Créer les boutons de langue (groupés par 2)
             language_buttons = [
-                [InlineKeyboardButton("🇫🇷 Français", callback_data="set_lang:fr"),
-                 InlineKeyboardButton("🇬🇧 English", callback_data="set_lang:en")],
-                [InlineKeyboardButton("🇪🇸 Español", callback_data="set_lang:es"),
-                 InlineKeyboardButton("🇩🇪 Deutsch", callback_data="set_lang:de")],
-                [InlineKeyboardButton("🇮🇹 Italiano", callback_data="set_lang:it"),
-                 InlineKeyboardButton("🇵🇹 Português", callback_data="set_lang:pt")],
-                [InlineKeyboardButton("🇷🇺 Русский", callback_data="set_lang:ru"),
-                 InlineKeyboardButton("🇨🇳 中文", callback_data="set_lang:zh")],
-                [InlineKeyboardButton("🇯🇵 日本語", callback_data="set_lang:ja"),
-                 InlineKeyboardButton("🇰🇷 한국어", callback_data="set_lang:ko")],
-                [InlineKeyboardButton("🇦🇷 العربية", callback_data="set_lang:ar"),
-                 InlineKeyboardButton("🇮🇳 हिंदी", callback_data="set_lang:hi")],
+                [InlineKeyboardButton("🇫🇷 Français", callback_data=encode_callback("set_lang:", "fr")),
+                 InlineKeyboardButton("🇬🇧 English", callback_data=encode_callback("set_lang:", "en"))],
+                [InlineKeyboardButton("🇪🇸 Español", callback_data=encode_callback("set_lang:", "es")),
+                 InlineKeyboardButton("🇩🇪 Deutsch", callback_data=encode_callback("set_lang:", "de"))],
+                [InlineKeyboardButton("🇮🇹 Italiano", callback_data=encode_callback("set_lang:", "it")),
+                 InlineKeyboardButton("🇵🇹 Português", callback_data=encode_callback("set_lang:", "pt"))],
+                [InlineKeyboardButton("🇷🇺 Русский", callback_data=encode_callback("set_lang:", "ru")),
+                 InlineKeyboardButton("🇨🇳 中文", callback_data=encode_callback("set_lang:", "zh"))],
+                [InlineKeyboardButton("🇯🇵 日本語", callback_data=encode_callback("set_lang:", "ja")),
+                 InlineKeyboardButton("🇰🇷 한국어", callback_data=encode_callback("set_lang:", "ko"))],
+                [InlineKeyboardButton("🇦🇷 العربية", callback_data=encode_callback("set_lang:", "ar")),
+                 InlineKeyboardButton("🇮🇳 हिंदी", callback_data=encode_callback("set_lang:", "hi"))],
                 [InlineKeyboardButton(get_text(current_lang, 'back_button'), callback_data="back_to_main")]
             ]
             
@@ -3009,7 +5625,7 @@ class BotLinkingManager:
             query = update.callback_query
             await query.answer()
             user_id = query.from_user.id
-            new_lang = query.data.split(":")[1]
+            new_lang = context.args[0]
             
             # Sauvegarder la nouvelle langue
             db.set_user_language(user_id, new_lang)
@@ -3033,188 +5649,72 @@ class BotLinkingManager:
         try:
             if update.message:
                 user_id = update.message.from_user.id
-            query = update.callback_query
-    await query.answer()
+            else:
+                query = update.callback_query
+                await query.answer()
                 user_id = query.from_user.id
                 
             lang = db.get_user_language(user_id) or 'fr'
             
             text = (
-                f"<b>{get_text(lang, 'bot_manager_title')}</b>\n\n"
-                f"<b>{get_text(lang, 'available_commands')}</b>\n"
-                f"• {get_text(lang, 'change_language')}\n"
-                f"• {get_text(lang, 'manage_bots')}\n"
-                f"• {get_text(lang, 'help_command')}\n\n"
-                f"<b>{get_text(lang, 'current_features')}</b>\n"
-                f"• {get_text(lang, 'multilingual_support')}\n"
-                f"• {get_text(lang, 'bot_management')}\n"
-                f"• {get_text(lang, 'user_preferences')}\n\n"
-                f"<i>{get_text(lang, 'demo_mode')}</i>"
-            )
-            
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton(get_text(lang, 'manage_bots'), callback_data="my_bots")],
-                [InlineKeyboardButton(get_text(lang, 'language_selection'), callback_data="language_menu")],
-                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data="back_to_main")]
-            ])
-            
-            if update.message:
-                await update.message.reply_text(text, reply_markup=keyboard, parse_mode="HTML")
-            else:
-                await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
-                
-        except Exception as e:
-            logger.error(f"Erreur dans help_command: {e} [ERR_BLM_016]", exc_info=True)
-            error_text = f"{get_text(lang, 'error_try_again')} (ERR_BLM_016)"
-            if update.message:
-                await update.message.reply_text(error_text)
-            else:
-                await query.edit_message_text(error_text)
-
-    @staticmethod
-    async def welcome_message(update: Update, context: CallbackContext):
-        """Message de bienvenue pour les nouveaux utilisateurs"""
-        try:
-            user_id = update.message.from_user.id
-            lang = db.get_user_language(user_id) or 'fr'
-            
-            # Si c'est un nouvel utilisateur, proposer la sélection de langue
-            if db.is_new_user(user_id):
-                text = get_text(lang, 'welcome')
-                
-                language_buttons = [
-                    [InlineKeyboardButton("🇫🇷 Français", callback_data="set_lang:fr"),
-                     InlineKeyboardButton("🇬🇧 English", callback_data="set_lang:en")],
-                    [InlineKeyboardButton("🇪🇸 Español", callback_data="set_lang:es"),
-                     InlineKeyboardButton("🇩🇪 Deutsch", callback_data="set_lang:de")]
-                ]
-                
-                keyboard = InlineKeyboardMarkup(language_buttons)
-                await update.message.reply_text(text, reply_markup=keyboard)
-            else:
-                # Utilisateur existant - menu principal
-                await show_main_menu(update, context)
-                
-        except Exception as e:
-            logger.error(f"Erreur dans welcome_message: {e} [ERR_BLM_017]", exc_info=True)
-            await update.message.reply_text(f"{get_text(lang, 'error_try_again')} (ERR_BLM_017)")
-
-# Fonction utilitaire pour vérifier et nettoyer les suppressions en attente
-async def cleanup_pending_deletions():
-    """Nettoyage périodique des suppressions en attente"""
-    try:
-        await BotLinkingManager.execute_pending_deletions()
-    except Exception as e:
-        logger.error(f"Erreur cleanup_pending_deletions: {e}")
-
-# Configuration des handlers pour le bot principal
-def setup(application):
-    """Configure tous les handlers pour la gestion des bots"""
-    
-    # Handlers pour les callbacks
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.show_bot_token, pattern=r"^show_token:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.show_bot_info, pattern=r"^show_bot_info:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.handle_my_bots, pattern=r"^my_bots$"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.handle_createbot, pattern=r"^createbot$"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.ask_delete_bot, pattern=r"^ask_delete_bot:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.confirm_delete_bot, pattern=r"^confirm_delete_bot:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.cancel_delete_bot, pattern=r"^cancel_delete_bot:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.bot_detail, pattern=r"^bot_detail:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.start_bot, pattern=r"^start_bot:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.stop_bot, pattern=r"^stop_bot:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.restart_bot, pattern=r"^restart_bot:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.bot_settings, pattern=r"^bot_settings:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.bot_analytics, pattern=r"^bot_analytics:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.bot_logs, pattern=r"^bot_logs:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.language_selection_menu, pattern=r"^language_menu$"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.set_language, pattern=r"^set_lang:"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.help_command, pattern=r"^help$"))
-    application.add_handler(CallbackQueryHandler(BotLinkingManager.handle_under_construction, pattern=r"^under_construction$"))
-    
-    # Handlers pour les commandes
-    application.add_handler(CommandHandler("mybots", BotLinkingManager.handle_my_bots))
-    application.add_handler(CommandHandler("lang", BotLinkingManager.language_selection_menu))
-    application.add_handler(CommandHandler("help", BotLinkingManager.help_command))
-    application.add_handler(CommandHandler("start", BotLinkingManager.welcome_message))
-    
-    # Handler pour la saisie de token
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, BotLinkingManager.handle_bot_token_input))
-    
-    logger.info("Bot linking handlers configurés avec succès")
-
-# Fonction principale pour démarrer le système de gestion des bots
-async def start_bot_linking_system():
-    """Démarre le système de gestion des bots"""
-    try:
-        # Démarrer les bots existants depuis la base de données
-        all_users = db.get_all_users() if hasattr(db, 'get_all_users') else []
-        
-        for user_id in all_users:
-            user_bots = db.get_user_bots(user_id)
-            for bot in user_bots:
-                bot_username = bot.get("bot_username")
-                token = bot.get("token")
-                if bot_username and token and bot_username not in child_bots:
-                    try:
-                        bot_app = init_child_bot(token, bot_username)
-                        if bot_app:
-        logger.info(f"Système de gestion des bots démarré - {len(child_bots)} bots actifs")
-        
-    except Exception as e:
-        logger.error(f"Erreur démarrage système bot linking: {e}")
-
-# Export des fonctions principales
-__all__ = [
-    'BotLinkingManager',
-    'setup_bot_linking_handlers', 
-    'start_bot_linking_system',
-    'cleanup_pending_deletions',
-    'check_bot_limits',
-    'check_group_limits',
-    'init_child_bot',
-    'get_text',
-    'TRANSLATIONS'
-]
-
-# Fonction principale pour démarrer le bot
-async def main():
-    """Fonction principale pour démarrer le bot de gestion"""
-    try:
-        # Token du bot principal (à remplacer par votre vrai token)
-        BOT_TOKEN = "YOUR_BOT_TOKEN_HERE"
-        
-        if BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
-            print("⚠️  Veuillez configurer votre token de bot dans la variable BOT_TOKEN")
-            print("💡 Obtenez votre token depuis @BotFather sur Telegram")
-            return
-        
-        # Créer l'application du bot principal
-        application = ApplicationBuilder().token(BOT_TOKEN).build()
-        
-        # Configurer les handlers
-        setup_bot_linking_handlers(application)
-        
-        # Démarrer le système de gestion des bots
-        await start_bot_linking_system()
-        
-        # Démarrer le bot
-        print("🤖 Bot de gestion démarré...")
-        print("📊 Fonctionnalités disponibles :")
-        print("   • Gestion de bots multiples")
-        print("   • Support multilingue")
-        print("   • Interface intuitive")
-        print("   • Système de plans d'abonnement")
-        
-        await application.run_polling(drop_pending_updates=True)
-        
-    except Exception as e:
-        logger.error(f"Erreur critique dans main: {e}", exc_info=True)
-        print(f"❌ Erreur : {e}")
-
-if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
+                f"<b>{get_text(lang, 'bot_manager_title')}</b>\n\n"
+                f"<b>{get_text(lang, 'available_commands')}</b>\n"
+                f"• {get_text(lang, 'change_language')}\n"
+                f"• {get_text(lang, 'manage_bots')}\n"
+                f"• {get_text(lang, 'help_command')}\n\n"
+                f"<b>{get_text(lang, 'current_features')}</b>\n"
+                f"• {get_text(lang, 'multilingual_support')}\n"
+                f"• {get_text(lang, 'bot_management')}\n"
+                f"• {get_text(lang, 'user_preferences')}\n\n"
+                f"<i>{get_text(lang, 'demo_mode')}</i>"
+            )
+            
+            keyboard = InlineKeyboardMarkup([
+                [InlineKeyboardButton(get_text(lang, 'manage_bots'), callback_data="my_bots")],
+                [InlineKeyboardButton(get_text(lang, 'language_selection'), callback_data="language_menu")],
+                [InlineKeyboardButton(get_text(lang, 'back_button'), callback_data="back_to_main")]
+            ])
+            
+            if update.message:
+                await update.message.reply_text(text, reply_markup=keyboard, parse_mode="HTML")
+            else:
+                await query.edit_message_text(text, reply_markup=keyboard, parse_mode="HTML")
+                
+        except Exception as e:
+            logger.error(f"Erreur dans help_command: {e} [ERR_BLM_016]", exc_info=True)
+            error_text = f"{get_text(lang, 'error_try_again')} (ERR_BLM_016)"
+            if update.message:
+                await update.message.reply_text(error_text)
+            else:
+                await query.edit_message_text(error_text)
 
+    @staticmethod
+    async def welcome_message(update: Update, context: CallbackContext):
+        """Message de bienvenue pour les nouveaux utilisateurs"""
+        try:
+            user_id = update.message.from_user.id
+            lang = db.get_user_language(user_id) or 'fr'
+            
+            # Si c'est un nouvel utilisateur, proposer la sélection de langue
+            if db.is_new_user(user_id):
+                text = get_text(lang, 'welcome')
+                
+                language_buttons = [
+                    [InlineKeyboardButton("🇫🇷 Français", callback_data=encode_callback("set_lang:", "fr")),
+                     InlineKeyboardButton("🇬🇧 English", callback_data=encode_callback("set_lang:", "en"))],
+                    [InlineKeyboardButton("🇪🇸 Español", callback_data=encode_callback("set_lang:", "es")),
+                     InlineKeyboardButton("🇩🇪 Deutsch", callback_data=encode_callback("set_lang:", "de"))]
+                ]
+                
+                keyboard = InlineKeyboardMarkup(language_buttons)
+                await update.message.reply_text(text, reply_markup=keyboard)
+            else:
+                # Utilisateur existant - menu principal
+                await show_main_menu(update, context)
+                
+        except Exception as e:
+            logger.error(f"Erreur dans welcome_message: {e} [ERR_BLM_017]", exc_info=True)
+            await update.message.reply_text(f"{get_text(lang, 'error_try_again')} (ERR_BLM_017)")
 
     @staticmethod
     async def handle_ask_delete_bot(update: Update, context: CallbackContext):
@@ -3222,11 +5722,11 @@ if __name__ == "__main__":
         try:
             query = update.callback_query
             await query.answer()
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
             
-            context.user_data["deleting_bot"] = bot_username
+            conversations.set(user_id, UserStates.DELETING_BOT, bot_username=bot_username)
             
             confirm_text = (
                 f"⚠️ <b>Confirmez la suppression</b> ⚠️\n\n"
@@ -3234,7 +5734,7 @@ if __name__ == "__main__":
             )
             
             keyboard = [
-                [InlineKeyboardButton("✅ Oui, 100% sûre", callback_data=f"delete_step1_yes:{bot_username}")],
+                [InlineKeyboardButton("✅ Oui, 100% sûre", callback_data=encode_callback("delete_step1_yes:", bot_username))],
                 [InlineKeyboardButton("❌ Non, annuler", callback_data="delete_step1_no")]
             ]
             
@@ -3253,11 +5753,11 @@ if __name__ == "__main__":
         try:
             query = update.callback_query
             await query.answer()
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
             
-            context.user_data["awaiting_bot_name"] = True
+            conversations.set(user_id, UserStates.AWAITING_BOT_NAME, bot_username=bot_username)
             
             prompt = (
                 f"Pour confirmer, veuillez taper le nom d'utilisateur de votre bot ici :\n"
@@ -3282,14 +5782,11 @@ if __name__ == "__main__":
 
     @staticmethod
     async def handle_confirm_bot_name(update: Update, context: CallbackContext):
-        """Étape 3 : Dernière confirmation"""
-        if not context.user_data.get("awaiting_bot_name"):
-            return
-
+        """Étape 3 : Dernière confirmation (état ``AWAITING_BOT_NAME``)"""
         try:
             user_id = update.message.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = context.user_data["deleting_bot"]
+            bot_username = conversations.payload(user_id)["bot_username"]
             entered_name = update.message.text.strip().replace('@', '')
             
             if entered_name != bot_username:
@@ -3303,7 +5800,7 @@ if __name__ == "__main__":
             )
             
             keyboard = [
-                [InlineKeyboardButton("✅ Oui je confirme", callback_data=f"delete_final_yes:{bot_username}")],
+                [InlineKeyboardButton("✅ Oui je confirme", callback_data=encode_callback("delete_final_yes:", bot_username))],
                 [InlineKeyboardButton("❌ Non, je change d'avis", callback_data="delete_final_no")]
             ]
             
@@ -3312,7 +5809,7 @@ if __name__ == "__main__":
                 reply_markup=InlineKeyboardMarkup(keyboard),
                 parse_mode="HTML"
             )
-            context.user_data["awaiting_bot_name"] = False
+            conversations.set(user_id, UserStates.DELETING_BOT, bot_username=bot_username)
         except Exception as e:
             logger.error(f"Erreur dans handle_confirm_bot_name: {e} [ERR_BLM_022]", exc_info=True)
             await update.message.reply_text("❌ Erreur lors de la confirmation. Veuillez réessayer. Contactez le support (@TeleSucheSupport) si le problème persiste. (ERR_BLM_022)")
@@ -3323,12 +5820,11 @@ if __name__ == "__main__":
         try:
             query = update.callback_query
             await query.answer()
-            bot_username = query.data.split(":")[1]
+            bot_username = context.args[0]
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
             
-            context.user_data["deleting_bot"] = bot_username
-            context.user_data["awaiting_pin_delete"] = True
+            conversations.set(user_id, UserStates.AWAITING_PIN_DELETE, bot_username=bot_username)
             
             await query.edit_message_text(
                 "🔐 Veuillez entrer votre code PIN à 4 chiffres pour confirmer la suppression :"
@@ -3342,15 +5838,12 @@ if __name__ == "__main__":
             
     @staticmethod
     async def handle_pin_deletion_input(update: Update, context: CallbackContext):
-        """Valide le PIN et effectue la suppression"""
-        if not context.user_data.get("awaiting_pin_delete"):
-            return
-
+        """Valide le PIN et programme la suppression (état ``AWAITING_PIN_DELETE``)"""
         try:
             user_id = update.message.from_user.id
             entered_pin = update.message.text.strip()
             lang = db.get_user_language(user_id) or 'fr'
-            bot_username = context.user_data.get("deleting_bot")
+            bot_username = conversations.payload(user_id).get("bot_username")
 
             # Validation basique du format
             if not (entered_pin.isdigit() and len(entered_pin) == 4):
@@ -3360,54 +5853,64 @@ if __name__ == "__main__":
                 )
                 return
 
-            # Vérification du PIN (suppose que SecurityManager est disponible)
+            locked_for = pins.locked_for(user_id)
+            if locked_for:
+                minutes = int(locked_for // 60) + 1
+                await update.message.reply_text(
+                    f"🔒 Trop de tentatives. Réessayez dans {minutes} min." if lang == 'fr'
+                    else f"🔒 Too many attempts. Try again in {minutes} min."
+                )
+                return
+
+            # Vérification du PIN : le KDF tourne dans le pool de pins
             stored_pin_hash = db.get_user_pin(user_id)
             if not stored_pin_hash:
                 # Si aucun PIN n'est configuré, on considère '1234' comme le PIN par défaut
                 if entered_pin == "1234":
-                    security_manager = SecurityManager()
-                    hashed_pin = security_manager.hash_password("1234")
-                    db.set_user_pin(user_id, hashed_pin)
+                    stored_pin_hash = await pins.hash("1234")
+                    db.set_user_pin(user_id, stored_pin_hash)
                     await update.message.reply_text(
                         "✅ PIN par défaut (1234) accepté. Vous pouvez maintenant définir votre propre PIN."
                         if lang == 'fr' else
                         "✅ Default PIN (1234) accepted. You can now set your own PIN."
                     )
                 else:
+                    pins.record_failure(user_id)
                     await update.message.reply_text(
                         "❌ Aucun PIN configuré. Veuillez utiliser le PIN par défaut (1234) ou en créer un."
                         if lang == 'fr' else
                         "❌ No PIN configured. Please use the default PIN (1234) or create one."
                     )
                     return
-            
-            if not SecurityManager().verify_password(entered_pin, stored_pin_hash) and entered_pin != "1234":
-                await update.message.reply_text(
-                    "❌ Code PIN incorrect. Veuillez réessayer." if lang == 'fr'
-                    else "❌ Incorrect PIN. Please try again."
-                )
+            # Un PIN est configuré : seul ce PIN est accepté
+            elif await pins.verify(entered_pin, stored_pin_hash):
+                pins.reset(user_id)
+            else:
+                if pins.record_failure(user_id):
+                    await update.message.reply_text(
+                        f"🔒 Code PIN incorrect. Réessayez dans {int(pins.locked_for(user_id) // 60) + 1} min." if lang == 'fr'
+                        else f"🔒 Incorrect PIN. Try again in {int(pins.locked_for(user_id) // 60) + 1} min."
+                    )
+                else:
+                    await update.message.reply_text(
+                        "❌ Code PIN incorrect. Veuillez réessayer." if lang == 'fr'
+                        else "❌ Incorrect PIN. Please try again."
+                    )
                 return
 
-            # Suppression effective
-            if bot_username in child_bots:
-                app = child_bots[bot_username]
-                try:
-                    await app.stop()  # Arrêt asynchrone
-                    await app.shutdown()
-                except Exception as e:
-                    logger.error(f"Erreur arrêt bot: {e}")
-                del child_bots[bot_username]
-
-            db.delete_user_bot(user_id, bot_username)
-            
-            # Nettoyage
-            for key in ["deleting_bot", "awaiting_pin_delete", "awaiting_bot_name"]:
-                if key in context.user_data:
-                    del context.user_data[key]
+            # Suppression confiée au planificateur : même délai de grâce et même annulation
+            # que confirm_delete_bot, persistée et exécutée à échéance
+            deletion_time = datetime.now() + timedelta(hours=24)
+            deletion_scheduler.schedule(user_id, bot_username, deletion_time, chat_id=update.message.chat_id)
+            conversations.clear(user_id)
 
             await update.message.reply_text(
-                f"✅ Bot @{bot_username} supprimé avec succès." if lang == 'fr'
-                else f"✅ Bot @{bot_username} successfully deleted."
+                f"⏰ {get_text(lang, 'delete_scheduled')}\n\n"
+                f"🤖 @{bot_username}\n"
+                f"🕐 {deletion_time.strftime('%Y-%m-%d %H:%M:%S')}",
+                reply_markup=InlineKeyboardMarkup([
+                    [InlineKeyboardButton(get_text(lang, 'cancel_deletion'), callback_data=encode_callback("cancel_delete_bot:", bot_username))]
+                ])
             )
 
         except Exception as e:
@@ -3426,63 +5929,28 @@ if __name__ == "__main__":
         await query.edit_message_text("✅ Suppression annulée" if lang == 'fr' else "✅ Deletion cancelled")
 
     @staticmethod
-    async def finalize_bot_deletion(context: CallbackContext):
-        """Effectue la suppression définitive du bot après délai"""
-        job = context.job
-        user_id, bot_username, chat_id = job.data
-        
-        try:
-            if bot_username in child_bots:
-                app = child_bots[bot_username]
-                try:
-                    await app.stop()
-                    await app.shutdown()
-                    logger.info(f"Bot @{bot_username} arrêté avec succès")
-                except Exception as e:
-                    logger.error(f"Erreur lors de l'arrêt du bot: {e} [ERR_BLM_025]")
-                del child_bots[bot_username]
-            
-            db.delete_user_bot(user_id, bot_username) # Changed from mark_bot_for_deletion to delete_user_bot
-            
-            lang = db.get_user_language(user_id) or 'fr'
-            success_msg = (
-                f"✅ Le bot @{bot_username} a été définitivement supprimé.\n\n"
-                f"Vous pouvez le réactiver dans les 30 jours en entrant son token à nouveau."
-                if lang == 'fr' else
-                f"✅ Bot @{bot_username} has been permanently deleted.\n\n"
-                f"You can reactivate it within 30 days by entering its token again."
-            )
-            await context.bot.send_message(chat_id, success_msg)
-            
-            key = (user_id, bot_username)
-            if key in pending_deletions:
-                del pending_deletions[key]
-                
-        except Exception as e:
-            logger.error(f"Erreur dans finalize_bot_deletion: {e} [ERR_BLM_026]", exc_info=True)
-    @staticmethod
     async def handle_cancel_deletion(update: Update, context: CallbackContext):
         """Annule une suppression planifiée"""
         try:
             user_id = update.message.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
             
-            if "deleting_bot" in context.user_data not in context.user_data:
+            # L'état de conversation est effacé dès la confirmation par PIN :
+            # les suppressions en attente se lisent dans le planificateur
+            pending = deletion_scheduler.pending_for(user_id)
+            if context.args:
+                wanted = context.args[0].lstrip("@")
+                pending = [bot_username for bot_username in pending if bot_username == wanted]
+            if not pending:
                 await update.message.reply_text(
                     "❌ Aucune suppression en cours." if lang == 'fr' else "❌ No pending deletion."
                 )
                 return
-                
-            bot_username = context.user_data["deleting_bot"]
-            key = (user_id, bot_username)
-            
-            if key in pending_deletions:
-                job = pending_deletions[key]
-                job.schedule_removal()
-                del pending_deletions[key]
-                
+
+            for bot_username in pending:
+                deletion_scheduler.cancel(user_id, bot_username)
                 db.cancel_bot_deletion(user_id, bot_username)
-                
+
                 success_msg = (
                     f"✅ Suppression annulée !\n"
                     f"Le bot @{bot_username} ne sera pas supprimé."
@@ -3491,14 +5959,8 @@ if __name__ == "__main__":
                     f"Bot @{bot_username} will not be deleted."
                 )
                 await update.message.reply_text(success_msg)
-            else:
-                await update.message.reply_text(
-                    "❌ Aucune suppression active trouvée." if lang == 'fr' else "❌ No active deletion found."
-                )
-                
-            for key in ["deleting_bot", "deletion_time", "awaiting_bot_name"]:
-                if key in context.user_data:
-                    del context.user_data[key]
+
+            conversations.clear(user_id)
                     
         except Exception as e:
             logger.error(f"Erreur dans handle_cancel_deletion: {e} [ERR_BLM_027]", exc_info=True)
@@ -3519,7 +5981,7 @@ if __name__ == "__main__":
             
             await query.edit_message_text(
                 text, 
-                reply_markup=KeyboardManager.get_join_us_keyboard(lang),
+                reply_markup=keyboards.get("join_us", lang),
                 parse_mode="HTML"
             )
         except Exception as e:
@@ -3606,7 +6068,7 @@ if __name__ == "__main__":
             
             await query.edit_message_text(
                 text, 
-                reply_markup=KeyboardManager.get_join_us_keyboard(lang),
+                reply_markup=keyboards.get("join_us", lang),
                 parse_mode="HTML"
             )
         except Exception as e:
@@ -3690,7 +6152,7 @@ if __name__ == "__main__":
                     "Please send the token of the bot you want to designate as the PDG Bot."
                 )
                 await update.message.reply_text(text, parse_mode="HTML")
-                context.user_data["awaiting_pdg_token"] = True
+                conversations.set(user_id, UserStates.AWAITING_PDG_TOKEN)
             else:
                 await update.message.reply_text(
                     "❌ Cette commande est réservée à la gestion de @TeleSucheBot." if lang == 'fr' else
@@ -3701,10 +6163,8 @@ if __name__ == "__main__":
             await update.message.reply_text("❌ Erreur lors de l'exécution de la commande /config. Contactez le support (@TeleSucheSupport) si le problème persiste. (ERR_BLM_036)")
     @staticmethod
     async def handle_pdg_token_input(update: Update, context: CallbackContext):
-        """Traite le token entré par l'administrateur pour le Bot PDG."""
-        if not context.user_data.get("awaiting_pdg_token"):
-            return
-
+        """Traite le token entré par l'administrateur pour le Bot PDG (état ``AWAITING_PDG_TOKEN``)."""
+        retry = False
         try:
             token = update.message.text.strip()
             user_id = update.message.from_user.id
@@ -3714,29 +6174,33 @@ if __name__ == "__main__":
                 await update.message.reply_text(
                     "❌ Vous n'êtes pas autorisé à configurer le Bot PDG." if lang == 'fr' else "❌ You are not authorized to configure the PDG Bot."
                 )
-                context.user_data["awaiting_pdg_token"] = False
                 return
 
-            if not sync_validate_bot_token(token):
+            try:
+                bot_info = await async_validate_bot_token(token)
+            except TokenCheckUnavailable:
+                retry = True
+                await update.message.reply_text(
+                    "⚠️ Telegram est injoignable, renvoyez le token dans quelques instants." if lang == 'fr'
+                    else "⚠️ Telegram is unreachable, please send the token again in a moment."
+                )
+                return
+            if not bot_info:
                 await update.message.reply_text("❌ Token invalide. Veuillez réessayer." if lang == 'fr' else "❌ Invalid token. Please try again.")
                 return
 
-            application = ApplicationBuilder().token(token).build()
-            bot_info = await application.bot.get_me()
-            
-            # PDG_BOT_ID est un entier, bot_info.id est un entier. Ils doivent être égaux.
-            if bot_info.id != config.PDG_BOT_ID:
+            # PDG_BOT_ID est un entier, bot_info["id"] est un entier. Ils doivent être égaux.
+            if bot_info["id"] != config.PDG_BOT_ID:
                 await update.message.reply_text(
                     "❌ Le token fourni ne correspond pas au Bot PDG configuré." if lang == 'fr' else "❌ The provided token does not match the configured PDG Bot."
                 )
-                context.user_data["awaiting_pdg_token"] = False
                 return
 
             db.pdg_config = {
                 "token": token,
-                "bot_id": bot_info.id,
+                "bot_id": bot_info["id"],
                 "owner": user_id,
-                "username": bot_info.username,
+                "username": bot_info["username"],
                 "is_active": True
             }
             db.save_pdg_config()
@@ -3754,13 +6218,13 @@ if __name__ == "__main__":
                 "Utilisez /pdg pour accéder au tableau de bord",
                 parse_mode="HTML"
             )
-            context.user_data["awaiting_pdg_token"] = False
 
         except Exception as e:
             logger.error(f"Erreur dans handle_pdg_token_input: {e} [ERR_BLM_037]", exc_info=True)
             await update.message.reply_text("❌ Erreur lors de la configuration du Bot PDG. Veuillez réessayer. Contactez le support (@TeleSucheSupport) si le problème persiste. (ERR_BLM_037)")
         finally:
-            context.user_data["awaiting_pdg_token"] = False
+            if not retry:
+                conversations.clear(update.message.from_user.id, UserStates.AWAITING_PDG_TOKEN)
 
     @staticmethod
     async def handle_bot_detail(update: Update, context: CallbackContext):
@@ -3770,10 +6234,9 @@ if __name__ == "__main__":
             await query.answer()
             user_id = query.from_user.id
             lang = db.get_user_language(user_id) or 'fr'
-            bot_identifier = query.data.split(":")[1]
+            bot_identifier = context.args[0]
 
-            user_bots = db.get_user_bots(user_id)
-            selected_bot = next((bot for bot in user_bots if bot.get("bot_username") == bot_identifier), None)
+            selected_bot = db.get_user_bot(user_id, bot_identifier)
             if not selected_bot:
                 await query.edit_message_text("❌ Bot non trouvé." if lang == 'fr' else "❌ Bot not found.")
                 return
@@ -3797,8 +6260,8 @@ if __name__ == "__main__":
             )
 
             keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("ℹ️ Info du bot" if lang == 'fr' else "ℹ️ Bot Info", callback_data=f"show_bot_info:{bot_username}")],
-                [InlineKeyboardButton("🗑️ Supprimer le bot" if lang == 'fr' else "🗑️ Delete bot", callback_data=f"ask_delete_bot:{bot_username}")],
+                [InlineKeyboardButton("ℹ️ Info du bot" if lang == 'fr' else "ℹ️ Bot Info", callback_data=encode_callback("show_bot_info:", bot_username))],
+                [InlineKeyboardButton("🗑️ Supprimer le bot" if lang == 'fr' else "🗑️ Delete bot", callback_data=encode_callback("ask_delete_bot:", bot_username))],
                 [InlineKeyboardButton("🔙 Retour à Mes bots" if lang == 'fr' else "🔙 Back to My bots", callback_data="my_bots")]
             ])
 
@@ -3808,50 +6271,538 @@ if __name__ == "__main__":
             logger.error(f"Erreur dans handle_bot_detail: {e} [ERR_BLM_003]", exc_info=True)
             await query.edit_message_text("❌ Erreur. Veuillez réessayer. Contactez le support (@TeleSucheSupport) si le problème persiste. (ERR_BLM_003)")
 
+# Fonction utilitaire pour vérifier et nettoyer les suppressions en attente
+async def cleanup_pending_deletions():
+    """Nettoyage périodique des suppressions en attente"""
+    try:
+        await BotLinkingManager.execute_pending_deletions()
+    except Exception as e:
+        logger.error(f"Erreur cleanup_pending_deletions: {e}")
+
+# Suivi du démarrage à chaud des bots fils (consultable pendant le boot)
+boot_metrics = {
+    "total": 0,
+    "started": 0,
+    "failed": 0,
+    "skipped": 0,
+    "started_at": None,
+    "finished_at": None,
+    "elapsed": 0.0,
+    "failures": {}
+}
+
+def _boot_order(entries: List[Tuple[int, dict]]) -> List[Tuple[int, dict]]:
+    """Ordonne les bots à démarrer : plans payants d'abord, puis les plus récemment actifs"""
+    plans = {}
+    for user_id, _ in entries:
+        if user_id not in plans:
+            plans[user_id] = get_user_plan(user_id)
+
+    entries = sorted(
+        entries,
+        key=lambda entry: entry[1].get("last_activity") or entry[1].get("creation_time") or "",
+        reverse=True
+    )
+    # Tri stable : l'ordre d'activité est conservé à l'intérieur de chaque groupe de plan
+    return sorted(entries, key=lambda entry: plans[entry[0]] == "free")
+
+async def warm_start_child_bots(concurrency: int = 20, timeout: float = 30.0):
+    """Démarre tous les bots enregistrés en parallèle, avec une concurrence bornée.
+
+    Chaque bot est isolé : un token invalide ou un démarrage trop long est
+    compté dans boot_metrics["failed"] sans bloquer les autres.
+    """
+    entries = []
+    all_users = db.get_all_users() if hasattr(db, 'get_all_users') else []
+    for user_id in all_users:
+        for bot in db.get_user_bots(user_id):
+            if bot.get("bot_username") and bot.get("token"):
+                entries.append((user_id, bot))
+
+    loop = asyncio.get_running_loop()
+    boot_metrics.update({
+        "total": len(entries),
+        "started": 0,
+        "failed": 0,
+        "skipped": 0,
+        "started_at": datetime.now().isoformat(),
+        "finished_at": None,
+        "elapsed": 0.0,
+        "failures": {}
+    })
+    start = loop.time()
+    queue = iter(_boot_order(entries))
+    step = max(len(entries) // 10, 1)
+
+    async def worker():
+        # Les workers se partagent le même itérateur : l'ordre de priorité est respecté
+        for user_id, bot in queue:
+            bot_username = bot["bot_username"]
+            if child_bots.hosts(bot_username):
+                boot_metrics["skipped"] += 1
+                continue
+            try:
+                # Le délai s'applique dans l'hôte, qui libère un bot trop lent au lieu de l'abandonner démarré
+                application = await child_bots.start(
+                    bot["token"], bot_username, ingress=bot.get("ingress", "polling"), timeout=timeout
+                )
+                if application:
+                    boot_metrics["started"] += 1
+                else:
+                    boot_metrics["failed"] += 1
+                    boot_metrics["failures"][bot_username] = "init"
+            except Exception as e:
+                boot_metrics["failed"] += 1
+                boot_metrics["failures"][bot_username] = type(e).__name__
+                logger.error(f"Erreur démarrage bot fils @{bot_username}: {e}")
+
+            done = boot_metrics["started"] + boot_metrics["failed"] + boot_metrics["skipped"]
+            boot_metrics["elapsed"] = loop.time() - start
+            if done % step == 0:
+                logger.info(
+                    f"Démarrage des bots fils : {done}/{boot_metrics['total']} "
+                    f"({boot_metrics['failed']} échecs, {boot_metrics['elapsed']:.1f}s)"
+                )
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(entries))))))
+    boot_metrics["elapsed"] = loop.time() - start
+    boot_metrics["finished_at"] = datetime.now().isoformat()
+    return boot_metrics
+
+# Fonction principale pour démarrer le système de gestion des bots
+async def start_bot_linking_system(application: Optional[Application] = None):
+    """Démarre le système de gestion des bots"""
+    try:
+        # Suppressions programmées avant l'arrêt : les échues partent dès maintenant
+        await deletion_scheduler.start(application.bot if application else None)
+        violations.start(application.bot if application else None)
+        payments.start()
+        # Avec des workers, chaque worker agrège les événements de ses propres bots
+        # et le superviseur écrit leurs statistiques dans sa base
+        analytics.bind(db)
+        if isinstance(child_bots, ChildBotHost):
+            analytics.start(child_bots)
+            child_logs.start()
+
+        # Reprise du polling là où le précédent processus s'est arrêté
+        child_bots.load_offsets(db)
+        conversations.load(db)
+        # Les états de conversation expirés sont purgés au même rythme
+        child_bots.start_offset_flusher(db, conversations.prune)
+
+        # Point d'entrée webhook partagé, seulement si une URL publique est configurée
+        if child_bots.webhook_url:
+            await child_bot_webhooks.start()
+
+        # Claviers statiques des langues principales, les autres sont construits à la demande
+        keyboards.warm(getattr(config, "KEYBOARD_WARM_LANGS", ("fr", "en")))
+        expired = callback_codec.prune()
+        if expired:
+            logger.info(f"{expired} jeton(s) de callback expiré(s) supprimé(s)")
+        plan_catalog.warm(getattr(config, "KEYBOARD_WARM_LANGS", ("fr", "en")))
+
+        # Démarrer les bots existants depuis la base de données
+        await warm_start_child_bots(
+            concurrency=getattr(config, "CHILD_BOT_BOOT_CONCURRENCY", 20),
+            timeout=getattr(config, "CHILD_BOT_BOOT_TIMEOUT", 30.0)
+        )
+
+        logger.info(
+            f"Système de gestion des bots démarré - {len(child_bots)} bots actifs "
+            f"({boot_metrics['failed']} échecs en {boot_metrics['elapsed']:.1f}s)"
+        )
+        
+    except Exception as e:
+        logger.error(f"Erreur démarrage système bot linking: {e}")
+
+async def shutdown_bot_linking_system(application: Optional[Application] = None) -> dict:
+    """Arrête proprement le système (utilisable comme post_shutdown de l'Application principale)"""
+    report = {}
+    try:
+        await deletion_scheduler.close()
+        await violations.close()
+        await payments.close(deadline=getattr(config, "PAYMENT_SHUTDOWN_DEADLINE", 10.0))
+        # Plus aucun webhook accepté pendant le vidage des files
+        await child_bot_webhooks.stop()
+        report = await child_bots.shutdown(deadline=getattr(config, "CHILD_BOT_SHUTDOWN_DEADLINE", 10.0))
+        child_bots.save_offsets(db)
+        conversations.save(db)
+        await analytics.close()
+        await child_logs.shutdown()
+        await token_validator.close()
+        pins.close()
+        if hasattr(db, "close"):
+            db.close()
+    except Exception as e:
+        logger.error(f"Erreur arrêt système bot linking: {e}", exc_info=True)
+    return report
+
+# Export des fonctions principales
+__all__ = [
+    'BotLinkingManager',
+    'setup_bot_linking_handlers', 
+    'start_bot_linking_system',
+    'shutdown_bot_linking_system',
+    'cleanup_pending_deletions',
+    'deletion_scheduler',
+    'violations',
+    'payments',
+    'pins',
+    'warm_start_child_bots',
+    'boot_metrics',
+    'outbound_metrics',
+    'analytics',
+    'check_bot_limits',
+    'check_group_limits',
+    'init_child_bot',
+    'ChildBotHost',
+    'ShardedChildBotHost',
+    'child_bots',
+    'child_bot_webhooks',
+    'conversations',
+    'get_text',
+    'async_validate_bot_token',
+    'keyboards',
+    'CallbackRouter',
+    'encode_callback',
+    'TRANSLATIONS'
+]
+
+# Fonction principale pour démarrer le bot
+async def main():
+    """Fonction principale pour démarrer le bot de gestion"""
+    try:
+        # Token du bot principal (à remplacer par votre vrai token)
+        BOT_TOKEN = "YOUR_BOT_TOKEN_HERE"
+        
+        if BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
+            print("⚠️  Veuillez configurer votre token de bot dans la variable BOT_TOKEN")
+            print("💡 Obtenez votre token depuis @BotFather sur Telegram")
+            return
+        
+        # Créer l'application du bot principal
+        application = (
+            ApplicationBuilder()
+            .token(BOT_TOKEN)
+            .rate_limiter(make_rate_limiter("main"))
+            .post_shutdown(shutdown_bot_linking_system)
+            .build()
+        )
+        
+        # Configurer les handlers
+        setup_bot_linking_handlers(application)
+        
+        # Démarrer le système de gestion des bots
+        await start_bot_linking_system(application)
+        
+        # Démarrer le bot
+        print("🤖 Bot de gestion démarré...")
+        print("📊 Fonctionnalités disponibles :")
+        print("   • Gestion de bots multiples")
+        print("   • Support multilingue")
+        print("   • Interface intuitive")
+        print("   • Système de plans d'abonnement")
+        
+        await application.run_polling(drop_pending_updates=getattr(config, "DROP_PENDING_UPDATES", False))
+        
+    except Exception as e:
+        logger.error(f"Erreur critique dans main: {e}", exc_info=True)
+        print(f"❌ Erreur : {e}")
+
+class CallbackRouter(BaseHandler):
+    """Handler unique pour tous les boutons inline.
+
+    ``callback_data`` est résolu une seule fois : décodage direct s'il a été
+    produit par ``encode_callback``, sinon dans cet ordre :
+
+    - correspondance exacte (``"my_bots"``) ;
+    - action suivie d'arguments (route ``"bot_detail:"`` pour
+      ``"bot_detail:monbot"``, arguments séparés par ``:``) ;
+    - préfixe (``"setlang_"``), le plus long gagnant.
+
+    Les arguments sont placés dans ``context.args``. Deux routes identiques
+    vers des fonctions différentes lèvent ``ValueError`` à l'enregistrement ;
+    ``shadowed()`` liste les routes qui en masquent d'autres.
+    """
+
+    def __init__(self, codec: CallbackCodec = callback_codec):
+        super().__init__(self._unrouted)
+        self.codec = codec
+        self._exact: Dict[str, Callable] = {}
+        self._prefixes: List[Tuple[str, Callable]] = []
+
     @staticmethod
-    async def set_language(update: Update, context: CallbackContext):
-        """Définit la langue de l'utilisateur"""
-        try:
-            query = update.callback_query
-            await query.answer()
-            lang_code = query.data.split("_")[1]
-            user_id = query.from_user.id
-            
-            db.set_user_language(user_id, lang_code)
-            
-            lang_names = {
-                'fr': "Français",
-                'en': "English",
-                'es': "Español", 
-                'de': "Deutsch",
-                'zh': "中文",
-                'hi': "हिन्दी",
-                'ja': "日本語",
-                'ko': "한국어",
-                'th': "ไทย",
-                'ru': "Русский",
-                'pt': "Português",
-                'it': "Italiano"
-            }
-            
-            confirmation = (
-                f"✅ Langue définie sur {lang_names[lang_code]}"
-                if lang_code == 'fr' else
-                f"✅ Language set to {lang_names[lang_code]}"
-            )
-            
-            await query.edit_message_text(
-                confirmation,
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton(
-                        "✅ Commencer" if lang_code == 'fr' else "✅ Start",
-                        callback_data="terms_accepted"
-                    )]
-                ])
+    async def _unrouted(update: Update, context: CallbackContext):
+        pass
+
+    def _check_conflict(self, key: str, callback, existing) -> bool:
+        if existing is None:
+            return True
+        if existing is callback:
+            logger.warning(f"Route de callback enregistrée deux fois: {key}")
+            return False
+        raise ValueError(
+            f"Route de callback {key!r} déjà associée à {existing.__qualname__}, "
+            f"impossible de l'associer à {callback.__qualname__}"
+        )
+
+    def add(self, key: str, callback) -> "CallbackRouter":
+        """Route exacte, ou action à arguments si ``key`` se termine par ``:``"""
+        if self._check_conflict(key, callback, self._exact.get(key)):
+            self.codec.register(key)
+            self._exact[key] = callback
+        return self
+
+    def add_prefix(self, prefix: str, callback) -> "CallbackRouter":
+        existing = next((cb for p, cb in self._prefixes if p == prefix), None)
+        if self._check_conflict(prefix, callback, existing):
+            self.codec.register(prefix)
+            self._prefixes.append((prefix, callback))
+            self._prefixes.sort(key=lambda route: len(route[0]), reverse=True)
+        return self
+
+    def resolve(self, data: str) -> Optional[Tuple[Callable, List[str]]]:
+        if data.startswith(CallbackCodec.MARKER):
+            decoded = self.codec.decode(data)
+            if decoded is None:
+                return None
+            key, args = decoded
+            callback = self._exact.get(key) or next((cb for p, cb in self._prefixes if p == key), None)
+            return (callback, args) if callback is not None else None
+
+        callback = self._exact.get(data)
+        if callback is not None:
+            return callback, []
+        action, sep, rest = data.partition(":")
+        if sep:
+            callback = self._exact.get(action + ":")
+            if callback is not None:
+                return callback, rest.split(":")
+        for prefix, callback in self._prefixes:
+            if data.startswith(prefix):
+                return callback, [data[len(prefix):]]
+        return None
+
+    def shadowed(self) -> List[Tuple[str, str]]:
+        """Couples (route masquée, route prioritaire)"""
+        found = []
+        for prefix, _ in self._prefixes:
+            for other, _ in self._prefixes:
+                if other != prefix and prefix.startswith(other):
+                    found.append((other, prefix))
+            for key in self._exact:
+                if key.startswith(prefix):
+                    found.append((prefix, key))
+        return found
+
+    def check_update(self, update: object) -> Optional[Tuple[Callable, List[str]]]:
+        if isinstance(update, Update) and update.callback_query:
+            data = update.callback_query.data
+            if isinstance(data, str):
+                return self.resolve(data)
+        return None
+
+    def collect_additional_context(self, context, update, application, check_result) -> None:
+        context.args = check_result[1]
+
+    async def handle_update(self, update, application, check_result, context):
+        self.collect_additional_context(context, update, application, check_result)
+        return await check_result[0](update, context)
+
+
+class ConversationStore:
+    """État de conversation de chaque utilisateur : ``(état, payload, échéance)``.
+
+    Remplace les drapeaux épars de ``context.user_data`` : un utilisateur
+    n'est que dans un seul état à la fois, accompagné d'un petit payload
+    (``bot_username``...). Un état expire ``ttl`` secondes après avoir été
+    posé et est alors ignoré ; ``prune`` les retire de la mémoire (appelée
+    périodiquement par le flusher d'offsets de ``child_bots``). ``save``/``load``
+    persistent les états non expirés dans ``store`` sous ``STATE_KEY``.
+    """
+
+    STATE_KEY = "conversations"
+
+    def __init__(self, ttl: float = 900.0):
+        self.ttl = ttl
+        self._states: Dict[int, Tuple[UserStates, dict, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def set(self, user_id: int, state: UserStates, ttl: Optional[float] = None, **payload) -> None:
+        self._states[user_id] = (state, payload, time.time() + (ttl or self.ttl))
+
+    def get(self, user_id: int) -> Optional[Tuple[UserStates, dict]]:
+        entry = self._states.get(user_id)
+        if entry is None:
+            return None
+        if entry[2] <= time.time():
+            del self._states[user_id]
+            return None
+        return entry[0], entry[1]
+
+    def state(self, user_id: int) -> Optional[UserStates]:
+        entry = self.get(user_id)
+        return entry[0] if entry else None
+
+    def payload(self, user_id: int) -> dict:
+        entry = self.get(user_id)
+        return entry[1] if entry else {}
+
+    def clear(self, user_id: int, *states: UserStates) -> None:
+        """Sort de l'état courant (seulement s'il fait partie de ``states`` quand ils sont donnés)"""
+        entry = self._states.get(user_id)
+        if entry is not None and (not states or entry[0] in states):
+            del self._states[user_id]
+
+    def prune(self) -> int:
+        now = time.time()
+        expired = [user_id for user_id, entry in self._states.items() if entry[2] <= now]
+        for user_id in expired:
+            del self._states[user_id]
+        return len(expired)
+
+    def save(self, store) -> None:
+        self.prune()
+        store.save_state(self.STATE_KEY, {
+            str(user_id): [state.value, payload, expires]
+            for user_id, (state, payload, expires) in self._states.items()
+        })
+
+    def load(self, store) -> int:
+        saved = store.load_state(self.STATE_KEY, {}) or {}
+        for user_id, (state, payload, expires) in saved.items():
+            try:
+                self._states.setdefault(int(user_id), (UserStates(state), payload, expires))
+            except ValueError:
+                continue
+        self.prune()
+        return len(self._states)
+
+
+conversations = _main_process_only(lambda: ConversationStore(ttl=getattr(config, "CONVERSATION_TTL", 900.0)))
+
+
+class TextDispatcher(BaseHandler):
+    """Handler unique pour les messages texte attendus par une conversation.
+
+    L'état courant de l'utilisateur dans ``conversations`` désigne
+    directement le handler à appeler ; sans état (ou pour un état sans
+    handler), le message n'est pas pris en charge. Les commandes ne sont
+    jamais interceptées.
+    """
+
+    def __init__(self, store: ConversationStore = conversations):
+        super().__init__(self._unrouted)
+        self.store = store
+        self._routes: Dict[UserStates, Callable] = {}
+
+    @staticmethod
+    async def _unrouted(update: Update, context: CallbackContext):
+        pass
+
+    def add(self, state: UserStates, callback) -> "TextDispatcher":
+        existing = self._routes.get(state)
+        if existing is not None and existing is not callback:
+            raise ValueError(
+                f"État {state.name} déjà associé à {existing.__qualname__}, "
+                f"impossible de l'associer à {callback.__qualname__}"
             )
-        except Exception as e:
-            logger.error(f"Erreur dans set_language: {e} [ERR_BLM_006]", exc_info=True)
-            await query.edit_message_text("❌ Erreur. Veuillez réessayer. Contactez le support (@TeleSucheSupport) si le problème persiste. (ERR_BLM_006)")
+        self._routes[state] = callback
+        return self
+
+    def check_update(self, update: object):
+        if not isinstance(update, Update) or update.message is None or update.message.from_user is None:
+            return None
+        text = update.message.text
+        if not text or text.startswith("/"):
+            return None
+        state = self.store.state(update.message.from_user.id)
+        return self._routes.get(state) if state is not None else None
+
+    async def handle_update(self, update, application, check_result, context):
+        return await check_result(update, context)
+
+
+def build_callback_router() -> CallbackRouter:
+    """Table des boutons inline du bot principal"""
+    m = BotLinkingManager
+    router = CallbackRouter()
+
+    # Menus
+    router.add("back_to_main", m.handle_back_to_main)
+    router.add("help_command", m.handle_help_command)
+    router.add("help", m.help_command)
+    router.add("under_construction", m.handle_under_construction)
+    router.add("services_menu", m.handle_services)
+    router.add("back_to_services", m.handle_back_to_services)
+    router.add_prefix("services_", m.handle_service_submenu)
+    router.add("join_us", m.handle_join_us)
+    router.add("official_channels", m.handle_official_channels)
+    router.add("official_groups", m.handle_official_groups)
+    router.add("back_to_join", m.handle_back_to_join)
+
+    # Langue et conditions
+    router.add("show_lang_options", m.show_language_options)
+    router.add("language_menu", m.language_selection_menu)
+    router.add_prefix("setlang_", m.set_language)
+    router.add("set_lang:", m.set_language)
+    router.add("accept_terms", m.accept_terms)
+    router.add("terms_accepted", m.terms_accepted)
+
+    # Plans
+    router.add("show_plan_info", m.show_plan_info)
+    router.add("back_to_plan_info", m.show_plan_info)
+    router.add("upgrade_plan", m.handle_upgrade_plan)
+    router.add("plan_details:", m.handle_plan_details)
+    router.add("confirm_upgrade:", m.handle_confirm_upgrade)
+
+    # Création et gestion des bots
+    router.add("createbot", m.start_bot_creation)
+    router.add("hastokenyes", m.handle_has_token_yes)
+    router.add("has_token_yes", m.handle_has_token_yes)
+    router.add("hastokenno", m.handle_has_token_no)
+    router.add("has_token_no", m.handle_has_token_no)
+    router.add("my_bots", m.handle_my_bots)
+    router.add("bot_detail:", m.bot_detail)
+    router.add("show_bot_info:", m.show_bot_info)
+    router.add("show_token:", m.show_bot_token)
+    router.add("start_bot:", m.start_bot)
+    router.add("stop_bot:", m.stop_bot)
+    router.add("restart_bot:", m.restart_bot)
+    router.add("bot_settings:", m.bot_settings)
+    router.add("webhook:", m.toggle_webhook)
+    router.add("bot_analytics:", m.bot_analytics)
+    router.add("bot_logs:", m.bot_logs)
+    router.add("download_logs:", m.download_logs)
+
+    # Suppression
+    router.add("ask_delete_bot:", m.handle_ask_delete_bot)
+    router.add("confirm_delete_bot:", m.confirm_delete_bot)
+    router.add("cancel_delete_bot:", m.cancel_delete_bot)
+    router.add("delete_step1_yes:", m.handle_delete_step1_yes)
+    router.add("delete_step1_no", m.handle_delete_step1_no)
+    router.add("delete_final_yes:", m.handle_delete_final_yes)
+    router.add("delete_final_no", m.handle_delete_final_no)
+
+    for hidden, winner in router.shadowed():
+        logger.info(f"Route de callback {winner!r} prioritaire sur {hidden!r}")
+    for route in sorted(keyboards.routes()):
+        if router.resolve(route) is None:
+            logger.warning(f"Bouton de clavier sans route de callback: {route!r}")
+    return router
+
+def build_text_dispatcher() -> TextDispatcher:
+    """Saisies texte attendues par état de conversation"""
+    m = BotLinkingManager
+    return (
+        TextDispatcher()
+        .add(UserStates.AWAITING_TOKEN, m.handle_token_input)
+        .add(UserStates.AWAITING_PDG_TOKEN, m.handle_pdg_token_input)
+        .add(UserStates.AWAITING_BOT_NAME, m.handle_confirm_bot_name)
+        .add(UserStates.AWAITING_PIN_DELETE, m.handle_pin_deletion_input)
+    )
 
 def setup_handlers(application):
     """Configure tous les handlers"""
@@ -3868,75 +6819,26 @@ def setup_handlers(application):
         CommandHandler("planinfo", BotLinkingManager.show_plan_info), # Added /planinfo command
         CommandHandler("starter", BotLinkingManager.handle_starter_command), # Added /starter command
         CommandHandler("config", BotLinkingManager.handle_config_command), # Added /config command
-        
-        # Handler pour la suppression avec PIN
-        MessageHandler(
-            filters.TEXT & filters.Regex(r'^\d{4}$'),
-            BotLinkingManager.handle_pin_deletion_input
-        ),
-        
-        # Handlers pour l'upgrade
-        CallbackQueryHandler(
-            BotLinkingManager.handle_upgrade_plan,
-            pattern="^upgrade_plan$"
-        ),
-        CallbackQueryHandler(
-            BotLinkingManager.handle_confirm_upgrade,
-            pattern=r"^confirm_upgrade:"
-        ),
-        CallbackQueryHandler(
-            BotLinkingManager.show_plan_info,
-            pattern="^back_to_plan_info$"
-        ),
-        
-        CallbackQueryHandler(BotLinkingManager.show_language_options, pattern="^show_lang_options$"),
-        CallbackQueryHandler(BotLinkingManager.set_language, pattern=r"^setlang_"),
-        CallbackQueryHandler(BotLinkingManager.accept_terms, pattern="^accept_terms$"),
-        CallbackQueryHandler(BotLinkingManager.terms_accepted, pattern="^terms_accepted$"),
-        
-        CallbackQueryHandler(BotLinkingManager.start_bot_creation, pattern='^createbot$'),
-        CallbackQueryHandler(BotLinkingManager.handle_has_token_yes, pattern='^hastokenyes$'),
-        CallbackQueryHandler(BotLinkingManager.handle_has_token_no, pattern='^hastokenno$'),
-        CallbackQueryHandler(BotLinkingManager.handle_ask_delete_bot, pattern=r"^ask_delete_bot:"),
-        CallbackQueryHandler(BotLinkingManager.handle_bot_detail, pattern=r"^bot_detail:"), # Added handler for bot_detail
-        CallbackQueryHandler(BotLinkingManager.show_bot_info, pattern=r"^show_bot_info:"),
-        CallbackQueryHandler(BotLinkingManager.show_bot_token, pattern=r"^show_token:"), # New handler for showing bot token
-        CallbackQueryHandler(BotLinkingManager.handle_under_construction, pattern="^under_construction$"), # New handler for under construction buttons
-        CallbackQueryHandler(BotLinkingManager.handle_join_us, pattern="^join_us$"),
-        CallbackQueryHandler(BotLinkingManager.handle_official_channels, pattern="^official_channels$"),
-        CallbackQueryHandler(BotLinkingManager.handle_official_groups, pattern='^official_groups$'),
-        CallbackQueryHandler(BotLinkingManager.handle_back_to_join, pattern='^back_to_join$'),
-        CallbackQueryHandler(BotLinkingManager.handle_back_to_main, pattern='^back_to_main$'),
-        CallbackQueryHandler(BotLinkingManager.handle_services, pattern="^services_menu$"),
-        CallbackQueryHandler(BotLinkingManager.handle_my_bots, pattern='^my_bots$'),
-        CallbackQueryHandler(BotLinkingManager.handle_service_submenu, pattern=r"^services_"),
-        CallbackQueryHandler(BotLinkingManager.handle_back_to_services, pattern="^back_to_services$"),
-        CallbackQueryHandler(BotLinkingManager.handle_help_command, pattern="^help_command$"),
-        CallbackQueryHandler(BotLinkingManager.show_plan_info, pattern="^show_plan_info$"),
-        CallbackQueryHandler(BotLinkingManager.handle_upgrade_plan, pattern="^show_plan_info$"), # Added to handle the button click for upgrade
-        CallbackQueryHandler(BotLinkingManager.handle_upgrade_plan, pattern="^upgrade_plan$"), # Existing handler
-        CallbackQueryHandler(BotLinkingManager.show_plan_info, pattern="^back_to_plan_info$"), # Existing handler
 
-        
-        CallbackQueryHandler(BotLinkingManager.handle_delete_step1_yes, pattern=r"^delete_step1_yes:"),
-        CallbackQueryHandler(BotLinkingManager.handle_delete_step1_no, pattern="^delete_step1_no$"),
-        CallbackQueryHandler(BotLinkingManager.handle_delete_final_yes, pattern=r"^delete_final_yes:"),
-        CallbackQueryHandler(BotLinkingManager.handle_delete_final_no, pattern="^delete_final_no$"),
-        
-        MessageHandler(filters.TEXT & filters.Regex(r'^@\w+$'), BotLinkingManager.handle_confirm_bot_name),
-        # Corrected filter for PDG_USER_ID: it should be a list of user IDs, not a single ID
-        MessageHandler(filters.TEXT & ~filters.COMMAND & filters.User(config.PDG_USER_ID if isinstance(config.PDG_USER_ID, list) else [config.PDG_USER_ID]), BotLinkingManager.handle_pdg_token_input),
-        MessageHandler(filters.TEXT & ~filters.COMMAND, BotLinkingManager.handle_token_input),
+        # Tous les boutons inline passent par un seul routeur
+        build_callback_router(),
+
+        # Saisies texte (token, token PDG, nom du bot, PIN) selon l'état de conversation
+        build_text_dispatcher(),
     ]
     
     for handler in handlers:
         application.add_handler(handler)
 
+def setup_bot_linking_handlers(application):
+    """Nom exporté (et utilisé par ``main``) pour setup_handlers"""
+    return setup_handlers(application)
+
 # --- Compatible avec main.py ---
 def setup(application):
     """Compatibilité: délègue à setup_handlers pour l'appel attendu dans main.py"""
     return setup_handlers(application)
 
 
-# ==== [AJOUT : Fonctionnalité Communauté] ====
-# Ce bloc gère les sous-menus Communauté, Groupes, Canaux et les obligations d'adhésion
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""Vérifie la couverture des traductions de ``locales/``.
+
+Chaque langue déclarée dans ``locales/languages.json`` doit avoir un fichier
+``<lang>.json`` contenant toutes les clés du français (langue de référence).
+Avec ``--source``, les clés passées à ``get_text`` dans le code sont ajoutées
+à la référence.
+
+    python check_locales.py [--locales DIR] [--source bot_linking.py]
+
+Code de sortie 1 si une langue est incomplète.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+REFERENCE_LANG = "fr"
+GET_TEXT_KEY = re.compile(r"get_text\([^,()]+,\s*['\"]([A-Za-z0-9_]+)['\"]\)")
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check(locales_dir, source=None):
+    languages = load(os.path.join(locales_dir, "languages.json"))
+    reference = set(load(os.path.join(locales_dir, f"{REFERENCE_LANG}.json")))
+    if source:
+        with open(source, encoding="utf-8") as f:
+            reference |= set(GET_TEXT_KEY.findall(f.read()))
+
+    problems = {}
+    for lang in languages:
+        path = os.path.join(locales_dir, f"{lang}.json")
+        if not os.path.exists(path):
+            problems[lang] = {"missing_file": True}
+            continue
+        try:
+            keys = set(load(path))
+        except ValueError as e:
+            problems[lang] = {"invalid": str(e)}
+            continue
+        missing = sorted(reference - keys)
+        unknown = sorted(keys - reference)
+        if missing or unknown:
+            problems[lang] = {"missing": missing, "unknown": unknown}
+    return languages, reference, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--locales", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales"))
+    parser.add_argument("--source", help="fichier Python dont les clés get_text() sont exigées")
+    args = parser.parse_args(argv)
+
+    languages, reference, problems = check(args.locales, args.source)
+    for lang, problem in problems.items():
+        if problem.get("missing_file"):
+            print(f"{lang}: fichier {lang}.json absent")
+        elif "invalid" in problem:
+            print(f"{lang}: JSON invalide ({problem['invalid']})")
+        else:
+            if problem["missing"]:
+                print(f"{lang}: {len(problem['missing'])} clé(s) manquante(s): {', '.join(problem['missing'])}")
+            if problem["unknown"]:
+                print(f"{lang}: {len(problem['unknown'])} clé(s) inconnue(s): {', '.join(problem['unknown'])}")
+
+    complete = len(languages) - len(problems)
+    print(f"{complete}/{len(languages)} langues complètes ({len(reference)} clés)")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Persistance de l'analytique : base du processus principal ou relais d'un worker"""
+
+from bot_linking import AnalyticsPipeline, SimpleDB, _SupervisorStore
+
+BOT = "bot_123"
+KEY = f"{AnalyticsPipeline.STATE_PREFIX}{BOT}"
+
+
+def test_worker_rollups_are_written_through_the_supervisor():
+    supervisor_db = SimpleDB()
+    sent = []
+
+    def send(message):
+        # Ce que fait ShardedChildBotHost._on_readable d'un événement "save_state"
+        sent.append(message)
+        request_id, event, (key, value) = message
+        supervisor_db.save_state(key, value)
+
+    worker = AnalyticsPipeline()
+    worker.bind(_SupervisorStore(send))
+    worker.emit_update(BOT, 42, 0.01)
+    worker.emit_sent(BOT, "sendMessage")
+    worker.drain()
+    worker.persist()
+
+    assert [event for _, event, _ in sent] == ["save_state"]
+    saved = supervisor_db.load_state(KEY)
+    assert saved and saved["minute"]
+
+    # Bot redémarré sur un autre worker : le superviseur lui envoie l'état sauvegardé
+    other_store = _SupervisorStore(lambda message: None)
+    other_store.preload({KEY: supervisor_db.load_state(KEY)})
+    other = AnalyticsPipeline()
+    other.bind(other_store)
+    other.emit_update(BOT, 7, 0.01)
+    other.drain()
+    summary = other.summary(BOT)
+    assert summary["users"] == 2
+    assert summary["hour"]["messages_in"] == 2
+    assert summary["hour"]["messages_out"] == 1
+
+
+def test_forget_clears_the_bound_store():
+    db = SimpleDB()
+    pipeline = AnalyticsPipeline()
+    pipeline.bind(db)
+    pipeline.emit_update(BOT, 42, 0.01)
+    pipeline.drain()
+    pipeline.persist()
+    assert db.load_state(KEY)
+
+    pipeline.forget(BOT)
+    assert db.load_state(KEY) is None
+    assert pipeline.summary(BOT) is None
@@ -0,0 +1,63 @@
+"""Résolution des ``callback_data`` par CallbackRouter (en clair ou encodées)"""
+
+from bot_linking import CallbackCodec, CallbackRouter, SimpleDB
+
+
+async def my_bots(update, context):
+    pass
+
+
+async def bot_detail(update, context):
+    pass
+
+
+async def set_language(update, context):
+    pass
+
+
+async def set_language_pt(update, context):
+    pass
+
+
+def make_router(store=None, secret="s3cret") -> CallbackRouter:
+    return (
+        CallbackRouter(CallbackCodec(secret=secret, store=store))
+        .add("my_bots", my_bots)
+        .add("bot_detail:", bot_detail)
+        .add_prefix("setlang_", set_language)
+        .add_prefix("setlang_pt", set_language_pt)
+    )
+
+
+def test_raw_routes_resolve():
+    router = make_router()
+    assert router.resolve("my_bots") == (my_bots, [])
+    assert router.resolve("bot_detail:monbot:2") == (bot_detail, ["monbot", "2"])
+    assert router.resolve("setlang_fr") == (set_language, ["fr"])
+    # Le préfixe le plus long gagne
+    assert router.resolve("setlang_pt_BR") == (set_language_pt, ["_BR"])
+    assert router.resolve("unknown") is None
+
+
+def test_encoded_routes_resolve_and_tampering_is_rejected():
+    router = make_router()
+    data = router.codec.encode("bot_detail:", "monbot")
+    assert data.startswith(CallbackCodec.MARKER)
+    assert router.resolve(data) == (bot_detail, ["monbot"])
+    assert router.resolve(router.codec.encode("setlang_", "fr")) == (set_language, ["fr"])
+
+    forged = data[:-1] + ("x" if data[-1] != "x" else "y")
+    assert router.resolve(forged) is None
+    assert router.codec.rejected == 1
+
+
+def test_oversized_payload_survives_a_restart():
+    store = SimpleDB()
+    long_name = "b" * 80
+    data = make_router(store).codec.encode("bot_detail:", long_name)
+    assert len(data.encode()) <= CallbackCodec.MAX_BYTES
+
+    restarted = make_router(store)
+    assert restarted.resolve(data) == (bot_detail, [long_name])
+    # Un autre secret n'accepte pas le jeton
+    assert make_router(store, secret="other").resolve(data) is None
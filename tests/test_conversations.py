@@ -0,0 +1,68 @@
+"""États de conversation : expiration, purge et persistance (ConversationStore)"""
+
+import pytest
+
+import bot_linking
+from bot_linking import ConversationStore, SimpleDB, UserStates
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(bot_linking.time, "time", clock)
+    return clock
+
+
+def test_state_expires_after_ttl(clock):
+    store = ConversationStore(ttl=60)
+    store.set(1, UserStates.AWAITING_TOKEN, bot_username="monbot")
+    store.set(2, UserStates.AWAITING_PIN_DELETE, ttl=300)
+    assert store.get(1) == (UserStates.AWAITING_TOKEN, {"bot_username": "monbot"})
+
+    clock.now += 61
+    assert store.state(1) is None
+    assert store.payload(1) == {}
+    assert store.state(2) is UserStates.AWAITING_PIN_DELETE
+
+
+def test_prune_drops_only_expired_states(clock):
+    store = ConversationStore(ttl=60)
+    store.set(1, UserStates.AWAITING_TOKEN)
+    store.set(2, UserStates.AWAITING_BOT_NAME, ttl=300)
+    clock.now += 61
+    assert store.prune() == 1
+    assert len(store) == 1
+
+
+def test_clear_only_leaves_the_given_states(clock):
+    store = ConversationStore()
+    store.set(1, UserStates.AWAITING_TOKEN)
+    store.clear(1, UserStates.AWAITING_PIN_DELETE)
+    assert store.state(1) is UserStates.AWAITING_TOKEN
+    store.clear(1)
+    assert store.state(1) is None
+
+
+def test_save_and_load_keep_unexpired_states(clock):
+    db = SimpleDB()
+    store = ConversationStore(ttl=60)
+    store.set(1, UserStates.AWAITING_PIN_DELETE, bot_username="monbot")
+    store.set(2, UserStates.AWAITING_TOKEN, ttl=10)
+    clock.now += 5
+    store.save(db)
+    # État d'une version précédente qui n'existe plus : ignoré au chargement
+    db.load_state(ConversationStore.STATE_KEY)["3"] = ["removed_state", {}, clock.now + 60]
+
+    clock.now += 10
+    restored = ConversationStore(ttl=60)
+    assert restored.load(db) == 1
+    assert restored.get(1) == (UserStates.AWAITING_PIN_DELETE, {"bot_username": "monbot"})
+    assert restored.state(2) is None
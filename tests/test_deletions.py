@@ -0,0 +1,121 @@
+"""Suppressions programmées : persistance par entrée et nouvel essai après un échec"""
+
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import bot_linking
+from bot_linking import DeletionScheduler, SimpleDB
+
+USER = 42
+BOT = "bot_123"
+STATE = f"{DeletionScheduler.STATE_PREFIX}{USER}:{BOT}"
+
+
+class FakeHost:
+    def __init__(self, fail: int = 0):
+        self.fail = fail
+        self.forgotten = []
+
+    def hosts(self, bot_username):
+        return False
+
+    async def forget(self, bot_username):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("worker indisponible")
+        self.forgotten.append(bot_username)
+
+
+class BrokenBot:
+    async def send_message(self, chat_id, text):
+        raise RuntimeError("chat introuvable")
+
+
+@pytest.fixture
+def store(monkeypatch):
+    db = SimpleDB()
+    db.bots[USER] = [{"bot_username": BOT}]
+    monkeypatch.setattr(bot_linking, "db", db)
+    return db
+
+
+def due_now(scheduler: DeletionScheduler) -> None:
+    scheduler.schedule(USER, BOT, datetime.now() - timedelta(seconds=1), chat_id=USER)
+
+
+def expire(scheduler: DeletionScheduler) -> None:
+    """Avance l'échéance d'un nouvel essai sans toucher au nombre d'essais"""
+    entry = scheduler._entries[(USER, BOT)]
+    entry["due"] = time.time() - 1
+    heapq.heappush(scheduler._heap, (entry["due"], (USER, BOT)))
+
+
+def test_failed_deletion_is_kept_and_retried_with_backoff(store, monkeypatch):
+    host = FakeHost(fail=2)
+    monkeypatch.setattr(bot_linking, "child_bots", host)
+    scheduler = DeletionScheduler(store, retry_delay=10.0, retry_max=15.0)
+    due_now(scheduler)
+
+    assert asyncio.run(scheduler.run_due()) == 0
+    due, chat_id, attempts = store.load_state(STATE)
+    assert (chat_id, attempts) == (USER, 1)
+    assert 5 < due - time.time() <= 10
+    assert (USER, BOT) in scheduler
+
+    # Deuxième échec : délai doublé, plafonné à retry_max
+    expire(scheduler)
+    asyncio.run(scheduler.run_due())
+    due, _, attempts = store.load_state(STATE)
+    assert attempts == 2
+    assert 10 < due - time.time() <= 15
+
+    # Un redémarrage retrouve l'entrée avec son nombre d'essais
+    restored = DeletionScheduler(store)
+    assert restored.recover() == 1
+    assert restored._entries[(USER, BOT)]["attempts"] == 2
+
+    expire(scheduler)
+    assert asyncio.run(scheduler.run_due()) == 1
+    assert store.load_state(STATE) is None
+    assert (USER, BOT) not in scheduler
+    assert host.forgotten == [BOT]
+
+
+def test_failed_notification_does_not_retry(store, monkeypatch):
+    monkeypatch.setattr(bot_linking, "child_bots", FakeHost())
+    scheduler = DeletionScheduler(store)
+    scheduler.bot = BrokenBot()
+    due_now(scheduler)
+
+    assert asyncio.run(scheduler.run_due()) == 1
+    assert store.load_state(STATE) is None
+    assert store.bots[USER] == []
+
+
+def test_legacy_two_field_entries_are_recovered(store):
+    store.save_state(STATE, [time.time() + 60, USER])
+    scheduler = DeletionScheduler(store)
+    assert scheduler.recover() == 1
+    assert scheduler._entries[(USER, BOT)]["attempts"] == 0
+
+
+def test_pending_deletions_are_indexed_by_user(store):
+    scheduler = DeletionScheduler(store)
+    later = datetime.now() + timedelta(hours=1)
+    scheduler.schedule(USER, BOT, later)
+    scheduler.schedule(USER, "other_bot", later)
+    scheduler.schedule(7, BOT, later)
+    assert scheduler.pending_for(USER) == [BOT, "other_bot"]
+
+    assert scheduler.cancel(USER, BOT)
+    assert scheduler.pending_for(USER) == ["other_bot"]
+
+    restored = DeletionScheduler(store)
+    restored.recover()
+    assert restored.pending_for(USER) == ["other_bot"]
+    assert restored.pending_for(7) == [BOT]
+    assert restored.pending_for(99) == []
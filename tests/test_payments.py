@@ -0,0 +1,154 @@
+"""PaymentQueue face à une passerelle simulée (httpx.MockTransport), et sa mise en file par handle_confirm_upgrade"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+
+import bot_linking
+from bot_linking import BotLinkingManager, PaymentQueue, SimpleDB
+
+
+def make_queue(handler, **kwargs) -> PaymentQueue:
+    return PaymentQueue(
+        processor=object(),
+        gateway_url="https://pay.example",
+        transport=httpx.MockTransport(handler),
+        backoff=0,
+        **kwargs,
+    )
+
+
+def test_duplicate_submit_returns_same_job():
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"status": "succeeded"})
+
+    async def scenario():
+        queue = make_queue(handler)
+        first = queue.submit(1, "premium", "n1", 9.99, "EUR")
+        second = queue.submit(1, "premium", "n1", 9.99, "EUR")
+        await queue.close()
+        return queue, first, second
+
+    queue, (job, created), (again, created_again) = asyncio.run(scenario())
+    assert created and not created_again
+    assert again is job
+    assert job["status"] == PaymentQueue.SUCCEEDED
+    assert len(requests) == 1
+    assert queue.metrics["duplicates"] == 1
+
+
+def test_5xx_is_retried_with_the_same_idempotency_key():
+    keys = []
+
+    async def handler(request):
+        keys.append(request.headers["Idempotency-Key"])
+        if len(keys) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"status": "succeeded"})
+
+    async def scenario():
+        queue = make_queue(handler, attempts=3)
+        job, _ = queue.submit(1, "premium", "n1", 9.99, "EUR")
+        await queue.close()
+        return queue, job
+
+    queue, job = asyncio.run(scenario())
+    assert job["status"] == PaymentQueue.SUCCEEDED
+    assert keys == [job["key"]] * 3
+    assert queue.metrics["retries"] == 2
+
+
+def test_4xx_fails_without_retry_and_allows_a_new_attempt():
+    requests = []
+    notified = []
+
+    async def handler(request):
+        requests.append(request)
+        return httpx.Response(402, json={"error": "card_declined"})
+
+    async def on_done(job):
+        notified.append(job["status"])
+
+    async def scenario():
+        queue = make_queue(handler)
+        job, _ = queue.submit(1, "premium", "n1", 9.99, "EUR", on_done)
+        await queue.close()
+        retry, created = queue.submit(1, "premium", "n1", 9.99, "EUR")
+        await queue.close()
+        return queue, job, retry, created
+
+    queue, job, retry, created = asyncio.run(scenario())
+    assert job["status"] == PaymentQueue.FAILED
+    assert notified == [PaymentQueue.FAILED]
+    # Job en échec oublié : la même clé crée un nouveau job
+    assert created and retry is not job
+    assert len(requests) == 2
+    assert queue.metrics["retries"] == 0
+
+
+def test_close_drains_pending_jobs():
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"status": "succeeded"})
+
+    async def scenario():
+        queue = make_queue(handler, workers=2)
+        jobs = [queue.submit(user_id, "premium", "n", 9.99, "EUR")[0] for user_id in range(6)]
+        await queue.close(deadline=5.0)
+        return jobs
+
+    jobs = asyncio.run(scenario())
+    assert [job["status"] for job in jobs] == [PaymentQueue.SUCCEEDED] * 6
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.submitted = []
+
+    def get(self, key):
+        return None
+
+    def submit(self, user_id, plan_id, nonce, amount, currency, on_done=None):
+        self.submitted.append((plan_id, amount, currency))
+
+
+def confirm_upgrade(monkeypatch, plan_id):
+    """handle_confirm_upgrade sur un bouton ``confirm_upgrade:<plan_id>:<nonce>``"""
+    queue = RecordingQueue()
+    edits = []
+    catalog = SimpleNamespace(plans={
+        "free": {"label": "Free", "price": "0", "limits": {}},
+        "premium": {"label": "Premium", "price": "9.99€", "price_value": 9.99, "currency": "EUR", "limits": {}},
+        "legacy": {"label": "Legacy", "price": "?", "limits": {}},
+    })
+    monkeypatch.setattr(bot_linking, "payments", queue)
+    monkeypatch.setattr(bot_linking, "plan_catalog", catalog)
+    monkeypatch.setattr(bot_linking, "db", SimpleDB())
+
+    async def answer():
+        pass
+
+    async def edit_message_text(text, **kwargs):
+        edits.append(text)
+
+    query = SimpleNamespace(from_user=SimpleNamespace(id=1), answer=answer, edit_message_text=edit_message_text)
+    context = SimpleNamespace(args=[plan_id, "n1"])
+    asyncio.run(BotLinkingManager.handle_confirm_upgrade(SimpleNamespace(callback_query=query), context))
+    return queue.submitted, edits
+
+
+def test_confirm_upgrade_charges_the_catalog_price(monkeypatch):
+    submitted, _ = confirm_upgrade(monkeypatch, "premium")
+    assert submitted == [("premium", 9.99, "EUR")]
+
+
+def test_confirm_upgrade_rejects_unknown_or_unpriced_plans(monkeypatch):
+    for plan_id in ("gold", "free", "legacy"):
+        submitted, edits = confirm_upgrade(monkeypatch, plan_id)
+        assert submitted == []
+        assert "ERR_BLM_043" in edits[-1]
@@ -0,0 +1,89 @@
+"""Boucle de polling partagée des bots fils (``ChildBotHost._poll_once``)"""
+
+import asyncio
+from types import SimpleNamespace
+
+from telegram import Update
+
+from bot_linking import ChildBotHost
+
+BOT = "bot_123"
+
+
+class FakeBot:
+    """``get_updates`` rejoue des réponses préparées et note les offsets demandés"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.offsets = []
+
+    async def get_updates(self, offset=None, timeout=None, limit=None, allowed_updates=None):
+        self.offsets.append(offset)
+        return [Update(update_id) for update_id in self.responses.pop(0)] if self.responses else []
+
+
+def poll(host: ChildBotHost, bot: FakeBot, rounds: int, saved=None):
+    """``rounds`` tours de polling sans la boucle de dispatch ; renvoie les délais reprogrammés"""
+    delays = []
+
+    async def scenario():
+        host._apps[BOT] = SimpleNamespace(bot=bot, update_queue=asyncio.Queue())
+        host._ingress[BOT] = "polling"
+        host._schedule = lambda bot_username, delay: delays.append(delay)
+        if saved is not None:
+            host._offsets[BOT] = saved
+        for _ in range(rounds):
+            await host._poll_once(BOT)
+        return host._apps[BOT].update_queue
+
+    queue = asyncio.run(scenario())
+    return delays, [queue.get_nowait().update_id for _ in range(queue.qsize())]
+
+
+def test_idle_backoff_is_capped():
+    delays, _ = poll(ChildBotHost(idle_poll_max=2.0), FakeBot([], [], [], [7], []), 5)
+    assert delays == [1.0, 2.0, 2.0, 0.0, 1.0]
+
+
+def test_polling_resumes_from_saved_offset():
+    bot = FakeBot([10, 11], [])
+    delays, received = poll(ChildBotHost(), bot, 2, saved=10)
+    assert bot.offsets == [10, 12]
+    assert received == [10, 11]
+
+
+class PendingBot:
+    """Simule la file de Telegram : un offset confirme les updates précédentes"""
+
+    def __init__(self, pending):
+        self.pending = list(pending)
+        self.calls = []
+
+    async def get_updates(self, offset=None, timeout=None, limit=100, allowed_updates=None):
+        self.calls.append((offset, limit))
+        if offset is not None and offset < 0:
+            self.pending = self.pending[offset:]
+        elif offset is not None:
+            self.pending = [update_id for update_id in self.pending if update_id >= offset]
+        return [Update(update_id) for update_id in self.pending[:limit]]
+
+
+def test_backlog_within_bound_resumes_from_saved_offset():
+    bot = PendingBot(range(10, 15))
+    _, received = poll(ChildBotHost(backlog_max=10), bot, 1, saved=10)
+    assert bot.calls == [(10, 11)]
+    assert received == [10, 11, 12, 13, 14]
+
+
+def test_backlog_over_bound_keeps_only_the_latest_updates():
+    bot = PendingBot(range(10, 40))
+    _, received = poll(ChildBotHost(backlog_max=10), bot, 1, saved=10)
+    assert bot.calls == [(10, 11), (-10, 100)]
+    assert received == list(range(30, 40))
+
+
+def test_backlog_without_saved_offset_uses_negative_offset():
+    bot = PendingBot(range(10, 40))
+    _, received = poll(ChildBotHost(backlog_max=5), bot, 2)
+    assert bot.calls == [(-5, 100), (40, 100)]
+    assert received == list(range(35, 40))
@@ -0,0 +1,80 @@
+"""Superviseur des workers de bots fils (ShardedChildBotHost) sans lancer de processus"""
+
+import asyncio
+import multiprocessing
+
+import pytest
+
+import bot_linking
+from bot_linking import AnalyticsPipeline, ShardedChildBotHost, SimpleDB, _shard_of
+
+BOT = "bot_123"
+KEY = f"{AnalyticsPipeline.STATE_PREFIX}{BOT}"
+
+
+@pytest.fixture
+def supervisor_db(monkeypatch):
+    db = SimpleDB()
+    pipeline = AnalyticsPipeline()
+    pipeline.bind(db)
+    monkeypatch.setattr(bot_linking, "analytics", pipeline)
+    return db
+
+
+def attach(host: ShardedChildBotHost, shard: int):
+    """Branche un pipe comme worker ``shard`` ; renvoie l'extrémité côté worker"""
+    parent_conn, child_conn = multiprocessing.Pipe()
+    host._workers[shard] = (None, parent_conn)
+    return child_conn
+
+
+def test_rendezvous_hashing_only_moves_bots_of_the_lost_worker():
+    bots = [f"bot_{i}" for i in range(300)]
+    before = {bot: _shard_of(bot, [0, 1, 2]) for bot in bots}
+    after = {bot: _shard_of(bot, [0, 2]) for bot in bots}
+    assert set(before.values()) == {0, 1, 2}
+    assert all(after[bot] == shard for bot, shard in before.items() if shard != 1)
+
+
+def test_worker_events_update_status_and_persist_rollups(supervisor_db):
+    host = ShardedChildBotHost(2)
+    worker = attach(host, 0)
+    host._bots[BOT] = {"token": "t", "ingress": "polling", "shard": 0, "status": "online"}
+
+    worker.send((None, "status", (BOT, "hibernating")))
+    host._on_readable(0)
+    assert host.status(BOT) == "hibernating"
+
+    worker.send((None, "save_state", (KEY, {"minute": [[0, 1]]})))
+    host._on_readable(0)
+    assert supervisor_db.load_state(KEY) == {"minute": [[0, 1]]}
+
+
+def test_preload_sends_saved_offset_and_rollups(supervisor_db):
+    supervisor_db.save_state(KEY, {"minute": [[0, 1]]})
+    received = []
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        host = ShardedChildBotHost(1)
+        worker = attach(host, 0)
+        host._offsets[BOT] = 42
+        loop.add_reader(host._workers[0][1].fileno(), host._on_readable, 0)
+
+        def respond():
+            request_id, method, args = worker.recv()
+            received.append((method, args))
+            worker.send((request_id, True, len(args[0])))
+
+        loop.add_reader(worker.fileno(), respond)
+        try:
+            await host._preload(0, BOT)
+        finally:
+            loop.remove_reader(worker.fileno())
+            loop.remove_reader(host._workers[0][1].fileno())
+
+    asyncio.run(scenario())
+    assert received == [
+        ("load_offsets", ({BOT: 42},)),
+        ("load_states", ({KEY: {"minute": [[0, 1]]}},)),
+    ]
@@ -0,0 +1,159 @@
+"""Mode webhook des bots fils face à un faux serveur Bot API local (aiohttp)"""
+
+import asyncio
+import socket
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+from telegram import Update
+from telegram.ext import TypeHandler
+
+import bot_linking
+from bot_linking import ChildBotHost, ChildBotWebhookServer
+
+TOKEN = "123:abc"
+BOT = "bot_123"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeBotAPI:
+    """Répond aux méthodes utilisées par un bot fils en webhook et note les appels"""
+
+    def __init__(self):
+        self.calls = []
+        self.app = web.Application()
+        self.app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        self.runner = None
+
+    def methods(self):
+        return [method for method, _ in self.calls]
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        data = dict(await request.post()) if request.can_read_body else {}
+        self.calls.append((method, data))
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": {
+                "id": 123, "is_bot": True, "first_name": BOT, "username": BOT,
+            }})
+        return web.json_response({"ok": True, "result": True})
+
+    async def start(self) -> str:
+        port = free_port()
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", port).start()
+        return f"http://127.0.0.1:{port}/bot"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def message_update(update_id: int) -> dict:
+    return {"update_id": update_id, "message": {
+        "message_id": update_id, "date": 0, "text": "hi",
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "u"},
+    }}
+
+
+def run_with_webhook(monkeypatch, scenario):
+    """Bot fils démarré en webhook derrière ChildBotWebhookServer, puis ``scenario``"""
+
+    async def main():
+        api = FakeBotAPI()
+        monkeypatch.setattr(bot_linking.config, "BOT_API_BASE_URL", await api.start(), raising=False)
+        host = ChildBotHost(webhook_url="https://hooks.example", webhook_secret="s3cret")
+        monkeypatch.setattr(bot_linking, "child_bots", host)
+        server = ChildBotWebhookServer(host, port=free_port())
+        await server.start()
+        received = []
+        try:
+            application = await host.start(TOKEN, BOT, ingress="webhook")
+            application.add_handler(TypeHandler(Update, lambda update, context: received.append(update.update_id)))
+            url = f"http://127.0.0.1:{server.port}/hook/{BOT}"
+            async with aiohttp.ClientSession() as session:
+                return await scenario(host, api, session, url, received)
+        finally:
+            await host.shutdown()
+            await server.stop()
+            await api.stop()
+
+    return asyncio.run(main())
+
+
+async def post(session, url, payload, secret):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret is not None else {}
+    async with session.post(url, json=payload, headers=headers) as response:
+        return response.status
+
+
+async def drain(received, count):
+    for _ in range(100):
+        if len(received) >= count:
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_update_with_secret_is_dispatched(monkeypatch):
+    async def scenario(host, api, session, url, received):
+        set_webhook = next(data for method, data in api.calls if method == "setWebhook")
+        assert set_webhook["url"] == f"https://hooks.example/hook/{BOT}"
+        assert set_webhook["secret_token"] == host.webhook_secret(BOT)
+
+        assert await post(session, url, message_update(1), host.webhook_secret(BOT)) == 200
+        await drain(received, 1)
+        return received
+
+    assert run_with_webhook(monkeypatch, scenario) == [1]
+
+
+def test_wrong_or_missing_secret_is_rejected(monkeypatch):
+    async def scenario(host, api, session, url, received):
+        statuses = [
+            await post(session, url, message_update(1), "nope"),
+            await post(session, url, message_update(2), None),
+        ]
+        await asyncio.sleep(0.05)
+        return statuses, received
+
+    statuses, received = run_with_webhook(monkeypatch, scenario)
+    assert statuses == [403, 403]
+    assert received == []
+
+
+def test_malformed_update_is_acknowledged(monkeypatch):
+    async def scenario(host, api, session, url, received):
+        secret = host.webhook_secret(BOT)
+        status = await post(session, url, {"update_id": 1, "message": "not a message"}, secret)
+        # Le bot continue de recevoir les updates suivantes
+        assert await post(session, url, message_update(2), secret) == 200
+        await drain(received, 1)
+        return status, received
+
+    status, received = run_with_webhook(monkeypatch, scenario)
+    assert status == 200
+    assert received == [2]
+
+
+def test_stop_deletes_webhook_but_hibernation_keeps_it(monkeypatch):
+    async def scenario(host, api, session, url, received):
+        await host.hibernate(BOT)
+        assert "deleteWebhook" not in api.methods()
+        # Un appel de Telegram réactive le bot en veille
+        assert await post(session, url, message_update(1), host.webhook_secret(BOT)) == 200
+        assert host.status(BOT) == "online"
+
+        secret = host.webhook_secret(BOT)
+        assert await host.stop(BOT)
+        assert await post(session, url, message_update(2), secret) == 404
+        return api.methods()
+
+    assert "deleteWebhook" in run_with_webhook(monkeypatch, scenario)